@@ -21,7 +21,7 @@ class LoginApi:
         if is_exist:
             raise HTTPException(status_code=400, detail="Username already exists")
         user = User(**data.model_dump(exclude=["password"]))
-        user.set_password(data.password)
+        await self.login_svc.set_password(user, data.password)
         await user.save()
         return Response(content=f"New user has been registered")
 
@@ -10,18 +10,36 @@ from config import (
     REFRESH_TOKEN_EXPIRE_DAYS,
 )
 from enums import TokenTypeEnum
-from general_services.redis_svc import RedisSvc
+from general_services.password_svc import PasswordSvcBusyError
 from models import User
 
 
 class LoginSvc:
     def __init__(self):
         self.token_svc = TokenSvc()
-        self.redis_svc = RedisSvc()
+
+    async def check_password(self, user: User, password: str) -> bool:
+        try:
+            return await user.check_password_async(password)
+        except PasswordSvcBusyError:
+            raise self.busy_error() from None
+
+    async def set_password(self, user: User, password: str):
+        try:
+            await user.set_password_async(password)
+        except PasswordSvcBusyError:
+            raise self.busy_error() from None
+
+    def busy_error(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent login attempts, try again later",
+            headers={"Retry-After": "1"},
+        )
 
     async def login(self, username: str, password: str):
         user = await User.get_or_none(username=username)
-        if not user or not user.check_password(password):
+        if not user or not await self.check_password(user, password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Wrong username or password",
@@ -65,17 +83,13 @@ class LoginSvc:
             ),  # Set True in production (for HTTPS)
             samesite="strict",  # Adjust as per your use case
         )
-        auth = {
-            "access_token": access_token,
-            "refresh_token": refresh_token,
-        }
-        self.redis_svc.hset(user.id, "auth", auth)
+        await self.token_svc.save_tokens(user.id, access_token, refresh_token)
 
         # Return the access token in the response body
         return response
 
     async def refresh_token(self, refresh_token: str):
-        payload = self.token_svc.verify_token(refresh_token, TokenTypeEnum.REFRESH)
+        payload = await self.token_svc.verify_token(refresh_token, TokenTypeEnum.REFRESH)
         access_token_expires = datetime.timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         refresh_token_expires = datetime.timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
         new_payload_access_token = {
@@ -106,11 +120,7 @@ class LoginSvc:
             ),  # Set True in production (for HTTPS)
             samesite="strict",  # Adjust as per your use case
         )
-        auth = {
-            "access_token": access_token,
-            "refresh_token": refresh_token,
-        }
-        self.redis_svc.hset(payload.get("user_id"), "auth", auth)
+        await self.token_svc.save_tokens(payload.get("user_id"), access_token, refresh_token)
         # Return the access token in the response body
         return response
 
@@ -118,5 +128,5 @@ class LoginSvc:
         user = request.state.user
         response = RedirectResponse(url=redirect_route)
         response.delete_cookie("refresh_token")
-        self.redis_svc.delete(user.id)
+        await self.token_svc.revoke_tokens(user.id)
         return response
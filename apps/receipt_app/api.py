@@ -1,87 +1,149 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Union
 
-from fastapi import Request, HTTPException, Query
-from tortoise.expressions import Q
+from fastapi import Request, HTTPException, Query, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from tortoise.transactions import in_transaction
 
 from auth_jwt.decorators import login_required
-from models import Receipt, PaymentType, Product
-from apps.receipt_app.dto import ReceiptResponse, ReceiptRequest, ProductOutput, PaymentOutput
+from general_services.idempotency_svc import IDEMPOTENCY_HEADER, IdempotencySvc, Record
+from general_services.profiling import timing
+from models import Receipt, Product, User
+from apps.receipt_app.dto import (
+    ReceiptBatchRequest,
+    ReceiptBatchResponse,
+    ReceiptPageResponse,
+    ReceiptRequest,
+    ReceiptResponse,
+    ReceiptStatsResponse,
+)
+from apps.receipt_app.money import from_cents, from_milli, line_total_cents, to_cents, to_milli
+from apps.receipt_app.serializers import ReceiptSerializer
+from apps.receipt_app.services.payment_type_registry import payment_type_registry
+from apps.receipt_app.services.receipt_batch_svc import ReceiptBatchSvc
+from apps.receipt_app.services.receipt_export_svc import ReceiptExportSvc
+from apps.receipt_app.services.receipt_stats_svc import ReceiptStatsSvc
+from apps.receipt_app.services.receipt_svc import RECEIPT_LIST_FIELDS, ReceiptSvc
+from apps.receipt_app.services.receipt_text_cache_svc import ReceiptTextCacheSvc
+from apps.receipt_app.services.receipt_text_svc import ReceiptTextSvc
+from enums import ExportFormatEnum, PaginationEnum, ReceiptFormatEnum, StatsPeriodEnum
 
 
 class ReceiptApi:
+    def __init__(self):
+        self.receipt_svc = ReceiptSvc()
+        self.receipt_batch_svc = ReceiptBatchSvc()
+        self.receipt_serializer = ReceiptSerializer()
+        self.receipt_export_svc = ReceiptExportSvc()
+        self.receipt_stats_svc = ReceiptStatsSvc()
+        self.receipt_text_svc = ReceiptTextSvc()
+        self.receipt_text_cache_svc = ReceiptTextCacheSvc()
+        self.idempotency_svc = IdempotencySvc()
 
     @login_required
     async def create_receipt(self, request: Request, data: ReceiptRequest) -> ReceiptResponse:
         user = request.state.user
-        total = sum(p.price * p.quantity for p in data.products)
-        rest = max(data.payment.amount - total, 0)
-
-        if data.payment.amount < total:
-            raise HTTPException(status_code=400, detail="Insufficient payment amount")
+        idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not idempotency_key:
+            return await self.save_receipt(user, data)
+        return await self.idempotency_svc.run(
+            user.id,
+            "create-receipt",
+            idempotency_key,
+            data.model_dump_json().encode(),
+            lambda record: self.save_receipt(user, data, record),
+        )
 
-        products_with_total = [
-            ProductOutput(**p.model_dump(), total=round(p.price * p.quantity, 2))
-            for p in data.products
+    async def save_receipt(self, user: User, data: ReceiptRequest, record: Optional[Record] = None):
+        lines = [
+            (product.name, to_cents(product.price), to_milli(product.quantity))
+            for product in data.products
         ]
+        line_totals = [line_total_cents(price_cents, quantity_milli) for _, price_cents, quantity_milli in lines]
+        total_cents = sum(line_totals)
+        amount_cents = to_cents(data.payment.amount)
 
-        payment_type = await PaymentType.get(name=data.payment.type)
-        receipt = Receipt(user=user, amount=data.payment.amount, total=total, payment_type=payment_type)
+        if amount_cents < total_cents:
+            raise HTTPException(status_code=400, detail="Insufficient payment amount")
 
-        async with in_transaction() as connection:
+        payment_type_id = await payment_type_registry.get_id(data.payment.type)
+        if not payment_type_id:
+            raise HTTPException(status_code=400, detail="Unknown payment type")
+        receipt = Receipt(
+            user=user,
+            amount_cents=amount_cents,
+            total_cents=total_cents,
+            products_count=len(lines),
+            payment_type_id=payment_type_id,
+        )
+
+        async with in_transaction("default") as connection:
             await receipt.save(using_db=connection)
             products = [
                 Product(
                     receipt=receipt,
-                    name=product.name,
-                    price=product.price,
-                    quantity=product.quantity,
+                    name=name,
+                    price_cents=price_cents,
+                    quantity_milli=quantity_milli,
+                    total_cents=line_total,
+                    created_at=receipt.created_at,
                 )
-                for product in data.products
+                for (name, price_cents, quantity_milli), line_total in zip(lines, line_totals)
             ]
             await Product.bulk_create(products, batch_size=100, using_db=connection)
 
-        return ReceiptResponse(
-            id=receipt.id,
-            products=products_with_total,
-            payment=PaymentOutput(**data.payment.model_dump()),
-            total=round(total, 2),
-            rest=round(rest, 2),
-            created_at=receipt.created_at,
+            with timing("serialize"):
+                response = self.receipt_serializer.build(
+                    receipt_id=receipt.id,
+                    products=(
+                        (name, from_cents(price_cents), from_milli(quantity_milli), from_cents(line_total))
+                        for (name, price_cents, quantity_milli), line_total in zip(lines, line_totals)
+                    ),
+                    payment_type=data.payment.type,
+                    amount=from_cents(amount_cents),
+                    total=from_cents(total_cents),
+                    rest=from_cents(max(amount_cents - total_cents, 0)),
+                    created_at=receipt.created_at,
+                )
+            if record:
+                await record(connection, response)
+        return response
+
+    @login_required
+    async def create_receipts_batch(self, request: Request, data: ReceiptBatchRequest) -> ReceiptBatchResponse:
+        user = request.state.user
+        idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not idempotency_key:
+            return await self.receipt_batch_svc.create_receipts(user, data.receipts)
+        return await self.idempotency_svc.run(
+            user.id,
+            "create-receipts-batch",
+            idempotency_key,
+            data.model_dump_json().encode(),
+            lambda record: self.receipt_batch_svc.create_receipts(user, data.receipts, record),
         )
 
     @login_required
     async def get_receipt_by_id(self, request: Request, receipt_id: int) -> ReceiptResponse:
         user = request.state.user
 
-        receipt = await Receipt.get_or_none(id=receipt_id, user=user).prefetch_related("products", "payment_type")
+        receipt = await self.receipt_svc.get_detail(user.id, receipt_id)
         if not receipt:
             raise HTTPException(status_code=404, detail="Receipt not found")
 
-        products = [
-            ProductOutput(
-                name=p.name,
-                price=p.price,
-                quantity=p.quantity,
-                total=round(p.price * p.quantity, 2)
+        with timing("serialize"):
+            return self.receipt_serializer.build(
+                receipt_id=receipt["id"],
+                products=(
+                    (name, from_cents(price_cents), from_milli(quantity_milli), from_cents(total_cents))
+                    for name, price_cents, quantity_milli, total_cents in receipt["products"]
+                ),
+                payment_type=receipt["payment_type"],
+                amount=from_cents(receipt["amount_cents"]),
+                total=from_cents(receipt["total_cents"]),
+                rest=from_cents(max(receipt["amount_cents"] - receipt["total_cents"], 0)),
+                created_at=receipt["created_at"],
             )
-            for p in receipt.products  # related name in the model Product
-        ]
-        total = receipt.total
-        rest = max(receipt.amount - total, 0)
-
-        return ReceiptResponse(
-            id=receipt.id,
-            products=products,
-            payment=PaymentOutput(
-                type=receipt.payment_type.name,
-                amount=receipt.amount,
-            ),
-            total=round(total, 2),
-            rest=round(rest, 2),
-            created_at=receipt.created_at
-        )
 
     @login_required
     async def get_receipts(
@@ -93,98 +155,94 @@ class ReceiptApi:
             payment_type: Optional[str] = Query(None),
             offset: int = Query(0, ge=0),
             limit: int = Query(10, le=100),
-    ) -> List[ReceiptResponse]:
+            pagination: PaginationEnum = Query(PaginationEnum.OFFSET),
+            cursor: Optional[str] = Query(None),
+    ) -> Union[List[ReceiptResponse], ReceiptPageResponse]:
         user = request.state.user
-        filters = Q(user=user)
-
-        if date_from:
-            filters &= Q(created_at__gte=date_from)
-        if date_to:
-            filters &= Q(created_at__lte=date_to)
-        if min_total is not None:
-            filters &= Q(total__gte=min_total)
-        if payment_type:
-            filters &= Q(payment_type__name=payment_type)
-
-        receipts = await Receipt.filter(
-            filters
-        ).prefetch_related(
-            "payment_type", "products"
-        ).offset(offset).limit(limit)
-
-        result = []
-        for receipt in receipts:
-            products = [
-                ProductOutput(
-                    name=p.name,
-                    price=p.price,
-                    quantity=p.quantity,
-                    total=round(p.price * p.quantity, 2)
-                )
-                for p in receipt.products
-            ]
-            total_sum = receipt.total
-            rest = max(receipt.amount - total_sum, 0)
-            result.append(
-                ReceiptResponse(
-                    id=receipt.id,
-                    products=products,
-                    payment=PaymentOutput(
-                        type=receipt.payment_type.name,
-                        amount=total_sum
-                    ),
-                    total=round(total_sum, 2),
-                    rest=rest,
-                    created_at=receipt.created_at
-                )
-            )
+        is_cursor_mode = pagination == PaginationEnum.CURSOR
+        query = await self.receipt_svc.list_query(
+            user,
+            date_from,
+            date_to,
+            min_total,
+            payment_type,
+            cursor=cursor if is_cursor_mode else None,
+        )
 
-        return result
+        if is_cursor_mode:
+            # One extra row tells whether there is a next page
+            receipts = await query.limit(limit + 1).values(*RECEIPT_LIST_FIELDS)
+            has_next = len(receipts) > limit
+            receipts = receipts[:limit]
+        else:
+            receipts = await query.offset(offset).limit(limit).values(*RECEIPT_LIST_FIELDS)
+
+        result = await self.receipt_svc.serialize_list(receipts)
+
+        if is_cursor_mode:
+            next_cursor = None
+            if has_next:
+                last = receipts[-1]
+                next_cursor = self.receipt_svc.encode_cursor(last["created_at"], last["id"])
+            result = {"items": result, "next_cursor": next_cursor}
+        with timing("serialize"):
+            return JSONResponse(content=result)
 
-    async def get_receipt_text(
+    @login_required
+    async def get_receipts_stats(
             self,
             request: Request,
-            receipt_id: int,
-            line_width: int = Query(32, ge=20, le=100)
-    ) -> str:
-        receipt = await Receipt.get_or_none(id=receipt_id).prefetch_related("products", "payment_type")
-        if not receipt:
-            raise HTTPException(status_code=404, detail="Receipt not found")
-
-        header = "     ФОП Джонсонюк Борис     ".center(line_width)
-        separator = "=" * line_width
-        sub_separator = "-" * line_width
-        lines = [header, separator]
-
-        for product in receipt.products:
-            quantity = float(product.quantity)
-            price = float(product.price)
-            total = round(quantity * price, 2)
-
-            lines.append(f"{quantity:.2f} x {price:,.2f}".replace(",", " "))
-
-            name = product.name
-            total_str = f"{total:,.2f}".replace(",", " ")
-            spacing = line_width - len(name) - len(total_str)
-            lines.append(f"{name}{' ' * spacing}{total_str}")
-            lines.append(sub_separator)
-
-        total = sum(float(p.quantity) * float(p.price) for p in receipt.products)
-        amount = float(receipt.amount)
-        rest = max(amount - total, 0.0)
-
-        total_str = f"{total:,.2f}".replace(",", " ")
-        amount_str = f"{amount:,.2f}".replace(",", " ")
-        rest_str = f"{rest:,.2f}".replace(",", " ")
+            date_from: Optional[datetime] = Query(None),
+            date_to: Optional[datetime] = Query(None),
+            min_total: Optional[float] = Query(None),
+            payment_type: Optional[str] = Query(None),
+            period: StatsPeriodEnum = Query(StatsPeriodEnum.DAY),
+    ) -> ReceiptStatsResponse:
+        user = request.state.user
+        query = await self.receipt_svc.list_query(user, date_from, date_to, min_total, payment_type)
+        return JSONResponse(content=await self.receipt_stats_svc.stats(query, period))
 
-        lines.append(separator)
-        lines.append(f"СУМА{' ' * (line_width - 4 - len(total_str))}{total_str}")
-        lines.append(f"{receipt.payment_type.name.capitalize()}{' ' * (line_width - len(receipt.payment_type.name) - len(amount_str))}{amount_str}")
-        lines.append(f"Решта{' ' * (line_width - 5 - len(rest_str))}{rest_str}")
-        lines.append(separator)
+    @login_required
+    async def export_receipts(
+            self,
+            request: Request,
+            date_from: Optional[datetime] = Query(None),
+            date_to: Optional[datetime] = Query(None),
+            min_total: Optional[float] = Query(None),
+            payment_type: Optional[str] = Query(None),
+            format: ExportFormatEnum = Query(ExportFormatEnum.NDJSON),
+    ) -> StreamingResponse:
+        user = request.state.user
+        query = await self.receipt_svc.list_query(user, date_from, date_to, min_total, payment_type)
 
-        date_str = receipt.created_at.strftime("%d.%m.%Y %H:%M")
-        lines.append(date_str.center(line_width))
-        lines.append("Дякуємо за покупку!".center(line_width))
+        media_type = "text/csv" if format == ExportFormatEnum.CSV else "application/x-ndjson"
+        return StreamingResponse(
+            self.receipt_export_svc.export(query, format),
+            media_type=f"{media_type}; charset=utf-8",
+            headers={"Content-Disposition": f'attachment; filename="receipts.{format.value}"'},
+        )
 
-        return "\n".join(lines)
+    async def get_receipt_text(
+            self,
+            request: Request,
+            receipt_id: int,
+            line_width: int = Query(32, ge=20, le=100),
+            format: ReceiptFormatEnum = Query(ReceiptFormatEnum.TEXT),
+    ) -> Response:
+        media_type = self.receipt_text_svc.media_type(format)
+        text = await self.receipt_text_cache_svc.get(receipt_id, line_width, format)
+        if text is None:
+            receipt = await self.receipt_text_svc.get_receipt(receipt_id)
+            first_page = await self.receipt_text_svc.product_page(receipt)
+            body, parts = await self.receipt_text_svc.buffer(
+                self.receipt_text_svc.render(receipt, line_width, first_page, format)
+            )
+            if body is None:
+                # Too large to cache; streamed without an ETag
+                return StreamingResponse(parts, media_type=media_type)
+            text = await self.receipt_text_cache_svc.set(receipt_id, line_width, format, body)
+
+        headers = {"ETag": text.etag}
+        if self.receipt_text_cache_svc.not_modified(request.headers.get("If-None-Match"), text.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=text.body, media_type=media_type, headers=headers)
@@ -1,7 +1,8 @@
 from pydantic import BaseModel, condecimal, constr, conlist
-from typing import List, Literal
+from typing import List, Literal, Optional
 from datetime import datetime
 
+from config import RECEIPT_BATCH_MAX_RECEIPTS
 from enums import PaymentTypeEnum
 
 
@@ -24,6 +25,14 @@ class ReceiptRequest(BaseModel):
     payment: PaymentInput
 
 
+class ReceiptBatchRequest(BaseModel):
+    receipts: conlist(ReceiptRequest, min_length=1, max_length=RECEIPT_BATCH_MAX_RECEIPTS)
+
+
+class ReceiptBatchResponse(BaseModel):
+    ids: List[int]
+
+
 class ProductOutput(ProductInput):
     total: condecimal(gt=0, max_digits=12, decimal_places=2)
 
@@ -39,3 +48,29 @@ class ReceiptResponse(BaseModel):
     total: condecimal(gt=0, max_digits=12, decimal_places=2)
     rest: condecimal(ge=0, max_digits=10, decimal_places=2)
     created_at: datetime
+
+
+class ReceiptPageResponse(BaseModel):
+    items: List[ReceiptResponse]
+    next_cursor: Optional[str]
+
+
+class TotalStats(BaseModel):
+    count: int
+    sum: Optional[condecimal(decimal_places=2)]
+    avg: Optional[condecimal(decimal_places=2)]
+    min: Optional[condecimal(decimal_places=2)]
+    max: Optional[condecimal(decimal_places=2)]
+
+
+class PaymentTypeStats(TotalStats):
+    payment_type: str
+
+
+class PeriodStats(TotalStats):
+    period: str
+
+
+class ReceiptStatsResponse(TotalStats):
+    by_payment_type: List[PaymentTypeStats]
+    by_period: List[PeriodStats]
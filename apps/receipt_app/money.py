@@ -0,0 +1,40 @@
+"""Money is stored as integer cents and quantities as integer thousandths.
+
+Sums, filters and ordering are then exact on every backend; Decimal is only
+used at the API boundary.
+"""
+from decimal import ROUND_CEILING, Decimal
+
+
+def to_cents(value: Decimal) -> int:
+    return int(Decimal(value).scaleb(2).to_integral_value())
+
+
+def to_cents_ceil(value: Decimal) -> int:
+    """Smallest cent amount that is >= value."""
+    return int(Decimal(value).scaleb(2).to_integral_value(ROUND_CEILING))
+
+
+def from_cents(cents: int) -> Decimal:
+    return Decimal(cents).scaleb(-2)
+
+
+def to_milli(value: Decimal) -> int:
+    return int(Decimal(value).scaleb(3).to_integral_value())
+
+
+def from_milli(milli: int) -> Decimal:
+    return Decimal(milli).scaleb(-3)
+
+
+def line_total_cents(price_cents: int, quantity_milli: int) -> int:
+    """price x quantity in cents, rounded half-even like round(Decimal, 2)."""
+    cents, rest = divmod(price_cents * quantity_milli, 1000)
+    if rest * 2 > 1000 or (rest * 2 == 1000 and cents % 2):
+        cents += 1
+    return cents
+
+
+def money(cents: int) -> str:
+    """Text a condecimal field of the response DTOs serializes the amount to."""
+    return str(from_cents(cents))
@@ -0,0 +1,14 @@
+from apps.receipt_app.rendering.base import Renderer
+from apps.receipt_app.rendering.escpos import EscPosRenderer
+from apps.receipt_app.rendering.html import HtmlRenderer
+from apps.receipt_app.rendering.layout import Line, ReceiptLayout, get_layout
+from apps.receipt_app.rendering.pdf import PdfRenderer
+from apps.receipt_app.rendering.text import TextRenderer
+from enums import ReceiptFormatEnum
+
+RENDERERS = {
+    ReceiptFormatEnum.TEXT: TextRenderer,
+    ReceiptFormatEnum.ESCPOS: EscPosRenderer,
+    ReceiptFormatEnum.HTML: HtmlRenderer,
+    ReceiptFormatEnum.PDF: PdfRenderer,
+}
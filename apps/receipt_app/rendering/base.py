@@ -0,0 +1,26 @@
+from typing import List
+
+from apps.receipt_app.rendering.layout import Line, ReceiptLayout
+
+
+class Renderer:
+    """Back end turning laid-out lines into the bytes of one format.
+
+    An instance renders a single receipt: `begin`, then `render` for every
+    batch of lines in order, then `end`; the concatenated results are the
+    document.
+    """
+
+    media_type = "application/octet-stream"
+
+    def __init__(self, layout: ReceiptLayout):
+        self.layout = layout
+
+    def begin(self) -> bytes:
+        return b""
+
+    def render(self, lines: List[Line]) -> bytes:
+        raise NotImplementedError
+
+    def end(self) -> bytes:
+        return b""
@@ -0,0 +1,55 @@
+import codecs
+from typing import List
+
+from apps.receipt_app.rendering.base import Renderer
+from apps.receipt_app.rendering.layout import Line
+from config import RECEIPT_ESCPOS_CODE_PAGE, RECEIPT_ESCPOS_ENCODING
+
+ESC = b"\x1b"
+GS = b"\x1d"
+INIT = ESC + b"@"
+BOLD_ON = ESC + b"E\x01"
+BOLD_OFF = ESC + b"E\x00"
+FEED_AND_CUT = b"\n\n\n" + GS + b"VB\x00"
+
+# Characters missing from cp866 and similar printer code pages
+LOOKALIKES = {"і": "i", "І": "I", "ґ": "г", "Ґ": "Г", "…": "."}
+
+
+def _replace_with_lookalike(error: UnicodeEncodeError):
+    return LOOKALIKES.get(error.object[error.start], "?"), error.start + 1
+
+
+codecs.register_error("escpos_lookalike", _replace_with_lookalike)
+
+
+class EscPosRenderer(Renderer):
+    """ESC/POS commands for thermal printers.
+
+    Text is encoded in RECEIPT_ESCPOS_ENCODING after selecting printer code
+    page RECEIPT_ESCPOS_CODE_PAGE (ESC t n); the job ends with a feed and a
+    partial cut.
+    """
+
+    def begin(self) -> bytes:
+        return INIT + ESC + b"t" + bytes([RECEIPT_ESCPOS_CODE_PAGE])
+
+    def render(self, lines: List[Line]) -> bytes:
+        parts, plain = [], []
+        for line in lines:
+            if not line.bold:
+                plain.append(line.text)
+                continue
+            parts.append(self.encode(plain))
+            parts.append(BOLD_ON + self.encode([line.text]) + BOLD_OFF)
+            plain = []
+        parts.append(self.encode(plain))
+        return b"".join(parts)
+
+    def encode(self, texts: List[str]) -> bytes:
+        if not texts:
+            return b""
+        return ("\n".join(texts) + "\n").encode(RECEIPT_ESCPOS_ENCODING, "escpos_lookalike")
+
+    def end(self) -> bytes:
+        return FEED_AND_CUT
@@ -0,0 +1,49 @@
+from html import escape
+from typing import List
+
+from apps.receipt_app.rendering.base import Renderer
+from apps.receipt_app.rendering.layout import CENTER, COLUMNS, RULE, Line
+from config import RECEIPT_MERCHANT_NAME
+
+STYLE = (
+    "body{margin:0;padding:16px;background:#fff}"
+    ".receipt{font:14px/1.4 monospace;margin:0 auto}"
+    ".center{text-align:center}"
+    ".row{display:flex;justify-content:space-between;gap:1ch}"
+    ".row span:first-child{overflow-wrap:anywhere}"
+    ".bold{font-weight:bold}"
+    "hr{border:0;border-top:1px dashed #000;margin:4px 0}"
+    "hr.double{border-top:3px double #000}"
+)
+
+
+class HtmlRenderer(Renderer):
+    """Standalone HTML page, e.g. for e-mailed copies."""
+
+    media_type = "text/html; charset=utf-8"
+
+    def begin(self) -> bytes:
+        return (
+            '<!DOCTYPE html><html lang="uk"><head><meta charset="utf-8">'
+            f"<title>{escape(RECEIPT_MERCHANT_NAME)}</title><style>{STYLE}</style></head>"
+            f'<body><div class="receipt" style="width:{self.layout.line_width}ch">'
+        ).encode()
+
+    def render(self, lines: List[Line]) -> bytes:
+        parts = []
+        for line in lines:
+            if line.kind == RULE:
+                parts.append('<hr class="double">' if line.text[:1] == "=" else "<hr>")
+            elif line.kind == COLUMNS:
+                bold = ' bold' if line.bold else ""
+                parts.append(
+                    f'<div class="row{bold}"><span>{escape(line.left)}</span><span>{escape(line.right)}</span></div>'
+                )
+            elif line.kind == CENTER:
+                parts.append(f'<div class="center">{escape(line.left)}</div>')
+            else:
+                parts.append(f"<div>{escape(line.text)}</div>")
+        return "".join(parts).encode()
+
+    def end(self) -> bytes:
+        return b"</div></body></html>"
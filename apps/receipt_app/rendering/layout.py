@@ -0,0 +1,98 @@
+from datetime import datetime
+from functools import lru_cache
+from typing import List, NamedTuple
+
+from apps.receipt_app.money import from_cents, from_milli
+from apps.receipt_app.rendering.width import CONTROLS, text_width, truncate, wrap
+from config import RECEIPT_MERCHANT_NAME
+
+CENTER = "center"
+COLUMNS = "columns"
+RULE = "rule"
+TEXT = "text"
+
+# Longer product names are cut off with an ellipsis
+NAME_MAX_LINES = 3
+
+
+class Line(NamedTuple):
+    """One laid-out line of a receipt.
+
+    `text` is the line as the plain-text receipt prints it, padded to the
+    line width in display columns; `left`/`right` keep the parts of a
+    COLUMNS line for back ends that align them themselves.
+    """
+    kind: str
+    text: str
+    left: str = ""
+    right: str = ""
+    bold: bool = False
+
+
+def amount_text(value) -> str:
+    return f"{value:,.2f}".replace(",", " ")
+
+
+class ReceiptLayout:
+    """Receipt layout for one line width.
+
+    Everything that does not depend on the receipt (header, rules, closing
+    line) is built once in __init__; `get_layout` keeps one instance per
+    width, so rendering a receipt is a single pass over its products.
+    """
+
+    def __init__(self, line_width: int):
+        self.line_width = line_width
+        self.rule = Line(RULE, "-" * line_width)
+        self.double_rule = Line(RULE, "=" * line_width)
+        self.header = [self.center(RECEIPT_MERCHANT_NAME), self.double_rule]
+        self.thanks = self.center("Дякуємо за покупку!")
+
+    def center(self, text: str) -> Line:
+        text = truncate(text.translate(CONTROLS), self.line_width)
+        # Same split of the margin as str.center
+        margin = self.line_width - text_width(text)
+        left = margin // 2 + (margin & self.line_width & 1)
+        return Line(CENTER, f"{' ' * left}{text}{' ' * (margin - left)}", left=text)
+
+    def columns(self, left: str, right: str, bold: bool = False) -> Line:
+        spacing = self.line_width - text_width(left) - text_width(right)
+        return Line(COLUMNS, f"{left}{' ' * spacing}{right}", left, right, bold)
+
+    def product(self, name: str, price_cents: int, quantity_milli: int, total_cents: int) -> List[Line]:
+        """Quantity line, then the name with the line total on its last line.
+
+        A name that does not fit next to the total is wrapped by display
+        width into up to NAME_MAX_LINES lines; the total shares the last one
+        if there is room, or gets a line of its own.
+        """
+        quantity = Line(TEXT, f"{from_milli(quantity_milli):.2f} x {amount_text(from_cents(price_cents))}")
+        if not name.isprintable():
+            name = name.translate(CONTROLS)
+        total = amount_text(from_cents(total_cents))
+        spacing = self.line_width - text_width(name) - len(total)
+        if spacing > 0:
+            return [quantity, Line(COLUMNS, f"{name}{' ' * spacing}{total}", name, total), self.rule]
+
+        names = wrap(name, self.line_width, NAME_MAX_LINES)
+        last = names.pop() if names and text_width(names[-1]) < self.line_width - len(total) else ""
+        return [quantity, *(Line(TEXT, text) for text in names), self.columns(last, total), self.rule]
+
+    def footer(
+            self, total_cents: int, amount_cents: int, payment_type_name: str, created_at: datetime
+    ) -> List[Line]:
+        rest_cents = max(amount_cents - total_cents, 0)
+        return [
+            self.double_rule,
+            self.columns("СУМА", amount_text(from_cents(total_cents)), bold=True),
+            self.columns(payment_type_name.capitalize(), amount_text(from_cents(amount_cents))),
+            self.columns("Решта", amount_text(from_cents(rest_cents))),
+            self.double_rule,
+            self.center(created_at.strftime("%d.%m.%Y %H:%M")),
+            self.thanks,
+        ]
+
+
+@lru_cache(maxsize=None)
+def get_layout(line_width: int) -> ReceiptLayout:
+    return ReceiptLayout(line_width)
@@ -0,0 +1,294 @@
+import itertools
+import os
+import struct
+import zlib
+from functools import lru_cache
+from typing import Callable, Dict, List, NamedTuple
+
+from apps.receipt_app.rendering.base import Renderer
+from apps.receipt_app.rendering.layout import Line
+from apps.receipt_app.rendering.width import char_width
+from apps.receipt_app.rendering.width_table import STARTS, WIDTHS
+from config import RECEIPT_PDF_FONT_PATH
+
+FONT_SIZE = 9
+LEADING = 11
+MARGIN = 14
+LINES_PER_PAGE = 60
+
+(
+    CATALOG, PAGES, FONT, CID_FONT, FONT_DESCRIPTOR, FONT_FILE, CID_TO_GID_MAP, TO_UNICODE, FIRST_PAGE_OBJECT
+) = range(1, 10)
+
+# Character codes of the embedded font are UTF-16 code units. Characters
+# outside the BMP have no single code and are shown as U+FFFD, or for wide
+# ones as WIDE_REPLACEMENT, a code of the unused surrogate range.
+REPLACEMENT = 0xFFFD
+WIDE_REPLACEMENT = 0xD800
+
+
+class PdfPrefix(NamedTuple):
+    """Header and the objects every document shares: catalog and font."""
+    data: bytes
+    offsets: Dict[int, int]
+    encode: Callable[[str], bytes]
+    advance: int
+    ascent: int
+
+
+def font_tables(data: bytes) -> Dict[bytes, int]:
+    tables = {}
+    for index in range(struct.unpack_from(">H", data, 4)[0]):
+        tag, _, offset, _ = struct.unpack_from(">4sIII", data, 12 + index * 16)
+        tables[tag] = offset
+    return tables
+
+
+def font_metrics(data: bytes) -> Dict[str, object]:
+    """Metrics of a TrueType font, scaled to 1000 units per em."""
+    tables = font_tables(data)
+    head, hhea = tables[b"head"], tables[b"hhea"]
+    units_per_em = struct.unpack_from(">H", data, head + 18)[0]
+    bbox = struct.unpack_from(">4h", data, head + 36)
+    ascent, descent = struct.unpack_from(">2h", data, hhea + 4)
+    # Monospaced, so the widest advance is everyone's advance
+    advance = struct.unpack_from(">H", data, hhea + 10)[0]
+
+    def scale(value):
+        return round(value * 1000 / units_per_em)
+
+    return {
+        "bbox": " ".join(str(scale(value)) for value in bbox),
+        "ascent": scale(ascent),
+        "descent": scale(descent),
+        "advance": scale(advance),
+    }
+
+
+def glyph_ids(data: bytes) -> Dict[int, int]:
+    """Glyph of each BMP character, from the Windows Unicode (format 4) cmap."""
+    cmap = font_tables(data)[b"cmap"]
+    for index in range(struct.unpack_from(">H", data, cmap + 2)[0]):
+        platform, encoding, offset = struct.unpack_from(">HHI", data, cmap + 4 + index * 8)
+        if (platform, encoding) == (3, 1):
+            break
+    else:
+        return {}
+    table = cmap + offset
+    segments = struct.unpack_from(">H", data, table + 6)[0] // 2
+    ends = struct.unpack_from(">%dH" % segments, data, table + 14)
+    starts = struct.unpack_from(">%dH" % segments, data, table + 16 + 2 * segments)
+    deltas = struct.unpack_from(">%dh" % segments, data, table + 16 + 4 * segments)
+    range_offsets_at = table + 16 + 6 * segments
+    range_offsets = struct.unpack_from(">%dH" % segments, data, range_offsets_at)
+    glyphs = {}
+    for segment, (start, end, delta, range_offset) in enumerate(zip(starts, ends, deltas, range_offsets)):
+        for code in range(start, min(end, 0xFFFE) + 1):
+            if range_offset:
+                at = range_offsets_at + 2 * segment + range_offset + 2 * (code - start)
+                glyph = struct.unpack_from(">H", data, at)[0]
+                glyph = glyph and (glyph + delta) & 0xFFFF
+            else:
+                glyph = (code + delta) & 0xFFFF
+            if glyph:
+                glyphs[code] = glyph
+    return glyphs
+
+
+def bmp_columns() -> List[int]:
+    """Columns each UTF-16 code takes, the same as in the layout."""
+    columns = []
+    for start, end, width in zip(STARTS, STARTS[1:] + (0x110000,), WIDTHS):
+        columns.extend([width] * (min(end, 0x10000) - start))
+        if end >= 0x10000:
+            break
+    columns[WIDE_REPLACEMENT] = 2
+    return columns
+
+
+def encode_utf16(text: str) -> bytes:
+    try:
+        codes = text.encode("utf-16-be")
+    except UnicodeEncodeError:  # Lone surrogates
+        codes = b""
+    if len(codes) == 2 * len(text):
+        return codes
+    units = []
+    for char in text:
+        if char <= "\ud7ff" or "\ue000" <= char <= "\uffff":
+            units.append(ord(char))
+        elif char_width(char):
+            units.append(WIDE_REPLACEMENT if char_width(char) == 2 else REPLACEMENT)
+    return struct.pack(">%dH" % len(units), *units)
+
+
+def encode_single_byte(encoding: str) -> Callable[[str], bytes]:
+    """Encodes into `encoding`, replacing what it lacks with one "?" per column."""
+    def encode(text: str) -> bytes:
+        if text.isascii():
+            return text.encode()
+        return b"".join(
+            char.encode(encoding) if char_width(char) == 1 and char.encode(encoding, "ignore") else
+            b"?" * char_width(char)
+            for char in text
+        )
+    return encode
+
+
+def pdf_object(number: int, body: bytes) -> bytes:
+    return b"%d 0 obj\n%s\nendobj\n" % (number, body)
+
+
+def pdf_stream(dictionary: bytes, data: bytes) -> bytes:
+    return b"<<%s /Length %d>>\nstream\n%s\nendstream" % (dictionary, len(data), data)
+
+
+def to_unicode_cmap() -> bytes:
+    """CMap mapping the UTF-16 codes back to Unicode, for text extraction."""
+    ranges = [b"<%02X00> <%02XFF> <%02X00>" % (high, high, high) for high in range(256) if not 0xD8 <= high <= 0xDF]
+    chunks = [ranges[start:start + 100] for start in range(0, len(ranges), 100)]
+    return b"\n".join([
+        b"/CIDInit /ProcSet findresource begin 12 dict begin begincmap",
+        b"/CIDSystemInfo <</Registry (Adobe) /Ordering (UCS) /Supplement 0>> def",
+        b"/CMapName /ReceiptMono-UCS def /CMapType 2 def",
+        b"1 begincodespacerange <0000> <FFFF> endcodespacerange",
+        *(b"%d beginbfrange\n%s\nendbfrange" % (len(chunk), b"\n".join(chunk)) for chunk in chunks),
+        b"1 beginbfchar\n<%04X> <%04X>\nendbfchar" % (WIDE_REPLACEMENT, REPLACEMENT),
+        b"endcmap CMapName currentdict /CMap defineresource pop end end",
+    ])
+
+
+@lru_cache(maxsize=None)
+def pdf_prefix() -> PdfPrefix:
+    """Embeds the monospaced TrueType font at RECEIPT_PDF_FONT_PATH as a CID
+    font with UTF-16 codes, so any BMP text survives; without the file the
+    built-in Courier is used and only Latin-1 text does.
+
+    Either way a character takes as many columns as the layout gave it:
+    the CID font declares the widths of width.py, and in Courier what it
+    cannot show becomes one "?" per column.
+    """
+    objects = {CATALOG: b"<</Type /Catalog /Pages %d 0 R>>" % PAGES}
+    if os.path.exists(RECEIPT_PDF_FONT_PATH):
+        with open(RECEIPT_PDF_FONT_PATH, "rb") as font_file:
+            font_data = font_file.read()
+        metrics = font_metrics(font_data)
+        advance, ascent = metrics["advance"], metrics["ascent"]
+        glyphs = glyph_ids(font_data)
+        glyphs[WIDE_REPLACEMENT] = glyphs.get(REPLACEMENT, 0)
+        cid_to_gid = bytearray(2 * 0x10000)
+        for code, glyph in glyphs.items():
+            struct.pack_into(">H", cid_to_gid, 2 * code, glyph)
+        # Only the codes that do not take one column, the rest get /DW
+        widths = []
+        code = 0
+        for width, run in itertools.groupby(bmp_columns()):
+            last = code + len(list(run)) - 1
+            if width != 1:
+                widths.append(b"%d %d %d" % (code, last, width * advance))
+            code = last + 1
+
+        objects[FONT] = (
+            b"<</Type /Font /Subtype /Type0 /BaseFont /ReceiptMono /Encoding /Identity-H"
+            b" /DescendantFonts [%d 0 R] /ToUnicode %d 0 R>>"
+        ) % (CID_FONT, TO_UNICODE)
+        objects[CID_FONT] = (
+            b"<</Type /Font /Subtype /CIDFontType2 /BaseFont /ReceiptMono"
+            b" /CIDSystemInfo <</Registry (Adobe) /Ordering (Identity) /Supplement 0>>"
+            b" /FontDescriptor %d 0 R /DW %d /W [%s] /CIDToGIDMap %d 0 R>>"
+        ) % (FONT_DESCRIPTOR, advance, b" ".join(widths), CID_TO_GID_MAP)
+        objects[FONT_DESCRIPTOR] = (
+            b"<</Type /FontDescriptor /FontName /ReceiptMono /Flags 5 /FontBBox [%s] /ItalicAngle 0"
+            b" /Ascent %d /Descent %d /CapHeight %d /StemV 80 /FontFile2 %d 0 R>>"
+        ) % (metrics["bbox"].encode(), ascent, metrics["descent"], ascent, FONT_FILE)
+        objects[FONT_FILE] = pdf_stream(
+            b"/Filter /FlateDecode /Length1 %d" % len(font_data), zlib.compress(font_data, 9)
+        )
+        objects[CID_TO_GID_MAP] = pdf_stream(b"/Filter /FlateDecode", zlib.compress(bytes(cid_to_gid), 9))
+        objects[TO_UNICODE] = pdf_stream(b"", to_unicode_cmap())
+        encode = encode_utf16
+    else:
+        encode, advance, ascent = encode_single_byte("cp1252"), 600, 629
+        objects[FONT] = b"<</Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding>>"
+
+    data = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+    offsets = {}
+    for number, body in objects.items():
+        offsets[number] = len(data)
+        data += pdf_object(number, body)
+    return PdfPrefix(data, offsets, encode, advance, ascent)
+
+
+class PdfRenderer(Renderer):
+    """PDF copy of the receipt, LINES_PER_PAGE lines per page.
+
+    Pages are written as soon as they fill up; the page tree and the xref
+    table, which need all of them, come at the end.
+    """
+
+    media_type = "application/pdf"
+
+    def begin(self) -> bytes:
+        self.prefix = pdf_prefix()
+        self.offsets = dict(self.prefix.offsets)
+        self.position = len(self.prefix.data)
+        self.next_object = FIRST_PAGE_OBJECT
+        self.page_objects = []
+        self.pending = []
+        self.width = 2 * MARGIN + self.layout.line_width * self.prefix.advance * FONT_SIZE / 1000
+        return self.prefix.data
+
+    def render(self, lines: List[Line]) -> bytes:
+        self.pending.extend(lines)
+        parts = []
+        while len(self.pending) >= LINES_PER_PAGE:
+            parts.append(self.page(self.pending[:LINES_PER_PAGE]))
+            del self.pending[:LINES_PER_PAGE]
+        return b"".join(parts)
+
+    def end(self) -> bytes:
+        parts = []
+        if self.pending or not self.page_objects:
+            parts.append(self.page(self.pending))
+        kids = b" ".join(b"%d 0 R" % number for number in self.page_objects)
+        parts.append(self.write(PAGES, b"<</Type /Pages /Kids [%s] /Count %d>>" % (kids, len(self.page_objects))))
+
+        size = self.next_object
+        xref = [b"xref\n0 %d\n0000000000 65535 f \n" % size]
+        xref.extend(
+            b"%010d 00000 n \n" % self.offsets[number] if number in self.offsets else b"0000000000 65535 f \n"
+            for number in range(1, size)
+        )
+        parts.append(b"".join(xref))
+        parts.append(
+            b"trailer\n<</Size %d /Root %d 0 R>>\nstartxref\n%d\n%%%%EOF\n" % (size, CATALOG, self.position)
+        )
+        return b"".join(parts)
+
+    def page(self, lines: List[Line]) -> bytes:
+        height = 2 * MARGIN + max(len(lines), 1) * LEADING
+        top = height - MARGIN - self.prefix.ascent * FONT_SIZE / 1000
+        commands = [b"BT /F1 %d Tf %d TL %d %.2f Td" % (FONT_SIZE, LEADING, MARGIN, top)]
+        for line in lines:
+            text = self.prefix.encode(line.text).hex().encode()
+            if line.bold:
+                # Fill and stroke the glyphs: bold without a second font
+                commands.append(b"2 Tr 0.3 w <%s> Tj 0 Tr T*" % text)
+            else:
+                commands.append(b"<%s> Tj T*" % text)
+        commands.append(b"ET")
+
+        contents, page = self.next_object, self.next_object + 1
+        self.next_object += 2
+        self.page_objects.append(page)
+        return self.write(contents, pdf_stream(b"/Filter /FlateDecode", zlib.compress(b"\n".join(commands)))) + \
+            self.write(page, (
+                b"<</Type /Page /Parent %d 0 R /MediaBox [0 0 %.2f %d]"
+                b" /Resources <</Font <</F1 %d 0 R>>>> /Contents %d 0 R>>"
+            ) % (PAGES, self.width, height, FONT, contents))
+
+    def write(self, number: int, body: bytes) -> bytes:
+        data = pdf_object(number, body)
+        self.offsets[number] = self.position
+        self.position += len(data)
+        return data
@@ -0,0 +1,21 @@
+from typing import List
+
+from apps.receipt_app.rendering.base import Renderer
+from apps.receipt_app.rendering.layout import Line
+
+
+class TextRenderer(Renderer):
+    """Plain UTF-8 text, lines separated by "\\n" without a trailing one."""
+
+    media_type = "text/plain; charset=utf-8"
+
+    def __init__(self, layout):
+        super().__init__(layout)
+        self.separator = ""
+
+    def render(self, lines: List[Line]) -> bytes:
+        if not lines:
+            return b""
+        text = self.separator + "\n".join([line.text for line in lines])
+        self.separator = "\n"
+        return text.encode()
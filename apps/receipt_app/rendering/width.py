@@ -0,0 +1,76 @@
+from bisect import bisect_right
+from typing import List
+
+from apps.receipt_app.rendering.width_table import STARTS, WIDTHS
+
+ELLIPSIS = "…"
+# C0/C1 controls would break the line structure of a receipt
+CONTROLS = str.maketrans({code: " " for code in (*range(0x20), *range(0x7F, 0xA0))})
+
+
+class CharWidths(dict):
+    """Width of a character, looked up in the table once per BMP character."""
+
+    def __missing__(self, char: str) -> int:
+        width = WIDTHS[bisect_right(STARTS, ord(char)) - 1]
+        if char <= "\uffff":
+            self[char] = width
+        return width
+
+
+char_width = CharWidths().__getitem__
+
+
+def text_width(text: str) -> int:
+    """Terminal columns the text takes: wide characters count 2, combining ones 0."""
+    if text.isascii():
+        return len(text)
+    return sum(map(char_width, text))
+
+
+def cut(text: str, width: int) -> int:
+    """Length of the longest prefix of `text` that fits in `width` columns."""
+    used = 0
+    for index, char in enumerate(text):
+        used += char_width(char)
+        if used > width:
+            return index
+    return len(text)
+
+
+def truncate(text: str, width: int) -> str:
+    if text_width(text) <= width:
+        return text
+    return text[:cut(text, width - 1)].rstrip() + ELLIPSIS
+
+
+def wrap(text: str, width: int, max_lines: int) -> List[str]:
+    """Splits text into at most `max_lines` lines of `width` columns.
+
+    Lines break between words; a word longer than a line is split where it
+    fills it, and whatever does not fit in `max_lines` is cut off with an
+    ellipsis.
+    """
+    lines = []
+    line, line_width = "", 0
+    for word in text.split():
+        word_width = text_width(word)
+        if line and line_width + 1 + word_width <= width:
+            line, line_width = f"{line} {word}", line_width + 1 + word_width
+            continue
+        if line:
+            lines.append(line)
+        while word_width > width:
+            end = cut(word, width) or 1
+            lines.append(word[:end])
+            word = word[end:]
+            word_width = text_width(word)
+        line, line_width = word, word_width
+        if len(lines) > max_lines:
+            break
+    if line:
+        lines.append(line)
+    if len(lines) > max_lines:
+        lines = lines[:max_lines]
+        lines[-1] = lines[-1][:cut(lines[-1], width - 1)].rstrip() + ELLIPSIS
+    return lines
@@ -0,0 +1,69 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterable, Tuple, Union
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from apps.receipt_app.dto import PaymentOutput, ProductOutput, ReceiptResponse
+from config import RECEIPT_FAST_RESPONSE
+
+receipt_response_adapter = TypeAdapter(ReceiptResponse)
+
+
+def to_decimal(value) -> Decimal:
+    # Same conversion pydantic applies to float input of a condecimal field
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+class ReceiptSerializer:
+    """Builds the body of endpoints returning a single ReceiptResponse.
+
+    By default the models are validated and FastAPI serializes them as usual.
+    With RECEIPT_FAST_RESPONSE the data, which the server built itself, is
+    trusted: models are assembled with `model_construct` and dumped straight to
+    JSON bytes by a prebuilt TypeAdapter, skipping both validation passes and
+    jsonable_encoder. The JSON is the same in both modes.
+    """
+
+    def build(
+            self,
+            receipt_id: int,
+            products: Iterable[Tuple[str, object, object, object]],
+            payment_type: str,
+            amount,
+            total,
+            rest,
+            created_at: datetime,
+    ) -> Union[ReceiptResponse, Response]:
+        """`products` yields (name, price, quantity, total) tuples."""
+        if not RECEIPT_FAST_RESPONSE:
+            return ReceiptResponse(
+                id=receipt_id,
+                products=[
+                    ProductOutput(name=name, price=price, quantity=quantity, total=line_total)
+                    for name, price, quantity, line_total in products
+                ],
+                payment=PaymentOutput(type=payment_type, amount=amount),
+                total=total,
+                rest=rest,
+                created_at=created_at,
+            )
+
+        receipt = ReceiptResponse.model_construct(
+            id=receipt_id,
+            products=[
+                ProductOutput.model_construct(
+                    name=name,
+                    price=to_decimal(price),
+                    quantity=to_decimal(quantity),
+                    total=to_decimal(line_total),
+                )
+                for name, price, quantity, line_total in products
+            ],
+            payment=PaymentOutput.model_construct(type=payment_type, amount=to_decimal(amount)),
+            total=to_decimal(total),
+            rest=to_decimal(rest),
+            created_at=created_at,
+        )
+        return Response(content=receipt_response_adapter.dump_json(receipt), media_type="application/json")
@@ -0,0 +1,43 @@
+from typing import Optional
+
+from general_services.invalidation_svc import InvalidationSvc
+from models import PaymentType
+
+PAYMENT_TYPES_TOPIC = "payment_types"
+
+
+class PaymentTypeRegistry:
+    """Process-wide name <-> id map of the static payment_types table.
+
+    Loaded once (at startup or on first use), so receipt endpoints never query
+    payment_types. Publishing on PAYMENT_TYPES_TOPIC (scripts/init_enums.py
+    does) makes every worker reload it on next use.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._names = {}
+
+    async def load(self):
+        rows = await PaymentType.all().values_list("id", "name")
+        self._ids = {name: id_ for id_, name in rows}
+        self._names = {id_: name for id_, name in rows}
+
+    def reset(self, data: dict = None):
+        self._ids = {}
+        self._names = {}
+
+    async def get_id(self, name: str) -> Optional[int]:
+        if not self._ids:
+            await self.load()
+        return self._ids.get(name)
+
+    async def get_name(self, payment_type_id: int) -> Optional[str]:
+        if payment_type_id not in self._names:
+            await self.load()
+        return self._names.get(payment_type_id)
+
+
+payment_type_registry = PaymentTypeRegistry()
+
+InvalidationSvc().subscribe(PAYMENT_TYPES_TOPIC, payment_type_registry.reset, reset=payment_type_registry.reset)
@@ -0,0 +1,171 @@
+from datetime import datetime, timezone
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple, Type
+
+from fastapi import HTTPException, status
+from tortoise import BaseDBAsyncClient, Model
+from tortoise.fields import Field
+from tortoise.transactions import in_transaction
+
+from apps.receipt_app.dto import ReceiptBatchResponse, ReceiptRequest
+from apps.receipt_app.money import line_total_cents, to_cents, to_milli
+from apps.receipt_app.services.payment_type_registry import payment_type_registry
+from config import RECEIPT_BATCH_MAX_PRODUCTS
+from general_services.idempotency_svc import Record
+from models import Product, Receipt, User
+
+RECEIPT_COLUMNS = ("user_id", "payment_type_id", "amount_cents", "total_cents", "products_count", "created_at")
+PRODUCT_COLUMNS = ("receipt_id", "name", "price_cents", "quantity_milli", "total_cents", "created_at")
+# Bound parameters per statement on backends without COPY (sqlite's default
+# SQLITE_MAX_VARIABLE_NUMBER before 3.32)
+MAX_QUERY_PARAMS = 999
+
+
+class ReceiptBatchSvc:
+    """Creates many receipts in one transaction.
+
+    Postgres takes receipt ids from the sequence up front and writes both
+    tables with COPY; sqlite gets multi-row INSERTs of MAX_QUERY_PARAMS values.
+    """
+
+    def __init__(self):
+        self._converters = {}
+
+    async def create_receipts(
+            self, user: User, receipts: Sequence[ReceiptRequest], record: Optional[Record] = None
+    ) -> ReceiptBatchResponse:
+        """Ids of the created receipts, in input order.
+
+        `record` (see IdempotencySvc) is awaited inside the transaction.
+        """
+        created_at = datetime.now(timezone.utc)
+        receipt_rows = await self.receipt_rows(user, receipts, created_at)
+        async with in_transaction("default") as connection:
+            write = self.copy if connection.capabilities.dialect == "postgres" else self.insert
+            response = ReceiptBatchResponse(ids=await write(connection, receipt_rows, receipts, created_at))
+            if record:
+                await record(connection, response)
+        return response
+
+    async def receipt_rows(
+            self, user: User, receipts: Sequence[ReceiptRequest], created_at: datetime
+    ) -> List[tuple]:
+        """Validates the whole batch before anything is written."""
+        if sum(len(receipt.products) for receipt in receipts) > RECEIPT_BATCH_MAX_PRODUCTS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"A batch may contain at most {RECEIPT_BATCH_MAX_PRODUCTS} products",
+            )
+
+        rows = []
+        for index, receipt in enumerate(receipts):
+            total_cents = sum(
+                line_total_cents(to_cents(p.price), to_milli(p.quantity)) for p in receipt.products
+            )
+            amount_cents = to_cents(receipt.payment.amount)
+            if amount_cents < total_cents:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Insufficient payment amount in receipt {index}",
+                )
+            payment_type_id = await payment_type_registry.get_id(receipt.payment.type)
+            if not payment_type_id:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Unknown payment type in receipt {index}",
+                )
+            rows.append((user.id, payment_type_id, amount_cents, total_cents, len(receipt.products), created_at))
+        return rows
+
+    def product_rows(
+            self, ids: List[int], receipts: Sequence[ReceiptRequest], created_at: datetime
+    ) -> Iterable[tuple]:
+        for receipt_id, receipt in zip(ids, receipts):
+            for product in receipt.products:
+                price_cents, quantity_milli = to_cents(product.price), to_milli(product.quantity)
+                yield (
+                    receipt_id, product.name, price_cents, quantity_milli,
+                    line_total_cents(price_cents, quantity_milli), created_at,
+                )
+
+    async def copy(
+            self,
+            connection: BaseDBAsyncClient,
+            receipt_rows: List[tuple],
+            receipts: Sequence[ReceiptRequest],
+            created_at: datetime,
+    ) -> List[int]:
+        async with connection.acquire_connection() as pg_connection:
+            ids = sorted(await pg_connection.fetchval(
+                "SELECT array_agg(nextval(pg_get_serial_sequence($1, 'id'))) FROM generate_series(1, $2)",
+                Receipt._meta.db_table,
+                len(receipt_rows),
+            ))
+            await pg_connection.copy_records_to_table(
+                Receipt._meta.db_table,
+                columns=("id",) + RECEIPT_COLUMNS,
+                records=[
+                    (receipt_id,) + self.to_db(Receipt, RECEIPT_COLUMNS, row, native=True)
+                    for receipt_id, row in zip(ids, receipt_rows)
+                ],
+            )
+            await pg_connection.copy_records_to_table(
+                Product._meta.db_table,
+                columns=PRODUCT_COLUMNS,
+                records=(
+                    self.to_db(Product, PRODUCT_COLUMNS, row, native=True)
+                    for row in self.product_rows(ids, receipts, created_at)
+                ),
+            )
+        return ids
+
+    async def insert(
+            self,
+            connection: BaseDBAsyncClient,
+            receipt_rows: List[tuple],
+            receipts: Sequence[ReceiptRequest],
+            created_at: datetime,
+    ) -> List[int]:
+        ids = []
+        for chunk in self.chunks(receipt_rows, len(RECEIPT_COLUMNS)):
+            rows = await connection.execute_query_dict(
+                self.insert_sql(Receipt, RECEIPT_COLUMNS, len(chunk)) + ' RETURNING "id"',
+                [value for row in chunk for value in self.to_db(Receipt, RECEIPT_COLUMNS, row)],
+            )
+            # Ids of one statement are assigned in VALUES order
+            ids.extend(sorted(row["id"] for row in rows))
+
+        product_rows = list(self.product_rows(ids, receipts, created_at))
+        for chunk in self.chunks(product_rows, len(PRODUCT_COLUMNS)):
+            await connection.execute_query(
+                self.insert_sql(Product, PRODUCT_COLUMNS, len(chunk)),
+                [value for row in chunk for value in self.to_db(Product, PRODUCT_COLUMNS, row)],
+            )
+        return ids
+
+    def chunks(self, rows: List[tuple], width: int) -> Iterable[List[tuple]]:
+        size = MAX_QUERY_PARAMS // width
+        for start in range(0, len(rows), size):
+            yield rows[start:start + size]
+
+    def insert_sql(self, model: Type[Model], columns: Tuple[str, ...], rows: int) -> str:
+        names = ", ".join(f'"{column}"' for column in columns)
+        values = ", ".join(["(" + ", ".join("?" * len(columns)) + ")"] * rows)
+        return f'INSERT INTO "{model._meta.db_table}" ({names}) VALUES {values}'
+
+    def to_db(self, model: Type[Model], columns: Tuple[str, ...], row: tuple, native: bool = False) -> tuple:
+        """Coerces values to the column types, as assigning them to a model instance would."""
+        key = (model, columns, native)
+        if key not in self._converters:
+            self._converters[key] = [self.converter(model._meta.fields_map[column], native) for column in columns]
+        return tuple(convert(value) for convert, value in zip(self._converters[key], row))
+
+    def converter(self, field: Field, native: bool) -> Callable:
+        to_python = field.to_python_value if field.field_type not in (datetime, str) else None
+        if native:
+            return to_python or (lambda value: value)
+
+        def convert(value):
+            value = to_python(value) if to_python else value
+            # sqlite3 does not bind aware datetimes
+            return str(value) if isinstance(value, datetime) else value
+        return convert
@@ -0,0 +1,119 @@
+import csv
+import io
+import json
+from typing import AsyncIterator, List, Optional, Tuple
+
+from tortoise.expressions import Q
+from tortoise.queryset import QuerySet, ValuesListQuery, ValuesQuery
+
+from apps.receipt_app.services.receipt_svc import PRODUCT_LIST_FIELDS, RECEIPT_LIST_FIELDS, ReceiptSvc
+from config import EXPORT_CHUNK_SIZE, EXPORT_PRODUCT_CHUNK_SIZE
+from enums import ExportFormatEnum
+from general_services.profiling import timing
+from models import Product
+
+CSV_COLUMNS = (
+    "receipt_id", "created_at", "payment_type", "payment_amount", "total", "rest",
+    "product_name", "price", "quantity", "product_total",
+)
+# Encoded text is handed to the response once it grows past this size
+FLUSH_SIZE = 64 * 1024
+
+
+class ReceiptExportSvc:
+    """Streams every receipt matching the get-receipts filters.
+
+    Receipts are read in id order, EXPORT_CHUNK_SIZE rows per query, each
+    chunk continuing after the last id of the previous one; their products
+    come in (receipt_id, id) keyset pages. Only one chunk of receipts, one page
+    of products and the receipt being written are held at a time, so memory
+    does not depend on how many rows the export returns.
+    """
+
+    def __init__(self):
+        self.receipt_svc = ReceiptSvc()
+
+    async def export(self, query: QuerySet, export_format: ExportFormatEnum) -> AsyncIterator[str]:
+        if export_format == ExportFormatEnum.CSV:
+            encode = self.encode_csv
+            yield ",".join(CSV_COLUMNS) + "\r\n"
+        else:
+            encode = self.encode_ndjson
+
+        buffer = []
+        size = 0
+        async for receipt in self.iter_receipts(query):
+            with timing("serialize"):
+                text = encode(receipt)
+            buffer.append(text)
+            size += len(text)
+            if size >= FLUSH_SIZE:
+                yield "".join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield "".join(buffer)
+
+    async def iter_receipts(self, query: QuerySet) -> AsyncIterator[dict]:
+        """JSON-ready ReceiptResponse dicts, as get-receipts returns them."""
+        last_id = None
+        while True:
+            receipts = await self.receipts_chunk_query(query, last_id)
+            if not receipts:
+                return
+
+            products = self.iter_products(receipts)
+            product = await anext(products, None)
+            for receipt in receipts:
+                items = []
+                while product is not None and product[0] == receipt["id"]:
+                    items.append(self.receipt_svc.product_dict(*product[1:]))
+                    product = await anext(products, None)
+                yield await self.receipt_svc.receipt_dict(receipt, items)
+
+            if len(receipts) < EXPORT_CHUNK_SIZE:
+                return
+            last_id = receipts[-1]["id"]
+
+    def receipts_chunk_query(self, query: QuerySet, last_id: Optional[int]) -> ValuesQuery:
+        """`RECEIPT_LIST_FIELDS` rows of the chunk of `query` after the receipt `last_id`."""
+        query = query.order_by("id")
+        if last_id is not None:
+            query = query.filter(id__gt=last_id)
+        return query.limit(EXPORT_CHUNK_SIZE).values(*RECEIPT_LIST_FIELDS)
+
+    async def iter_products(self, receipts: List[dict]) -> AsyncIterator[Tuple]:
+        """`PRODUCT_LIST_FIELDS` rows of the given receipts in (receipt_id, id) order."""
+        after = None
+        while True:
+            rows = await self.products_page_query(receipts, after)
+            for row in rows:
+                yield row[1:]
+            if len(rows) < EXPORT_PRODUCT_CHUNK_SIZE:
+                return
+            after = rows[-1][1], rows[-1][0]
+
+    def products_page_query(self, receipts: List[dict], after: Optional[Tuple[int, int]]) -> ValuesListQuery:
+        """A page of (id, *PRODUCT_LIST_FIELDS) rows of `receipts`, after the (receipt_id, id) `after`."""
+        filters = self.receipt_svc.products_of(receipts)
+        if after is not None:
+            receipt_id, product_id = after
+            filters &= Q(receipt_id__gt=receipt_id) | Q(receipt_id=receipt_id, id__gt=product_id)
+        return Product.filter(filters).order_by("receipt_id", "id").limit(
+            EXPORT_PRODUCT_CHUNK_SIZE
+        ).values_list("id", *PRODUCT_LIST_FIELDS)
+
+    def encode_ndjson(self, receipt: dict) -> str:
+        return json.dumps(receipt, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+    def encode_csv(self, receipt: dict) -> str:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        head = (
+            receipt["id"], receipt["created_at"], receipt["payment"]["type"],
+            receipt["payment"]["amount"], receipt["total"], receipt["rest"],
+        )
+        if not receipt["products"]:
+            writer.writerow(head + ("", "", "", ""))
+        for product in receipt["products"]:
+            writer.writerow(head + (product["name"], product["price"], product["quantity"], product["total"]))
+        return buffer.getvalue()
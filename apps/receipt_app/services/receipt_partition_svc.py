@@ -0,0 +1,122 @@
+import gzip
+import os
+import re
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+from tortoise import Tortoise
+from tortoise.transactions import in_transaction
+
+from config import RECEIPT_ARCHIVE_AFTER_MONTHS, RECEIPT_ARCHIVE_DIR, RECEIPT_PARTITION_MONTHS_AHEAD
+from models import Product, Receipt
+
+# Products reference receipts, so they are archived first
+PARTITIONED_TABLES = (Product._meta.db_table, Receipt._meta.db_table)
+PARTITION_MONTH = re.compile(r"_p(\d{4})_(\d{2})$")
+
+
+def add_months(day: date, months: int) -> date:
+    """First day of the month `months` after the month of `day`."""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class ReceiptPartitionSvc:
+    """Monthly partitions of receipts and products (see migration 12).
+
+    Both tables are partitioned by created_at, one partition per UTC month
+    named <table>_pYYYY_MM, plus a default partition for rows of months that
+    have none. Months are created ahead by `create_partitions`, run daily by
+    the `partitions` compose service, which also moves rows that went to the
+    default partition into their month; `archive` dumps old months to
+    gzipped CSV files and detaches them.
+    """
+
+    def __init__(self):
+        self.connection = Tortoise.get_connection("default")
+
+    async def create_partitions(self, months_ahead: int = RECEIPT_PARTITION_MONTHS_AHEAD) -> int:
+        """Creates the missing partitions up to `months_ahead` months from now; returns how many.
+
+        Also creates the partitions of any other month whose rows went to the
+        default partitions, moving those rows into them.
+        """
+        oldest, newest = (
+            ", ".join(f'(SELECT {func}("created_at") FROM "{table}_default")' for table in PARTITIONED_TABLES)
+            for func in ("MIN", "MAX")
+        )
+        rows = await self.connection.execute_query_dict(
+            'SELECT "create_month_partitions"('
+            f"$1::text[], LEAST(now(), {oldest}), GREATEST(now() + $2 * interval '1 month', {newest})"
+            ') AS "created"',
+            # Referenced tables first
+            [list(reversed(PARTITIONED_TABLES)), months_ahead],
+        )
+        return rows[0]["created"]
+
+    async def partitions(self, table: str) -> Dict[date, str]:
+        """Month partitions of `table` by their first day."""
+        rows = await self.connection.execute_query_dict(
+            'SELECT c."relname" AS "name" FROM "pg_inherits" i JOIN "pg_class" c ON c."oid" = i."inhrelid"'
+            ' WHERE i."inhparent" = $1::regclass',
+            [table],
+        )
+        months = {}
+        for row in rows:
+            match = PARTITION_MONTH.search(row["name"])
+            if match and row["name"] == f"{table}_p{match[1]}_{match[2]}":
+                months[date(int(match[1]), int(match[2]), 1)] = row["name"]
+        return dict(sorted(months.items()))
+
+    async def archive(
+            self,
+            before: date = None,
+            output_dir: str = RECEIPT_ARCHIVE_DIR,
+            keep_tables: bool = False,
+    ) -> List[Path]:
+        """Archives every month that ends on or before `before`.
+
+        By default the months older than RECEIPT_ARCHIVE_AFTER_MONTHS. Each
+        partition is written to <output_dir>/<partition>.csv.gz before it is
+        detached, then dropped, or with `keep_tables` left as a standalone
+        table. Returns the written files.
+        """
+        if before is None:
+            before = add_months(datetime.now(timezone.utc).date(), -RECEIPT_ARCHIVE_AFTER_MONTHS)
+        os.makedirs(output_dir, exist_ok=True)
+
+        months = {}
+        for table in PARTITIONED_TABLES:
+            for month, name in (await self.partitions(table)).items():
+                if add_months(month, 1) <= before:
+                    months.setdefault(month, []).append((table, name))
+
+        files = []
+        for month, partitions in sorted(months.items()):
+            for _, name in partitions:
+                files.append(await self.dump(name, Path(output_dir)))
+            async with in_transaction("default") as connection:
+                for table, name in partitions:
+                    await connection.execute_script(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"')
+                    if keep_tables:
+                        # The detached products would still reference the receipts being detached
+                        for row in await connection.execute_query_dict(
+                            'SELECT "conname" FROM "pg_constraint"'
+                            ' WHERE "conrelid" = $1::regclass AND "contype" = \'f\'',
+                            [name],
+                        ):
+                            await connection.execute_script(f'ALTER TABLE "{name}" DROP CONSTRAINT "{row["conname"]}"')
+                    else:
+                        await connection.execute_script(f'DROP TABLE "{name}"')
+        return files
+
+    async def dump(self, name: str, output_dir: Path) -> Path:
+        """Writes the partition as gzipped CSV with a header row."""
+        path = output_dir / f"{name}.csv.gz"
+        partial = path.with_name(path.name + ".part")
+        async with self.connection.acquire_connection() as pg_connection:
+            with gzip.open(partial, "wb", compresslevel=6) as output:
+                await pg_connection.copy_from_table(name, output=output, format="csv", header=True)
+        partial.replace(path)
+        return path
@@ -0,0 +1,91 @@
+from decimal import ROUND_HALF_EVEN, Decimal
+from typing import List
+
+from tortoise.expressions import RawSQL
+from tortoise.functions import Count, Max, Min, Sum
+from tortoise.queryset import QuerySet
+
+from apps.receipt_app.services.payment_type_registry import payment_type_registry
+from apps.receipt_app.money import money
+from enums import StatsPeriodEnum
+
+# Start of the UTC day/week (Monday)/month of created_at as YYYY-MM-DD
+PERIOD_SQL = {
+    "postgres": {
+        StatsPeriodEnum.DAY: "to_char(created_at AT TIME ZONE 'UTC', 'YYYY-MM-DD')",
+        StatsPeriodEnum.WEEK: "to_char(date_trunc('week', created_at AT TIME ZONE 'UTC'), 'YYYY-MM-DD')",
+        StatsPeriodEnum.MONTH: "to_char(created_at AT TIME ZONE 'UTC', 'YYYY-MM-01')",
+    },
+    "sqlite": {
+        StatsPeriodEnum.DAY: "date(created_at)",
+        StatsPeriodEnum.WEEK: "date(created_at, 'weekday 0', '-6 days')",
+        StatsPeriodEnum.MONTH: "strftime('%Y-%m-01', created_at)",
+    },
+}
+STATS_FIELDS = ("receipts", "total_sum", "total_min", "total_max")
+
+
+class ReceiptStatsSvc:
+    """count/sum/avg/min/max of `total_cents`, grouped in SQL.
+
+    The average is taken from the exact sum and count rather than AVG, which
+    returns a float on sqlite.
+    """
+
+    async def stats(self, query: QuerySet, period: StatsPeriodEnum) -> dict:
+        """`query` is a get-receipts list query; its ordering is dropped."""
+        by_payment_type = await self.payment_type_query(query)
+        by_period = await self.period_query(query, period)
+
+        return {
+            **self.total_stats(by_payment_type),
+            "by_payment_type": [
+                {
+                    "payment_type": await payment_type_registry.get_name(row["payment_type_id"]),
+                    **self.format_row(row),
+                }
+                for row in sorted(by_payment_type, key=lambda row: row["payment_type_id"])
+            ],
+            "by_period": [{"period": row["period"], **self.format_row(row)} for row in by_period],
+        }
+
+    def payment_type_query(self, query: QuerySet):
+        return self.aggregate(query).group_by("payment_type_id").values("payment_type_id", *STATS_FIELDS)
+
+    def period_query(self, query: QuerySet, period: StatsPeriodEnum):
+        period_sql = PERIOD_SQL[query.model._meta.db.capabilities.dialect][period]
+        return self.aggregate(query).annotate(
+            period=RawSQL(period_sql)
+        ).group_by("period").order_by("period").values("period", *STATS_FIELDS)
+
+    def aggregate(self, query: QuerySet) -> QuerySet:
+        return query.order_by().annotate(
+            receipts=Count("id"),
+            total_sum=Sum("total_cents"),
+            total_min=Min("total_cents"),
+            total_max=Max("total_cents"),
+        )
+
+    def total_stats(self, groups: List[dict]) -> dict:
+        """Combines per-group aggregates into the overall ones."""
+        count = sum(row["receipts"] for row in groups)
+        if not count:
+            return {"count": 0, "sum": None, "avg": None, "min": None, "max": None}
+        return self.format_row({
+            "receipts": count,
+            "total_sum": sum(row["total_sum"] for row in groups),
+            "total_min": min(row["total_min"] for row in groups),
+            "total_max": max(row["total_max"] for row in groups),
+        })
+
+    def format_row(self, row: dict) -> dict:
+        # Postgres sums bigint into numeric
+        total_sum = int(row["total_sum"])
+        avg_cents = (Decimal(total_sum) / row["receipts"]).to_integral_value(ROUND_HALF_EVEN)
+        return {
+            "count": row["receipts"],
+            "sum": money(total_sum),
+            "avg": money(int(avg_cents)),
+            "min": money(row["total_min"]),
+            "max": money(row["total_max"]),
+        }
@@ -0,0 +1,176 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from pydantic_core import to_jsonable_python
+from tortoise.expressions import Q
+from tortoise.queryset import QuerySet, ValuesListQuery
+
+from apps.receipt_app.money import from_milli, money, to_cents_ceil
+from apps.receipt_app.services.payment_type_registry import payment_type_registry
+from general_services.db_router import db_for_read
+from general_services.profiling import timing
+from models import Product, Receipt, User
+
+RECEIPT_LIST_FIELDS = ("id", "amount_cents", "total_cents", "payment_type_id", "created_at")
+PRODUCT_LIST_FIELDS = ("receipt_id", "name", "price_cents", "quantity_milli", "total_cents")
+# The receipt, its payment type name and its products as a JSON array of
+# [name, price_cents, quantity_milli, total_cents] in one statement
+RECEIPT_DETAIL_SQL = {
+    "postgres": """
+        SELECT r."id", r."amount_cents", r."total_cents", r."created_at", pt."name" AS "payment_type",
+            (
+                SELECT COALESCE(
+                    json_agg(json_build_array(p."name", p."price_cents", p."quantity_milli", p."total_cents")
+                             ORDER BY p."id"),
+                    '[]'
+                )
+                FROM "products" p WHERE p."receipt_id" = r."id" AND p."created_at" = r."created_at"
+            ) AS "products"
+        FROM "receipts" r JOIN "payment_types" pt ON pt."id" = r."payment_type_id"
+        WHERE r."id" = $1 AND r."user_id" = $2""",
+    "sqlite": """
+        SELECT r."id", r."amount_cents", r."total_cents", r."created_at", pt."name" AS "payment_type",
+            (
+                SELECT json_group_array(json_array(p."name", p."price_cents", p."quantity_milli", p."total_cents"))
+                FROM (
+                    SELECT * FROM "products"
+                    WHERE "receipt_id" = r."id" AND "created_at" = r."created_at" ORDER BY "id"
+                ) p
+            ) AS "products"
+        FROM "receipts" r JOIN "payment_types" pt ON pt."id" = r."payment_type_id"
+        WHERE r."id" = ? AND r."user_id" = ?""",
+}
+
+
+class ReceiptSvc:
+    async def build_filters(
+            self,
+            user: User,
+            date_from: Optional[datetime] = None,
+            date_to: Optional[datetime] = None,
+            min_total: Optional[float] = None,
+            payment_type: Optional[str] = None,
+    ) -> Q:
+        filters = Q(user=user)
+
+        if date_from:
+            filters &= Q(created_at__gte=date_from)
+        if date_to:
+            filters &= Q(created_at__lte=date_to)
+        if min_total is not None:
+            filters &= Q(total_cents__gte=to_cents_ceil(Decimal(str(min_total))))
+        if payment_type:
+            payment_type_id = await payment_type_registry.get_id(payment_type)
+            # Unknown names match nothing, as the join on payment_types did
+            filters &= Q(payment_type_id=payment_type_id) if payment_type_id else Q(id__in=[])
+        return filters
+
+    async def list_query(
+            self,
+            user: User,
+            date_from: Optional[datetime] = None,
+            date_to: Optional[datetime] = None,
+            min_total: Optional[float] = None,
+            payment_type: Optional[str] = None,
+            cursor: Optional[str] = None,
+    ) -> QuerySet:
+        """Query behind get-receipts, without offset/limit."""
+        filters = await self.build_filters(user, date_from, date_to, min_total, payment_type)
+        if cursor:
+            filters &= self.after_cursor(cursor)
+
+        return Receipt.filter(filters).order_by("-created_at", "-id")
+
+    async def get_detail(self, user_id: int, receipt_id: int) -> Optional[dict]:
+        """The user's receipt for get-receipt-by-id, read with RECEIPT_DETAIL_SQL.
+
+        `products` is a list of (name, price_cents, quantity_milli,
+        total_cents) in id order; `payment_type` is the name.
+        """
+        db = db_for_read(Receipt)
+        rows = await db.execute_query_dict(RECEIPT_DETAIL_SQL[db.capabilities.dialect], [receipt_id, user_id])
+        if not rows:
+            return None
+        receipt = rows[0]
+        receipt["products"] = json.loads(receipt["products"])
+        receipt["created_at"] = Receipt._meta.fields_map["created_at"].to_python_value(receipt["created_at"])
+        return receipt
+
+    async def serialize_list(self, receipts: List[dict]) -> List[dict]:
+        """JSON-ready ReceiptResponse dicts for `RECEIPT_LIST_FIELDS` rows.
+
+        Products of the whole page come from a single `values_list` query and
+        are written out as plain dicts, without ORM instances or per-product
+        validation.
+        """
+        products_by_receipt = {receipt["id"]: [] for receipt in receipts}
+        if products_by_receipt:
+            rows = await self.products_query(receipts)
+            with timing("serialize"):
+                for receipt_id, *product in rows:
+                    products_by_receipt[receipt_id].append(self.product_dict(*product))
+
+        with timing("serialize"):
+            return [
+                await self.receipt_dict(receipt, products_by_receipt[receipt["id"]])
+                for receipt in receipts
+            ]
+
+    def products_query(self, receipts: List[dict]) -> ValuesListQuery:
+        """`PRODUCT_LIST_FIELDS` rows of the products of a page of receipts."""
+        return Product.filter(self.products_of(receipts)).order_by("id").values_list(*PRODUCT_LIST_FIELDS)
+
+    def products_of(self, receipts: List[dict]) -> Q:
+        """Products of the receipts; the created_at range lets Postgres skip
+        the partitions none of them is in.
+        """
+        created_at = [receipt["created_at"] for receipt in receipts]
+        return Q(
+            receipt_id__in=[receipt["id"] for receipt in receipts],
+            created_at__gte=min(created_at),
+            created_at__lte=max(created_at),
+        )
+
+    def product_dict(self, name: str, price_cents: int, quantity_milli: int, total_cents: int) -> dict:
+        return {
+            "name": name,
+            "price": money(price_cents),
+            "quantity": str(from_milli(quantity_milli)),
+            "total": money(total_cents),
+        }
+
+    async def receipt_dict(self, receipt: dict, products: List[dict]) -> dict:
+        total_cents = receipt["total_cents"]
+        return {
+            "id": receipt["id"],
+            "products": products,
+            "payment": {
+                "type": await payment_type_registry.get_name(receipt["payment_type_id"]),
+                "amount": money(total_cents),
+            },
+            "total": money(total_cents),
+            "rest": money(max(receipt["amount_cents"] - total_cents, 0)),
+            "created_at": to_jsonable_python(receipt["created_at"]),
+        }
+
+    def after_cursor(self, cursor: str) -> Q:
+        """Receipts that come after the cursor in (-created_at, -id) order."""
+        created_at, receipt_id = self.decode_cursor(cursor)
+        return Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=receipt_id)
+
+    def encode_cursor(self, created_at: datetime, receipt_id: int) -> str:
+        raw = f"{created_at.isoformat()}|{receipt_id}".encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, cursor: str) -> Tuple[datetime, int]:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+            created_at, receipt_id = raw.split("|")
+            return datetime.fromisoformat(created_at), int(receipt_id)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
@@ -0,0 +1,102 @@
+import base64
+import hashlib
+from typing import NamedTuple, Optional
+
+from config import (
+    RECEIPT_TEXT_CACHE_ENABLED,
+    RECEIPT_TEXT_CACHE_MAX_BYTES,
+    RECEIPT_TEXT_CACHE_MAX_ITEM_BYTES,
+    RECEIPT_TEXT_CACHE_MAXSIZE,
+    RECEIPT_TEXT_CACHE_TTL,
+)
+from enums import ReceiptFormatEnum
+from general_services.metrics_svc import MetricsSvc
+from general_services.redis_svc import RedisSvc
+from general_services.ttl_cache import TTLCache
+
+
+class ReceiptText(NamedTuple):
+    body: bytes
+    etag: str
+
+
+receipt_text_cache = TTLCache(
+    maxsize=RECEIPT_TEXT_CACHE_MAXSIZE,
+    ttl=RECEIPT_TEXT_CACHE_TTL,
+    maxbytes=RECEIPT_TEXT_CACHE_MAX_BYTES,
+    sizeof=lambda text: len(text.body),
+)
+redis_stats = {"hits": 0, "misses": 0}
+
+
+class ReceiptTextCacheSvc:
+    """Rendered get-receipt-text bodies keyed by (receipt_id, line_width, format).
+
+    Receipts do not change after creation, so entries are never invalidated,
+    only evicted: an in-process LRU bounded by entries and bytes sits in
+    front of Redis. The ETag is a hash of the body, so a matching
+    If-None-Match is answered from either layer without touching the DB.
+    """
+
+    def __init__(self):
+        self.redis_svc = RedisSvc()
+
+    async def get(
+            self, receipt_id: int, line_width: int, receipt_format: ReceiptFormatEnum
+    ) -> Optional[ReceiptText]:
+        if not RECEIPT_TEXT_CACHE_ENABLED:
+            return None
+
+        key = (receipt_id, line_width, receipt_format)
+        text = receipt_text_cache.get(key)
+        if text is not None:
+            return text
+
+        stored = await self.redis_svc.get(self.cache_key(*key))
+        if not stored:
+            redis_stats["misses"] += 1
+            return None
+        redis_stats["hits"] += 1
+        text = ReceiptText(base64.b64decode(stored["body"]), stored["etag"])
+        receipt_text_cache.set(key, text)
+        return text
+
+    async def set(
+            self, receipt_id: int, line_width: int, receipt_format: ReceiptFormatEnum, body: bytes
+    ) -> ReceiptText:
+        text = self.make(body)
+        if RECEIPT_TEXT_CACHE_ENABLED and len(body) <= RECEIPT_TEXT_CACHE_MAX_ITEM_BYTES:
+            key = (receipt_id, line_width, receipt_format)
+            await self.redis_svc.set(
+                self.cache_key(*key),
+                {"body": base64.b64encode(body).decode(), "etag": text.etag},
+                ex=RECEIPT_TEXT_CACHE_TTL,
+            )
+            receipt_text_cache.set(key, text)
+        return text
+
+    def cache_key(self, receipt_id: int, line_width: int, receipt_format: ReceiptFormatEnum) -> str:
+        return f"receipt-text:{receipt_id}:{line_width}:{receipt_format.value}"
+
+    def make(self, body: bytes) -> ReceiptText:
+        return ReceiptText(body, f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"')
+
+    def not_modified(self, if_none_match: Optional[str], etag: str) -> bool:
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag in tags
+
+
+def receipt_text_cache_stats() -> dict:
+    requests = redis_stats["hits"] + redis_stats["misses"]
+    return {
+        "local": receipt_text_cache.stats(),
+        "redis": {
+            **redis_stats,
+            "hit_ratio": round(redis_stats["hits"] / requests, 4) if requests else 0.0,
+        },
+    }
+
+
+MetricsSvc().register("receipt_text_cache", receipt_text_cache_stats)
@@ -0,0 +1,100 @@
+from typing import AsyncIterator, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from apps.receipt_app.rendering import RENDERERS, get_layout
+from apps.receipt_app.services.payment_type_registry import payment_type_registry
+from config import RECEIPT_TEXT_CACHE_MAX_ITEM_BYTES, RECEIPT_TEXT_CHUNK_SIZE
+from enums import ReceiptFormatEnum
+from general_services.profiling import timing
+from models import Product, Receipt
+
+TEXT_PRODUCT_FIELDS = ("id", "name", "price_cents", "quantity_milli", "total_cents")
+# Rendered bytes are handed to the response once they grow past this size
+FLUSH_SIZE = 64 * 1024
+
+
+class ReceiptTextSvc:
+    """Renders a receipt for get-receipt-text in one of ReceiptFormatEnum.
+
+    Products are read in id order, RECEIPT_TEXT_CHUNK_SIZE rows per query,
+    laid out by the ReceiptLayout of the line width and passed to the format's
+    renderer as they arrive; the totals come from the receipt row. Only one
+    page of products is held at a time, and output up to
+    RECEIPT_TEXT_CACHE_MAX_ITEM_BYTES: a larger document is streamed.
+    """
+
+    async def get_receipt(self, receipt_id: int) -> Receipt:
+        receipt = await Receipt.get_or_none(id=receipt_id)
+        if not receipt:
+            raise HTTPException(status_code=404, detail="Receipt not found")
+        return receipt
+
+    async def product_page(self, receipt: Receipt, after_id: int = 0) -> List[Tuple]:
+        return await Product.filter(
+            receipt_id=receipt.id, created_at=receipt.created_at, id__gt=after_id
+        ).order_by("id").limit(
+            RECEIPT_TEXT_CHUNK_SIZE
+        ).values_list(*TEXT_PRODUCT_FIELDS)
+
+    def is_last_page(self, page: List[Tuple]) -> bool:
+        return len(page) < RECEIPT_TEXT_CHUNK_SIZE
+
+    async def buffer(self, parts: AsyncIterator[bytes]) -> Tuple[Optional[bytes], AsyncIterator[bytes]]:
+        """The whole body of `parts` if it fits in RECEIPT_TEXT_CACHE_MAX_ITEM_BYTES.
+
+        Otherwise the body is None and the parts, the buffered prefix first,
+        are left to be streamed.
+        """
+        buffer, size = [], 0
+        async for part in parts:
+            buffer.append(part)
+            size += len(part)
+            if size > RECEIPT_TEXT_CACHE_MAX_ITEM_BYTES:
+                return None, self.resume(buffer, parts)
+        return b"".join(buffer), None
+
+    async def resume(self, buffer: List[bytes], parts: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        yield b"".join(buffer)
+        async for part in parts:
+            yield part
+
+    def media_type(self, receipt_format: ReceiptFormatEnum) -> str:
+        return RENDERERS[receipt_format].media_type
+
+    async def render(
+            self,
+            receipt: Receipt,
+            line_width: int,
+            first_page: List[Tuple],
+            receipt_format: ReceiptFormatEnum = ReceiptFormatEnum.TEXT,
+    ) -> AsyncIterator[bytes]:
+        """The document in parts; `first_page` is the receipt's first `product_page`."""
+        with timing("render"):
+            layout = get_layout(line_width)
+            renderer = RENDERERS[receipt_format](layout)
+            buffer = [renderer.begin(), renderer.render(layout.header)]
+        size = 0
+        page = first_page
+        while True:
+            with timing("render"):
+                lines = []
+                for _, name, price_cents, quantity_milli, total_cents in page:
+                    lines.extend(layout.product(name, price_cents, quantity_milli, total_cents))
+                part = renderer.render(lines)
+            buffer.append(part)
+            size += len(part)
+            if size >= FLUSH_SIZE:
+                yield b"".join(buffer)
+                buffer, size = [], 0
+            if self.is_last_page(page):
+                break
+            page = await self.product_page(receipt, after_id=page[-1][0])
+
+        payment_type_name = await payment_type_registry.get_name(receipt.payment_type_id)
+        with timing("render"):
+            buffer.append(renderer.render(layout.footer(
+                receipt.total_cents, receipt.amount_cents, payment_type_name, receipt.created_at
+            )))
+            buffer.append(renderer.end())
+        yield b"".join(buffer)
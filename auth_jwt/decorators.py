@@ -3,8 +3,8 @@ from functools import wraps
 from fastapi import Request
 from fastapi.responses import RedirectResponse
 from auth_jwt.helpers import get_current_user
-from general_services.redis_svc import RedisSvc
-from models import User
+from auth_jwt.services.token_svc import TokenSvc
+from auth_jwt.services.user_cache_svc import UserCacheSvc
 
 
 def login_required(func):
@@ -15,13 +15,12 @@ def login_required(func):
         if not token_data:
             return RedirectResponse(url="/api/login")
 
-        request.state.user = await User.get(id=token_data.user_id)
+        request.state.user = await UserCacheSvc().get_user(token_data.user_id)
         if not request.state.user.is_active:
-            redis_svc = RedisSvc()
-            redis_svc.delete(request.state.user.id)
+            token_svc = TokenSvc()
+            await token_svc.revoke_tokens(request.state.user.id)
             return RedirectResponse(url="/api/login")
 
         return await func(*args, **kwargs)
 
     return wrapper
-
@@ -12,7 +12,7 @@ async def get_current_user(request):
     if not token:
         return None
     try:
-        payload = token_svc.verify_token(token, TokenTypeEnum.ACCESS)
+        payload = await token_svc.verify_token(token, TokenTypeEnum.ACCESS)
         user_id = payload.get("user_id")
         if user_id is None:
             return None
@@ -1,18 +1,60 @@
 import datetime
+import hashlib
+import time
 from typing import Optional
 
 import jwt
 from fastapi import HTTPException, status
 from jwt import DecodeError, ExpiredSignatureError, InvalidIssuerError
 
-from config import ALGORITHM, ISSUER, TOKEN_SECRET_KEY
+from config import (
+    ALGORITHM,
+    ISSUER,
+    TOKEN_SECRET_KEY,
+    TOKEN_VERIFY_CACHE_ENABLED,
+    TOKEN_VERIFY_CACHE_MAXSIZE,
+    TOKEN_VERIFY_CACHE_SECONDS,
+)
 from enums import TokenTypeEnum
+from general_services.invalidation_svc import InvalidationSvc
+from general_services.metrics_svc import MetricsSvc
 from general_services.redis_svc import RedisSvc
+from general_services.ttl_cache import TTLCache
+
+TOKEN_TOPIC = "auth"
+
+# Access tokens that already passed the full check, keyed by fingerprint and
+# kept no longer than TOKEN_VERIFY_CACHE_SECONDS or their own `exp`
+verified_tokens = TTLCache(maxsize=TOKEN_VERIFY_CACHE_MAXSIZE, ttl=TOKEN_VERIFY_CACHE_SECONDS)
+# user_id -> monotonic time of the last login/refresh/logout; cached tokens
+# verified before it are stale
+_revoked_at = {}
+
+
+def fingerprint(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:32]
+
+
+def _revoke(data: dict):
+    now = time.monotonic()
+    _revoked_at[data["user_id"]] = now
+    if len(_revoked_at) > TOKEN_VERIFY_CACHE_MAXSIZE:
+        # cached entries never outlive the TTL, neither do older revocations
+        horizon = now - TOKEN_VERIFY_CACHE_SECONDS
+        for user_id, revoked_at in list(_revoked_at.items()):
+            if revoked_at < horizon:
+                del _revoked_at[user_id]
+
+
+def _reset():
+    verified_tokens.clear()
+    _revoked_at.clear()
 
 
 class TokenSvc:
     def __init__(self):
         self.redis_svc = RedisSvc()
+        self.invalidation_svc = InvalidationSvc()
 
     def create_access_token(
         self, data: dict, expires_delta: Optional[datetime.timedelta]
@@ -33,7 +75,31 @@ class TokenSvc:
         encoded_jwt = jwt.encode(to_encode, TOKEN_SECRET_KEY, algorithm=ALGORITHM)
         return encoded_jwt
 
-    def verify_token(self, token: str, type_: TokenTypeEnum = None):
+    async def save_tokens(self, user_id: int, access_token: str, refresh_token: str):
+        """Stores the fingerprints of the user's only valid token pair."""
+        await self.redis_svc.hset_many(
+            user_id,
+            {
+                TokenTypeEnum.ACCESS.value: fingerprint(access_token),
+                TokenTypeEnum.REFRESH.value: fingerprint(refresh_token),
+            },
+        )
+        await self.invalidation_svc.publish(TOKEN_TOPIC, {"user_id": user_id})
+
+    async def revoke_tokens(self, user_id: int):
+        await self.redis_svc.delete(user_id)
+        await self.invalidation_svc.publish(TOKEN_TOPIC, {"user_id": user_id})
+
+    async def verify_token(self, token: str, type_: TokenTypeEnum = None):
+        token_fingerprint = fingerprint(token)
+        use_cache = TOKEN_VERIFY_CACHE_ENABLED and type_ == TokenTypeEnum.ACCESS
+        if use_cache:
+            cached = verified_tokens.get(token_fingerprint)
+            if cached is not None:
+                payload, verified_at = cached
+                if _revoked_at.get(payload["user_id"], -1.0) < verified_at:
+                    return payload
+
         try:
             payload = jwt.decode(
                 token,
@@ -42,25 +108,32 @@ class TokenSvc:
                 options={"verify_exp": True, "verify_iat": True},
                 issuer=ISSUER,
             )
-
-            auth = self.redis_svc.hget(payload["user_id"], "auth")
-
-            if not auth or (type_ == TokenTypeEnum.ACCESS and token != auth.get("access_token")):
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Fake or non-working token",
-                )
-
-            if not auth or (type_ == TokenTypeEnum.REFRESH and token != auth.get("refresh_token")):
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Fake or non-working token",
-                )
-
-            return payload
         except ExpiredSignatureError:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has expired")
         except InvalidIssuerError:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token issuer")
         except DecodeError:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+
+        verified_at = time.monotonic()
+        if type_ is None:
+            stored = await self.redis_svc.hget(payload["user_id"], TokenTypeEnum.ACCESS.value)
+            is_valid = stored is not None
+        else:
+            stored = await self.redis_svc.hget(payload["user_id"], type_.value)
+            is_valid = stored == token_fingerprint
+        if not is_valid:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Fake or non-working token",
+            )
+
+        if use_cache:
+            ttl = min(TOKEN_VERIFY_CACHE_SECONDS, payload["exp"] - time.time())
+            if ttl > 0:
+                verified_tokens.set(token_fingerprint, (payload, verified_at), ttl=ttl)
+        return payload
+
+
+InvalidationSvc().subscribe(TOKEN_TOPIC, _revoke, reset=_reset)
+MetricsSvc().register("token_verify_cache", verified_tokens.stats)
@@ -0,0 +1,54 @@
+from tortoise.signals import post_delete, post_save
+
+from config import USER_CACHE_ENABLED, USER_CACHE_MAXSIZE, USER_CACHE_TTL
+from general_services.invalidation_svc import InvalidationSvc
+from general_services.metrics_svc import MetricsSvc
+from general_services.ttl_cache import TTLCache
+from models import User
+
+USER_TOPIC = "user"
+
+user_cache = TTLCache(maxsize=USER_CACHE_MAXSIZE, ttl=USER_CACHE_TTL)
+
+
+class UserCacheSvc:
+    """Caches User rows loaded by login_required.
+
+    Entries are dropped on every worker when a user is saved or deleted through
+    the ORM. Bulk `User.filter(...).update(...)` bypasses model signals, so
+    callers doing that must call `invalidate` themselves.
+    """
+
+    def __init__(self):
+        self.invalidation_svc = InvalidationSvc()
+
+    async def get_user(self, user_id: int) -> User:
+        if not USER_CACHE_ENABLED:
+            return await User.get(id=user_id)
+        user = user_cache.get(user_id)
+        if user is None:
+            user = await User.get(id=user_id)
+            user_cache.set(user_id, user)
+        return user
+
+    async def invalidate(self, user_id: int):
+        await self.invalidation_svc.publish(USER_TOPIC, {"user_id": user_id})
+
+
+InvalidationSvc().subscribe(
+    USER_TOPIC,
+    lambda data: user_cache.pop(data["user_id"]),
+    reset=user_cache.clear,
+)
+MetricsSvc().register("user_cache", user_cache.stats)
+
+
+@post_save(User)
+async def _user_saved(sender, instance, created, using_db, update_fields):
+    if not created:
+        await UserCacheSvc().invalidate(instance.id)
+
+
+@post_delete(User)
+async def _user_deleted(sender, instance, using_db):
+    await UserCacheSvc().invalidate(instance.id)
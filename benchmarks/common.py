@@ -0,0 +1,158 @@
+import asyncio
+import multiprocessing
+import os
+import statistics
+import threading
+import time
+
+from fakeredis import TcpFakeServer
+
+
+class _FakeRedisServer(TcpFakeServer):
+    # socketserver's default backlog of 5 drops SYNs when a pool opens many
+    # connections at once
+    request_queue_size = 1024
+
+
+def start_fake_redis(latency_ms: float = 0.0):
+    """Starts a fakeredis server in a child process, optionally behind a proxy
+    that delays every request by latency_ms to emulate a network round trip.
+
+    Returns (host, port) to connect to.
+    """
+    queue = multiprocessing.Queue()
+    multiprocessing.Process(target=_serve_fake_redis, args=(queue, latency_ms), daemon=True).start()
+    return queue.get(timeout=30)
+
+
+def _serve_fake_redis(queue, latency_ms):
+    server = _FakeRedisServer(("127.0.0.1", 0), server_type="redis")
+    host, port = server.server_address
+    if not latency_ms:
+        queue.put((host, port))
+        server.serve_forever()
+        return
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    asyncio.run(_serve_latency_proxy(queue, host, port, latency_ms / 1000))
+
+
+async def _serve_latency_proxy(queue, upstream_host, upstream_port, delay):
+    async def pipe(reader, writer, delay_):
+        try:
+            while data := await reader.read(65536):
+                if delay_:
+                    await asyncio.sleep(delay_)
+                writer.write(data)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def handle(client_reader, client_writer):
+        upstream_reader, upstream_writer = await asyncio.open_connection(upstream_host, upstream_port)
+        await asyncio.gather(
+            pipe(client_reader, upstream_writer, delay),
+            pipe(upstream_reader, client_writer, 0),
+            return_exceptions=True,
+        )
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0, backlog=1024)
+    queue.put(server.sockets[0].getsockname()[:2])
+    await server.serve_forever()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(pct / 100 * len(values)) - 1))
+    return values[index]
+
+
+def summarize(latencies, elapsed):
+    return {
+        "requests": len(latencies),
+        "req_per_sec": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+    }
+
+
+async def run_concurrently(func, total: int, concurrency: int):
+    """Calls `await func()` total times with at most `concurrency` in flight,
+    returns (latencies, elapsed seconds)."""
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await func()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return latencies, time.perf_counter() - started
+
+
+def use_redis(host, port):
+    """Points config at the given Redis; must run before `config` is imported."""
+    os.environ["REDIS_HOST"] = host
+    os.environ["REDIS_PORT"] = str(port)
+
+
+def bench_db_config(db_url: str = "sqlite://:memory:"):
+    return {
+        "connections": {"default": db_url},
+        "apps": {
+            "models": {
+                "models": ["models", "aerich.models"],
+                "default_connection": "default",
+            }
+        },
+    }
+
+
+async def init_db(db_url: str = "sqlite://:memory:"):
+    from tortoise import Tortoise
+
+    from enums import PaymentTypeEnum
+    from models import PaymentType
+
+    await Tortoise.init(config=bench_db_config(db_url))
+    await Tortoise.generate_schemas(safe=True)
+    for item in PaymentTypeEnum:
+        await PaymentType.get_or_create(name=item)
+
+
+def build_app():
+    from fastapi import FastAPI
+
+    from general_services.redis_svc import redis_lifespan
+    from routes import api_router
+
+    app = FastAPI(lifespan=redis_lifespan)
+    app.include_router(api_router, prefix="/api")
+    return app
+
+
+def asgi_client(app):
+    import httpx
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+
+async def register_and_login(client, username: str, password: str = "bench-password") -> str:
+    await client.post("/api/register", json={"name": username, "username": username, "password": password})
+    response = await client.post("/api/login", json={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def receipt_payload(products: int, payment_type: str = "cash"):
+    items = [
+        {"name": f"Product {i}", "price": "12.35", "quantity": "2"}
+        for i in range(products)
+    ]
+    return {"products": items, "payment": {"type": payment_type, "amount": str(25 * products)}}
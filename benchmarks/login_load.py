@@ -0,0 +1,92 @@
+"""Latency of receipt reads while a burst of logins is running.
+
+In "inline" mode bcrypt runs on the event loop like before; in "pool" mode it
+runs in the bounded PasswordSvc thread pool. Reads report p50/p99 latency.
+
+    python -m benchmarks.login_load --logins 40 --reads 400
+"""
+import argparse
+import asyncio
+import json
+import random
+
+from benchmarks.common import (
+    build_app,
+    init_db,
+    register_and_login,
+    asgi_client,
+    receipt_payload,
+    start_fake_redis,
+    summarize,
+    use_redis,
+)
+
+
+async def bench(mode: str, logins: int, reads: int, concurrency: int):
+    import time
+
+    from tortoise import Tortoise
+
+    from models import User
+
+    await init_db()
+    app = build_app()
+    original = User.check_password_async
+    if mode == "inline":
+        async def check_password_inline(self, password):
+            return self.check_password(password)
+
+        User.check_password_async = check_password_inline
+
+    try:
+        async with app.router.lifespan_context(app), asgi_client(app) as client:
+            token = await register_and_login(client, "reader")
+            headers = {"Authorization": f"Bearer {token}"}
+            for _ in range(20):
+                await client.post("/api/create-receipt", json=receipt_payload(5), headers=headers)
+            await client.post("/api/register", json={"name": "l", "username": "login_user", "password": "pw"})
+
+            read_latencies, login_latencies = [], []
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def read():
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.get("/api/get-receipts?limit=10", headers=headers)
+                    read_latencies.append(time.perf_counter() - started)
+                    assert response.status_code == 200, response.text
+
+            async def login():
+                async with semaphore:
+                    started = time.perf_counter()
+                    await client.post("/api/login", json={"username": "login_user", "password": "pw"})
+                    login_latencies.append(time.perf_counter() - started)
+
+            jobs = [read for _ in range(reads)] + [login for _ in range(logins)]
+            random.Random(1).shuffle(jobs)
+            started = time.perf_counter()
+            await asyncio.gather(*(job() for job in jobs))
+            elapsed = time.perf_counter() - started
+    finally:
+        User.check_password_async = original
+        await Tortoise.close_connections()
+
+    return {"reads": summarize(read_latencies, elapsed), "logins": summarize(login_latencies, elapsed)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--reads", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    use_redis(*start_fake_redis())
+    result = {"params": vars(args)}
+    for mode in ("inline", "pool"):
+        result[mode] = asyncio.run(bench(mode, args.logins, args.reads, args.concurrency))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Receipts/sec written through create-receipt one by one vs
+create-receipts/batch (COPY on Postgres, multi-row INSERT on sqlite).
+
+    python -m benchmarks.receipt_batch --db-url postgres://... --receipts 1000 --products 20
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import (
+    asgi_client,
+    build_app,
+    init_db,
+    receipt_payload,
+    register_and_login,
+    start_fake_redis,
+    use_redis,
+)
+
+
+async def bench(args):
+    from tortoise import Tortoise
+
+    from models import Product, Receipt
+
+    await init_db(args.db_url)
+    app = build_app()
+    payload = receipt_payload(args.products)
+    result = {}
+    try:
+        async with app.router.lifespan_context(app), asgi_client(app) as client:
+            headers = {"Authorization": f"Bearer {await register_and_login(client, 'batch_writer')}"}
+
+            started = time.perf_counter()
+            for _ in range(args.receipts):
+                response = await client.post("/api/create-receipt", json=payload, headers=headers)
+                assert response.status_code == 200, response.text
+            elapsed = time.perf_counter() - started
+            result["single"] = {"seconds": round(elapsed, 3), "receipts_per_sec": round(args.receipts / elapsed)}
+
+            started = time.perf_counter()
+            ids = []
+            for start in range(0, args.receipts, args.batch_size):
+                batch = {"receipts": [payload] * min(args.batch_size, args.receipts - start)}
+                response = await client.post("/api/create-receipts/batch", json=batch, headers=headers)
+                assert response.status_code == 200, response.text
+                ids.extend(response.json()["ids"])
+            elapsed = time.perf_counter() - started
+            result["batch"] = {"seconds": round(elapsed, 3), "receipts_per_sec": round(args.receipts / elapsed)}
+            result["speedup"] = round(result["batch"]["receipts_per_sec"] / result["single"]["receipts_per_sec"], 1)
+
+            assert await Product.filter(receipt_id__in=ids).count() == args.receipts * args.products
+        await Receipt.all().delete()
+    finally:
+        await Tortoise.close_connections()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db-url", default="sqlite://:memory:")
+    parser.add_argument("--receipts", type=int, default=1000)
+    parser.add_argument("--products", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    use_redis(*start_fake_redis())
+    print(json.dumps({"params": vars(args), **asyncio.run(bench(args))}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
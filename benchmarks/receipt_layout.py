@@ -0,0 +1,65 @@
+"""Product lines laid out per second: the len()-based layout (previous
+implementation) vs display-width layout with wrapping, per kind of names.
+
+    python -m benchmarks.receipt_layout --lines 10000
+"""
+import argparse
+import json
+import random
+import time
+
+from benchmarks.common import percentile
+
+NAMES = {
+    "short": lambda rnd, i: f"Товар {i}",
+    "long": lambda rnd, i: " ".join(f"Довга назва {i}" for _ in range(rnd.randint(2, 5))),
+    "wide": lambda rnd, i: "".join(rnd.choice("漢字のカタカナ한글") for _ in range(rnd.randint(4, 30))),
+    "combining": lambda rnd, i: "".join(rnd.choice("aeo") + "́" for _ in range(rnd.randint(4, 30))),
+}
+
+
+def legacy_product(layout, name, price_cents, quantity_milli, total_cents):
+    from apps.receipt_app.money import from_cents, from_milli
+    from apps.receipt_app.rendering.layout import COLUMNS, TEXT, Line, amount_text
+
+    quantity = f"{from_milli(quantity_milli):.2f} x {amount_text(from_cents(price_cents))}"
+    total = amount_text(from_cents(total_cents))
+    spacing = layout.line_width - len(name) - len(total)
+    return [Line(TEXT, quantity), Line(COLUMNS, f"{name}{' ' * spacing}{total}", name, total), layout.rule]
+
+
+def bench(lines: int, repeat: int, line_width: int):
+    from apps.receipt_app.rendering import get_layout
+
+    layout = get_layout(line_width)
+    result = {}
+    for kind, make_name in NAMES.items():
+        rnd = random.Random(lines)
+        products = [(make_name(rnd, i), rnd.randint(1, 50000), 1000, rnd.randint(1, 50000)) for i in range(lines)]
+        result[kind] = {}
+        for label, product in (("legacy", lambda *p: legacy_product(layout, *p)), ("current", layout.product)):
+            latencies = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                for item in products:
+                    product(*item)
+                latencies.append(time.perf_counter() - started)
+            result[kind][label] = {
+                "lines_per_sec": round(lines * len(latencies) / sum(latencies)),
+                "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--line-width", type=int, default=32)
+    args = parser.parse_args()
+
+    print(json.dumps({"params": vars(args), **bench(args.lines, args.repeat, args.line_width)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
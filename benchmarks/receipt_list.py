@@ -0,0 +1,133 @@
+"""Time to build one get-receipts page: ORM prefetch + Pydantic per product
+(previous implementation) vs the values() fetch serialized as plain dicts.
+
+    python -m benchmarks.receipt_list --receipts 100 --products 200
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from benchmarks.common import init_db, percentile
+
+
+async def seed(receipts: int, products: int):
+    from apps.receipt_app.money import line_total_cents
+    from models import PaymentType, Product, Receipt, User
+
+    rnd = random.Random(1)
+    user = await User.create(name="bench", username="bench_list", password="-")
+    payment_type = await PaymentType.get(name="cash")
+    for _ in range(receipts):
+        items = [(rnd.randint(1, 50000), rnd.randint(1, 5) * 1000) for _ in range(products)]
+        totals = [line_total_cents(price_cents, quantity_milli) for price_cents, quantity_milli in items]
+        receipt = await Receipt.create(
+            user=user, payment_type=payment_type, amount_cents=sum(totals) + 10000, total_cents=sum(totals)
+        )
+        await Product.bulk_create(
+            [Product(receipt=receipt, name=f"Product {i}", price_cents=price_cents,
+                     quantity_milli=quantity_milli, total_cents=total_cents, created_at=receipt.created_at)
+             for i, ((price_cents, quantity_milli), total_cents) in enumerate(zip(items, totals))],
+            batch_size=1000,
+        )
+    return user
+
+
+async def legacy_page(query, limit):
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    from apps.receipt_app.dto import PaymentOutput, ProductOutput, ReceiptResponse
+    from apps.receipt_app.money import from_cents, from_milli
+    from apps.receipt_app.services.payment_type_registry import payment_type_registry
+
+    receipts = await query.prefetch_related("products").limit(limit)
+    result = []
+    for receipt in receipts:
+        products = [
+            ProductOutput(
+                name=p.name,
+                price=from_cents(p.price_cents),
+                quantity=from_milli(p.quantity_milli),
+                total=from_cents(p.total_cents),
+            )
+            for p in receipt.products
+        ]
+        total_sum = from_cents(receipt.total_cents)
+        result.append(ReceiptResponse(
+            id=receipt.id,
+            products=products,
+            payment=PaymentOutput(
+                type=await payment_type_registry.get_name(receipt.payment_type_id), amount=total_sum
+            ),
+            total=total_sum,
+            rest=max(from_cents(receipt.amount_cents) - total_sum, 0),
+            created_at=receipt.created_at,
+        ))
+    return JSONResponse(content=jsonable_encoder(result)).body
+
+
+async def values_page(svc, query, limit):
+    from fastapi.responses import JSONResponse
+
+    from apps.receipt_app.services.receipt_svc import RECEIPT_LIST_FIELDS
+
+    receipts = await query.limit(limit).values(*RECEIPT_LIST_FIELDS)
+    return JSONResponse(content=await svc.serialize_list(receipts)).body
+
+
+async def bench(args):
+    import tracemalloc
+
+    from tortoise import Tortoise
+
+    from apps.receipt_app.services.receipt_svc import ReceiptSvc
+
+    await init_db(args.db_url)
+    try:
+        user = await seed(args.receipts, args.products)
+        svc = ReceiptSvc()
+        legacy = await legacy_page(await svc.list_query(user), args.receipts)
+        current = await values_page(svc, await svc.list_query(user), args.receipts)
+        assert json.loads(legacy) == json.loads(current), "responses differ"
+
+        result = {"same_json": legacy == current}
+        runs = {
+            "prefetch_pydantic": lambda query: legacy_page(query, args.receipts),
+            "values_dicts": lambda query: values_page(svc, query, args.receipts),
+        }
+        for name, func in runs.items():
+            latencies = []
+            for _ in range(args.repeat):
+                query = await svc.list_query(user)
+                started = time.perf_counter()
+                await func(query)
+                latencies.append(time.perf_counter() - started)
+            tracemalloc.start()
+            await func(await svc.list_query(user))
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            result[name] = {
+                "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+                "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+                "peak_mem_kb": peak // 1024,
+            }
+        return result
+    finally:
+        await Tortoise.close_connections()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db-url", default="sqlite://:memory:")
+    parser.add_argument("--receipts", type=int, default=100)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    print(json.dumps({"params": vars(args), **asyncio.run(bench(args))}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
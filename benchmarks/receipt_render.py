@@ -0,0 +1,74 @@
+"""Renders per second of one receipt in every get-receipt-text format,
+from laid-out lines to the finished document (no DB).
+
+    python -m benchmarks.receipt_render --sizes 1 100 10000
+"""
+import argparse
+import datetime
+import json
+import random
+import time
+
+from benchmarks.common import percentile
+
+
+def make_products(size: int):
+    rnd = random.Random(size)
+    products = []
+    for i in range(size):
+        price_cents, quantity_milli = rnd.randint(1, 50000), rnd.randint(1, 5) * 1000
+        products.append((f"Товар {i}", price_cents, quantity_milli, price_cents * quantity_milli // 1000))
+    return products
+
+
+def bench(size: int, repeat: int, line_width: int):
+    from apps.receipt_app.rendering import RENDERERS, get_layout
+
+    products = make_products(size)
+    total_cents = sum(p[3] for p in products)
+    created_at = datetime.datetime(2024, 1, 1, 12, 30, tzinfo=datetime.timezone.utc)
+
+    def render(renderer_class):
+        layout = get_layout(line_width)
+        renderer = renderer_class(layout)
+        parts = [renderer.begin(), renderer.render(layout.header)]
+        lines = []
+        for product in products:
+            lines.extend(layout.product(*product))
+        parts.append(renderer.render(lines))
+        parts.append(renderer.render(layout.footer(total_cents, total_cents + 10000, "cash", created_at)))
+        parts.append(renderer.end())
+        return b"".join(parts)
+
+    result = {}
+    for receipt_format, renderer_class in RENDERERS.items():
+        size_bytes = len(render(renderer_class))
+        latencies = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            render(renderer_class)
+            latencies.append(time.perf_counter() - started)
+        result[receipt_format.value] = {
+            "renders_per_sec": round(len(latencies) / sum(latencies), 1),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+            "bytes": size_bytes,
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10000])
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--line-width", type=int, default=32)
+    args = parser.parse_args()
+
+    result = {"params": vars(args)}
+    for size in args.sizes:
+        result[f"{size}_products"] = bench(size, args.repeat, args.line_width)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
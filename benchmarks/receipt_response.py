@@ -0,0 +1,85 @@
+"""Serialization cost of one ReceiptResponse: validated models run through
+FastAPI's response_model + jsonable_encoder path vs RECEIPT_FAST_RESPONSE.
+
+    python -m benchmarks.receipt_response --sizes 1 100 10000
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import random
+import time
+
+from benchmarks.common import percentile
+
+
+def make_products(size: int):
+    rnd = random.Random(size)
+    products = []
+    for i in range(size):
+        price, quantity = round(rnd.uniform(0.01, 500), 2), rnd.randint(1, 5)
+        products.append((f"Product {i}", price, quantity, round(price * quantity, 2)))
+    return products
+
+
+async def bench(size: int, repeat: int):
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_model_field
+
+    from apps.receipt_app import serializers
+    from apps.receipt_app.dto import ReceiptResponse
+
+    products = make_products(size)
+    total = round(sum(p[3] for p in products), 2)
+    fields = dict(
+        receipt_id=1,
+        payment_type="cash",
+        amount=round(total + 100, 2),
+        total=total,
+        rest=100.0,
+        created_at=datetime.datetime(2024, 1, 1, 12, 30, tzinfo=datetime.timezone.utc),
+    )
+    response_field = create_model_field(name="Response_get_receipt", type_=ReceiptResponse, mode="serialization")
+    serializer = serializers.ReceiptSerializer()
+
+    async def default_path():
+        serializers.RECEIPT_FAST_RESPONSE = False
+        model = serializer.build(products=products, **fields)
+        content = await serialize_response(field=response_field, response_content=model)
+        return JSONResponse(content=content).body
+
+    async def fast_path():
+        serializers.RECEIPT_FAST_RESPONSE = True
+        return serializer.build(products=products, **fields).body
+
+    assert await default_path() == await fast_path()
+    result = {}
+    for name, func in (("default", default_path), ("fast", fast_path)):
+        latencies = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            await func()
+            latencies.append(time.perf_counter() - started)
+        result[name] = {
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        }
+    result["speedup"] = round(result["default"]["p50_ms"] / result["fast"]["p50_ms"], 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10000])
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    result = {"params": vars(args)}
+    for size in args.sizes:
+        result[f"{size}_products"] = asyncio.run(bench(size, args.repeat))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Throughput of the token verification Redis lookup under concurrency.
+
+Compares the previous blocking `redis.Redis` client called from coroutines
+with the pooled `redis.asyncio` client used by RedisSvc, both against an
+in-process fakeredis server with an emulated network round trip.
+
+    python -m benchmarks.redis_token_path --latency-ms 1 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+
+import redis
+import redis.asyncio as aioredis
+
+from benchmarks.common import run_concurrently, start_fake_redis, summarize
+
+AUTH = json.dumps({"access_token": "a" * 200, "refresh_token": "r" * 200})
+
+
+async def bench_sync(host, port, total, concurrency):
+    client = redis.Redis(host=host, port=port, decode_responses=True)
+    client.hset(1, mapping={"auth": AUTH})
+
+    async def request():
+        json.loads(client.hget(1, "auth"))
+
+    latencies, elapsed = await run_concurrently(request, total, concurrency)
+    client.close()
+    return summarize(latencies, elapsed)
+
+
+async def bench_async(host, port, total, concurrency):
+    pool = aioredis.BlockingConnectionPool(
+        host=host, port=port, max_connections=concurrency, decode_responses=True
+    )
+    client = aioredis.Redis(connection_pool=pool)
+    await client.hset(1, mapping={"auth": AUTH})
+
+    async def request():
+        json.loads(await client.hget(1, "auth"))
+
+    latencies, elapsed = await run_concurrently(request, total, concurrency)
+    await pool.disconnect()
+    return summarize(latencies, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    host, port = start_fake_redis(args.latency_ms)
+    result = {
+        "params": vars(args),
+        "sync_redis": asyncio.run(bench_sync(host, port, args.requests, args.concurrency)),
+        "async_pool": asyncio.run(bench_async(host, port, args.requests, args.concurrency)),
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
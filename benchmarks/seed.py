@@ -0,0 +1,104 @@
+"""Seeds N users x M receipts x K products for the benchmarks.
+
+Users share one password hash, so seeding does not pay for bcrypt; receipts
+are written through ReceiptBatchSvc in groups that share a created_at,
+spread over the last --days days, alternating payment types.
+
+    python -m benchmarks.seed --db-url postgres://... --users 100 --receipts 1000 --products 5
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.common import init_db
+
+PASSWORD = "bench-password"
+# Receipts of one user get about this many distinct created_at values
+TIMESTAMPS_PER_USER = 50
+
+
+def receipt_request(rnd: random.Random, products: int, payment_type: str):
+    from apps.receipt_app.dto import PaymentInput, ProductInput, ReceiptRequest
+
+    items = [
+        ProductInput(
+            name=f"Product {rnd.randint(1, 10 ** 6)}",
+            price=f"{rnd.randint(1, 100000) / 100:.2f}",
+            quantity=rnd.choice(("1", "2", "0.5", "1.255")),
+        )
+        for _ in range(products)
+    ]
+    amount = sum(item.price * item.quantity for item in items) + rnd.randint(0, 5000)
+    return ReceiptRequest(products=items, payment=PaymentInput(type=payment_type, amount=f"{max(amount, 1):.2f}"))
+
+
+async def seed(users: int, receipts: int, products: int, days: int = 365, prefix: str = "bench", seed_value: int = 1):
+    """Creates the users `<prefix>_0`...`<prefix>_<users - 1>` and their receipts; returns the users."""
+    from tortoise.transactions import in_transaction
+
+    from apps.receipt_app.services.receipt_batch_svc import ReceiptBatchSvc
+    from config import RECEIPT_BATCH_MAX_PRODUCTS, RECEIPT_BATCH_MAX_RECEIPTS
+    from enums import PaymentTypeEnum
+    from general_services.password_svc import hash_password
+    from models import User
+
+    rnd = random.Random(seed_value)
+    password = hash_password(PASSWORD)
+    await User.bulk_create(
+        [User(name=f"{prefix} {i}", username=f"{prefix}_{i}", password=password) for i in range(users)],
+        batch_size=1000,
+    )
+    seeded = await User.filter(username__startswith=f"{prefix}_").order_by("id")
+
+    svc = ReceiptBatchSvc()
+    group_size = max(1, min(
+        receipts // TIMESTAMPS_PER_USER, RECEIPT_BATCH_MAX_RECEIPTS, RECEIPT_BATCH_MAX_PRODUCTS // max(products, 1)
+    ))
+    now = datetime.now(timezone.utc)
+    payment_types = [item.value for item in PaymentTypeEnum]
+    for user in seeded:
+        for start in range(0, receipts, group_size):
+            payment_type = payment_types[start // group_size % len(payment_types)]
+            group = [receipt_request(rnd, products, payment_type) for _ in range(min(group_size, receipts - start))]
+            created_at = now - timedelta(seconds=rnd.randint(0, days * 24 * 60 * 60))
+            rows = await svc.receipt_rows(user, group, created_at)
+            async with in_transaction("default") as connection:
+                write = svc.copy if connection.capabilities.dialect == "postgres" else svc.insert
+                await write(connection, rows, group, created_at)
+    return seeded
+
+
+async def bench(args):
+    from tortoise import Tortoise
+
+    await init_db(args.db_url)
+    try:
+        started = time.perf_counter()
+        await seed(args.users, args.receipts, args.products, args.days, args.prefix)
+        elapsed = time.perf_counter() - started
+    finally:
+        await Tortoise.close_connections()
+    return {
+        "seconds": round(elapsed, 3),
+        "receipts_per_sec": round(args.users * args.receipts / elapsed) if elapsed else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db-url", default="sqlite://:memory:")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--receipts", type=int, default=100)
+    parser.add_argument("--products", type=int, default=5)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--prefix", default="bench")
+    args = parser.parse_args()
+
+    print(json.dumps({"params": vars(args), **asyncio.run(bench(args))}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""Load test of the main API scenarios, in process or over HTTP.
+
+Seeds --users x --receipts x --products (see benchmarks.seed), then runs
+every scenario at each --concurrency level, through httpx's ASGI transport
+("asgi") and/or a uvicorn server on a loopback port ("http"). Each run
+reports req/s, p50/p95/p99 latency and DB queries per request as JSON; the
+queries are counted on a sequential warm-up pass, so logging them does not
+slow down the timed one.
+
+With --compare, the report is checked against a saved one: a scenario
+regresses when its req/s drops or its p95 grows by more than --threshold
+percent, or when it makes more DB queries per request. The regressions are
+listed in the report and the process exits with 1.
+
+    python -m benchmarks.suite --concurrency 1,16 --output baseline.json
+    python -m benchmarks.suite --concurrency 1,16 --compare baseline.json --threshold 15
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, NamedTuple
+
+from benchmarks.common import asgi_client, build_app, init_db, run_concurrently, start_fake_redis, summarize, use_redis
+from benchmarks.seed import PASSWORD, seed
+
+TRANSPORTS = ("asgi", "http")
+
+
+class Scenario(NamedTuple):
+    name: str
+    # (method, url, request kwargs) of one request, given the run context and a Random
+    request: Callable
+    # Share of --requests this scenario sends; heavy ones send fewer
+    share: float = 1.0
+
+
+def receipt_body(products: int) -> dict:
+    return {
+        "products": [{"name": f"Load product {i}", "price": "12.35", "quantity": "2"} for i in range(products)],
+        "payment": {"type": "cash", "amount": str(25 * products)},
+    }
+
+
+def login(context: dict, rnd: random.Random):
+    username = rnd.choice(context["usernames"])
+    return "POST", "/api/login", {"json": {"username": username, "password": PASSWORD}}
+
+
+def create_receipt(products: int):
+    body = receipt_body(products)
+
+    def request(context: dict, rnd: random.Random):
+        return "POST", "/api/create-receipt", {"json": body, "headers": rnd.choice(context["headers"])}
+
+    return request
+
+
+def list_page(context: dict, rnd: random.Random):
+    now = datetime.now(timezone.utc)
+    date_from = now - timedelta(days=rnd.randint(30, context["days"]))
+    params = {"limit": 20, "date_from": date_from.isoformat(), "date_to": (date_from + timedelta(days=30)).isoformat()}
+    if rnd.random() < 0.5:
+        params["payment_type"] = rnd.choice(context["payment_types"])
+    if rnd.random() < 0.5:
+        params["min_total"] = rnd.choice((10, 100, 1000))
+    if rnd.random() < 0.5:
+        params["offset"] = rnd.choice((0, 20, 100))
+    return "GET", "/api/get-receipts", {"params": params, "headers": rnd.choice(context["headers"])}
+
+
+def receipt_text(context: dict, rnd: random.Random):
+    index = rnd.randrange(len(context["headers"]))
+    receipt_id = rnd.choice(context["receipt_ids"][index])
+    return "GET", f"/api/get-receipt-text/{receipt_id}", {"headers": context["headers"][index]}
+
+
+SCENARIOS = [
+    Scenario("login", login, 0.25),
+    Scenario("create_receipt_1", create_receipt(1)),
+    Scenario("create_receipt_100", create_receipt(100), 0.25),
+    Scenario("create_receipt_10000", create_receipt(10000), 0.01),
+    Scenario("list_page", list_page),
+    Scenario("receipt_text", receipt_text),
+]
+
+
+class QueryCounter(logging.Handler):
+    """Counts the statements Tortoise logs to tortoise.db_client at DEBUG."""
+
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+
+@contextmanager
+def counted_queries():
+    logger = logging.getLogger("tortoise.db_client")
+    counter, level, propagate = QueryCounter(), logger.level, logger.propagate
+    logger.addHandler(counter)
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    try:
+        yield counter
+    finally:
+        logger.removeHandler(counter)
+        logger.setLevel(level)
+        logger.propagate = propagate
+
+
+@asynccontextmanager
+async def serve(app, transport: str, concurrency: int):
+    """An httpx client talking to `app` through the given transport."""
+    import httpx
+
+    if transport == "asgi":
+        async with asgi_client(app) as client:
+            yield client
+        return
+
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, lifespan="off", log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    host, port = server.servers[0].sockets[0].getsockname()[:2]
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://{host}:{port}", limits=limits, timeout=300) as client:
+            yield client
+    finally:
+        server.should_exit = True
+        await task
+
+
+async def run_scenario(client, scenario: Scenario, context: dict, requests: int, concurrency: int) -> dict:
+    rnd = random.Random(scenario.name)
+    total = max(concurrency, round(requests * scenario.share))
+
+    async def one():
+        method, url, kwargs = scenario.request(context, rnd)
+        response = await client.request(method, url, **kwargs)
+        assert response.status_code == 200, f"{scenario.name}: {response.status_code} {response.text[:200]}"
+
+    warmup = min(total, context["warmup"])
+    with counted_queries() as counter:
+        for _ in range(warmup):
+            await one()
+    latencies, elapsed = await run_concurrently(one, total, concurrency)
+    return {
+        **summarize(latencies, elapsed),
+        "db_queries_per_request": round(counter.count / warmup, 2) if warmup else None,
+    }
+
+
+async def bench(args) -> Dict[str, dict]:
+    from tortoise import Tortoise
+
+    from enums import PaymentTypeEnum
+    from models import Receipt
+
+    await init_db(args.db_url)
+    app = build_app()
+    results = {}
+    try:
+        async with app.router.lifespan_context(app):
+            users = await seed(args.users, args.receipts, args.products, args.days)
+            context = {
+                # A login replaces the user's tokens, so it is measured on users that send nothing else
+                "usernames": [user.username for user in users[args.active_users:]],
+                "payment_types": [item.value for item in PaymentTypeEnum],
+                "days": args.days,
+                "warmup": args.warmup,
+                "headers": [],
+                "receipt_ids": [],
+            }
+            async with asgi_client(app) as client:
+                for user in users[:args.active_users]:
+                    response = await client.post("/api/login", json={"username": user.username, "password": PASSWORD})
+                    response.raise_for_status()
+                    context["headers"].append({"Authorization": f"Bearer {response.json()['access_token']}"})
+                    context["receipt_ids"].append(await Receipt.filter(user=user).values_list("id", flat=True))
+
+            scenarios = [scenario for scenario in SCENARIOS if not args.scenarios or scenario.name in args.scenarios]
+            for transport in args.transports:
+                results[transport] = {}
+                for scenario in scenarios:
+                    results[transport][scenario.name] = {}
+                    for concurrency in args.concurrency:
+                        async with serve(app, transport, concurrency) as client:
+                            result = await run_scenario(client, scenario, context, args.requests, concurrency)
+                        results[transport][scenario.name][str(concurrency)] = result
+                        print(transport, scenario.name, concurrency, json.dumps(result), file=sys.stderr)
+    finally:
+        await Tortoise.close_connections()
+    return results
+
+
+def compare(baseline: dict, results: dict, threshold: float) -> List[str]:
+    """Regressions of `results` against the `results` of a saved report."""
+    regressions = []
+    for transport, scenarios in results.items():
+        for name, levels in scenarios.items():
+            for concurrency, current in levels.items():
+                before = baseline.get(transport, {}).get(name, {}).get(concurrency)
+                if not before:
+                    continue
+                label = f"{transport} {name} x{concurrency}"
+                if current["req_per_sec"] < before["req_per_sec"] * (1 - threshold / 100):
+                    regressions.append(f"{label}: req/s {before['req_per_sec']} -> {current['req_per_sec']}")
+                if current["p95_ms"] > before["p95_ms"] * (1 + threshold / 100):
+                    regressions.append(f"{label}: p95 {before['p95_ms']} ms -> {current['p95_ms']} ms")
+                if (current["db_queries_per_request"] or 0) > (before["db_queries_per_request"] or 0):
+                    regressions.append(
+                        f"{label}: DB queries per request "
+                        f"{before['db_queries_per_request']} -> {current['db_queries_per_request']}"
+                    )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db-url", default="sqlite://:memory:")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--receipts", type=int, default=200)
+    parser.add_argument("--products", type=int, default=5)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--active-users", type=int, default=10, help="seeded users that send the requests but login")
+    parser.add_argument("--requests", type=int, default=400, help="requests per scenario and concurrency level")
+    parser.add_argument("--warmup", type=int, default=10, help="sequential requests whose DB queries are counted")
+    parser.add_argument("--concurrency", type=lambda value: [int(level) for level in value.split(",")], default=[1, 16])
+    parser.add_argument("--transports", type=lambda value: value.split(","), default=list(TRANSPORTS))
+    parser.add_argument("--scenarios", type=lambda value: value.split(","), default=None)
+    parser.add_argument("--text-cache", action="store_true", help="keep the get-receipt-text cache enabled")
+    parser.add_argument("--output", help="also write the report to this file")
+    parser.add_argument("--compare", help="report to compare against")
+    parser.add_argument("--threshold", type=float, default=10, help="allowed regression, percent")
+    args = parser.parse_args()
+    if not set(args.transports) <= set(TRANSPORTS):
+        parser.error(f"--transports must be a subset of {','.join(TRANSPORTS)}")
+    if not 0 < args.active_users < args.users:
+        parser.error("--active-users must be positive and less than --users")
+
+    if not args.text_cache:
+        os.environ["RECEIPT_TEXT_CACHE_ENABLED"] = "false"
+    use_redis(*start_fake_redis())
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    report = {"params": vars(args), "results": asyncio.run(bench(args))}
+    if args.compare:
+        with open(args.compare) as baseline:
+            report["regressions"] = compare(json.load(baseline)["results"], report["results"], args.threshold)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(text)
+    if report.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Ops/sec of TokenSvc.verify_token with and without the local cache.
+
+    python -m benchmarks.verify_token --iterations 20000 --latency-ms 0.5
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import time
+
+from benchmarks.common import start_fake_redis, use_redis
+
+
+async def bench(cache_enabled: bool, iterations: int):
+    from auth_jwt.services import token_svc as token_module
+    from config import redis_pool
+    from enums import TokenTypeEnum
+
+    token_module.TOKEN_VERIFY_CACHE_ENABLED = cache_enabled
+    token_module.verified_tokens.clear()
+    svc = token_module.TokenSvc()
+    data = {"sub": "bench", "user_id": 1}
+    access_token = svc.create_access_token(data, datetime.timedelta(minutes=5))
+    refresh_token = svc.create_refresh_token(data, datetime.timedelta(days=1))
+    await svc.save_tokens(1, access_token, refresh_token)
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await svc.verify_token(access_token, TokenTypeEnum.ACCESS)
+    elapsed = time.perf_counter() - started
+    await redis_pool.disconnect()
+    return {"ops_per_sec": round(iterations / elapsed, 1), "us_per_op": round(elapsed / iterations * 1e6, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    use_redis(*start_fake_redis(args.latency_ms))
+    result = {
+        "params": vars(args),
+        "no_cache": asyncio.run(bench(False, args.iterations)),
+        "cache": asyncio.run(bench(True, args.iterations)),
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
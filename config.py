@@ -1,8 +1,8 @@
-import asyncio
 import logging
 import os
+from typing import List
 
-import redis
+import redis.asyncio as aioredis
 from dotenv import load_dotenv
 from tortoise import Tortoise
 
@@ -10,24 +10,181 @@ logging.basicConfig(level=logging.INFO)
 
 load_dotenv()
 
+
+def env_flag(name: str, default: bool) -> bool:
+    """A boolean env var: true, 1, yes or on in any case; unset or empty keeps `default`."""
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() in ("true", "1", "yes", "on")
+
+
 # LOGIN
 TOKEN_SECRET_KEY = os.getenv("TOKEN_SECRET_KEY", "your-token-secret-key")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 5))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 5))
 ISSUER = os.getenv("ISSUER", "issuer")
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+# bcrypt runs in this many threads; when PASSWORD_HASH_MAX_PENDING calls are
+# already queued or running, new ones are rejected with 503
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 32))
 
 # DATABASE
 DB_USER = os.getenv("POSTGRES_USER")
 DB_PASSWORD = os.getenv("POSTGRES_PASSWORD")
 DB_NAME = os.getenv("POSTGRES_DB")
 DB_HOST = os.getenv("POSTGRES_HOST")
+DB_PORT = int(os.getenv("POSTGRES_PORT", 5432))
+# Connection pool of each worker process; idle connections are closed after
+# DB_POOL_MAX_INACTIVE_LIFETIME seconds (0 keeps them open)
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 1))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+DB_POOL_MAX_INACTIVE_LIFETIME = float(os.getenv("DB_POOL_MAX_INACTIVE_LIFETIME", 300))
+# Prepared statements cached per connection; set 0 behind pgbouncer in transaction mode
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 100))
+# Server-side statement_timeout in milliseconds and client-side timeout of a
+# single command in seconds; 0 disables either
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 30000))
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", 60))
+DB_APPLICATION_NAME = os.getenv("DB_APPLICATION_NAME", "receipt-app")
+# Comma-separated host[:port] list of read replicas; receipt and user reads
+# are spread over them, except for a client's reads within
+# DB_READ_AFTER_WRITE_SECONDS of its last write
+DB_REPLICA_HOSTS = [host for host in os.getenv("DB_REPLICA_HOSTS", "").split(",") if host.strip()]
+DB_READ_AFTER_WRITE_SECONDS = float(os.getenv("DB_READ_AFTER_WRITE_SECONDS", 5))
+DB_REPLICA_PREFIX = "replica"
+
+# REDIS
+REDIS_HOST = os.getenv("REDIS_HOST", "redis")
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+REDIS_DB = int(os.getenv("REDIS_DB", 0))
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", 2))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", 1))
+REDIS_SOCKET_CONNECT_TIMEOUT = float(os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT", 1))
+
+# Waits up to REDIS_POOL_TIMEOUT for a free connection instead of failing
+# as soon as REDIS_MAX_CONNECTIONS are in use
+redis_pool = aioredis.BlockingConnectionPool(
+    host=REDIS_HOST,
+    port=REDIS_PORT,
+    db=REDIS_DB,
+    max_connections=REDIS_MAX_CONNECTIONS,
+    timeout=REDIS_POOL_TIMEOUT,
+    socket_timeout=REDIS_SOCKET_TIMEOUT,
+    socket_connect_timeout=REDIS_SOCKET_CONNECT_TIMEOUT,
+    decode_responses=True,
+)
+redis_client = aioredis.Redis(connection_pool=redis_pool)
+INVALIDATION_CHANNEL = os.getenv("INVALIDATION_CHANNEL", "cache-invalidation")
+
+# CACHE
+USER_CACHE_ENABLED = env_flag("USER_CACHE_ENABLED", True)
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 60))
+USER_CACHE_MAXSIZE = int(os.getenv("USER_CACHE_MAXSIZE", 10000))
+TOKEN_VERIFY_CACHE_ENABLED = env_flag("TOKEN_VERIFY_CACHE_ENABLED", True)
+TOKEN_VERIFY_CACHE_SECONDS = float(os.getenv("TOKEN_VERIFY_CACHE_SECONDS", 30))
+TOKEN_VERIFY_CACHE_MAXSIZE = int(os.getenv("TOKEN_VERIFY_CACHE_MAXSIZE", 50000))
+# Rendered get-receipt-text bodies, in process (at most MAXSIZE entries and
+# MAX_BYTES of text) and in Redis; texts over MAX_ITEM_BYTES are not cached
+RECEIPT_TEXT_CACHE_ENABLED = env_flag("RECEIPT_TEXT_CACHE_ENABLED", True)
+RECEIPT_TEXT_CACHE_TTL = int(os.getenv("RECEIPT_TEXT_CACHE_TTL", 24 * 60 * 60))
+RECEIPT_TEXT_CACHE_MAXSIZE = int(os.getenv("RECEIPT_TEXT_CACHE_MAXSIZE", 10000))
+RECEIPT_TEXT_CACHE_MAX_BYTES = int(os.getenv("RECEIPT_TEXT_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+RECEIPT_TEXT_CACHE_MAX_ITEM_BYTES = int(os.getenv("RECEIPT_TEXT_CACHE_MAX_ITEM_BYTES", 1024 * 1024))
+
+# RESPONSES
+# Serialize single-receipt responses without re-validating server-built data
+RECEIPT_FAST_RESPONSE = env_flag("RECEIPT_FAST_RESPONSE", False)
+
+# BATCH
+# Limits of one create-receipts/batch request
+RECEIPT_BATCH_MAX_RECEIPTS = int(os.getenv("RECEIPT_BATCH_MAX_RECEIPTS", 1000))
+RECEIPT_BATCH_MAX_PRODUCTS = int(os.getenv("RECEIPT_BATCH_MAX_PRODUCTS", 100000))
+
+# IDEMPOTENCY
+# Responses of requests sent with an Idempotency-Key are replayed for this
+# long; a duplicate arriving while the first is running waits up to
+# IDEMPOTENCY_LOCK_SECONDS for it
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", 24 * 60 * 60))
+IDEMPOTENCY_LOCK_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", 10))
+
+# EXPORT
+# export-receipts reads this many receipts, and their products in pages of
+# EXPORT_PRODUCT_CHUNK_SIZE rows, per query
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 500))
+EXPORT_PRODUCT_CHUNK_SIZE = int(os.getenv("EXPORT_PRODUCT_CHUNK_SIZE", 5000))
+
+# TEXT
+# get-receipt-text reads products in pages of this size; receipts with more
+# products are streamed instead of being rendered in memory and cached
+RECEIPT_TEXT_CHUNK_SIZE = int(os.getenv("RECEIPT_TEXT_CHUNK_SIZE", 1000))
+RECEIPT_MERCHANT_NAME = os.getenv("RECEIPT_MERCHANT_NAME", "ФОП Джонсонюк Борис")
+# Monospaced TrueType font embedded in PDF receipts
+RECEIPT_PDF_FONT_PATH = os.getenv("RECEIPT_PDF_FONT_PATH", "/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf")
+# Text encoding of ESC/POS receipts and the printer code page (ESC t n) that matches it
+RECEIPT_ESCPOS_ENCODING = os.getenv("RECEIPT_ESCPOS_ENCODING", "cp866")
+RECEIPT_ESCPOS_CODE_PAGE = int(os.getenv("RECEIPT_ESCPOS_CODE_PAGE", 17))
+
+# PARTITIONS
+# Receipts and products are partitioned by month of created_at: partitions
+# are created this many months ahead, and months older than
+# RECEIPT_ARCHIVE_AFTER_MONTHS are dumped to RECEIPT_ARCHIVE_DIR and dropped
+RECEIPT_PARTITION_MONTHS_AHEAD = int(os.getenv("RECEIPT_PARTITION_MONTHS_AHEAD", 3))
+RECEIPT_ARCHIVE_AFTER_MONTHS = int(os.getenv("RECEIPT_ARCHIVE_AFTER_MONTHS", 36))
+RECEIPT_ARCHIVE_DIR = os.getenv("RECEIPT_ARCHIVE_DIR", "archive")
+
+# PROFILING
+# ProfilingMiddleware times DB queries, RedisSvc calls, rendering and
+# serialization of a PROFILING_SAMPLE_RATE share of requests, adds a
+# Server-Timing header and logs requests slower than PROFILING_SLOW_REQUEST_MS
+# or running PROFILING_SLOW_QUERY_COUNT queries, with up to
+# PROFILING_LOGGED_QUERIES of their statements
+PROFILING_ENABLED = env_flag("PROFILING_ENABLED", False)
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", 1))
+PROFILING_SLOW_REQUEST_MS = float(os.getenv("PROFILING_SLOW_REQUEST_MS", 500))
+PROFILING_SLOW_QUERY_COUNT = int(os.getenv("PROFILING_SLOW_QUERY_COUNT", 20))
+PROFILING_LOGGED_QUERIES = int(os.getenv("PROFILING_LOGGED_QUERIES", 50))
+
+# HEALTH
+READINESS_TIMEOUT = float(os.getenv("READINESS_TIMEOUT", 1))
+READINESS_CACHE_SECONDS = float(os.getenv("READINESS_CACHE_SECONDS", 5))
+
+def db_connection(host: str, port: int) -> dict:
+    return {
+        # asyncpg with pool metrics, see general_services.db_client
+        "engine": "general_services.db_client",
+        "credentials": {
+            "host": host,
+            "port": port,
+            "user": DB_USER,
+            "password": DB_PASSWORD,
+            "database": DB_NAME,
+            "minsize": DB_POOL_MIN_SIZE,
+            "maxsize": DB_POOL_MAX_SIZE,
+            "max_inactive_connection_lifetime": DB_POOL_MAX_INACTIVE_LIFETIME,
+            "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            "command_timeout": DB_COMMAND_TIMEOUT or None,
+            "application_name": DB_APPLICATION_NAME,
+            "server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)},
+        },
+    }
+
+
+def replica_connections(hosts: List[str]) -> dict:
+    connections = {}
+    for index, replica in enumerate(hosts):
+        host, _, port = replica.strip().partition(":")
+        connections[f"{DB_REPLICA_PREFIX}_{index}"] = db_connection(host, int(port or DB_PORT))
+    return connections
 
-redis_client = redis.Redis(host="redis", port=6379, decode_responses=True)
 
 TORTOISE_ORM = {
     "connections": {
-        "default": f"postgres://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
+        "default": db_connection(DB_HOST, DB_PORT),
+        **replica_connections(DB_REPLICA_HOSTS),
     },
     "apps": {
         "models": {
@@ -35,6 +192,7 @@ TORTOISE_ORM = {
             "default_connection": "default",
         }
     },
+    "routers": ["general_services.db_router.ReplicaRouter"] if DB_REPLICA_HOSTS else [],
 }
 
 
@@ -43,11 +201,3 @@ async def init_db_connect():
     result = await Tortoise.get_connection("default").execute_query("SELECT 1")
     logging.info(f"Test query result: {result and result[1][0]['?column?'] == 1}")
     logging.info("Connected to the database")
-
-
-def run_async(func):
-    if not asyncio.get_event_loop().is_running():
-        asyncio.run(func)
-    else:
-        asyncio.create_task(func)
-
@@ -16,3 +16,21 @@ class PaymentTypeEnum(BaseEnum):
     CREDIT_CART = "credit_card"
     CASH = "cash"
 
+class PaginationEnum(BaseEnum):
+    OFFSET = "offset"
+    CURSOR = "cursor"
+
+class ExportFormatEnum(BaseEnum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+class StatsPeriodEnum(BaseEnum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+class ReceiptFormatEnum(BaseEnum):
+    TEXT = "text"
+    ESCPOS = "escpos"
+    HTML = "html"
+    PDF = "pdf"
@@ -0,0 +1,118 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+import asyncpg
+from tortoise.backends.asyncpg.client import AsyncpgDBClient
+
+from general_services.metrics_svc import MetricsSvc
+
+# Seconds the current request has spent waiting for DB connections, see
+# DbAcquireTimeMiddleware
+request_acquire_seconds: ContextVar[Optional[list]] = ContextVar("request_acquire_seconds", default=None)
+
+pools = {}
+request_stats = {"requests": 0, "acquire_seconds": 0.0, "acquire_max_seconds": 0.0}
+
+
+class MeteredPool:
+    """asyncpg pool that counts acquires waiting for a connection and times every acquire.
+
+    Everything except `acquire` is passed through to the wrapped pool.
+    """
+
+    def __init__(self, pool: asyncpg.Pool):
+        self.pool = pool
+        self.waiters = 0
+        self.acquires = 0
+        self.acquire_seconds = 0.0
+        self.acquire_max_seconds = 0.0
+
+    async def acquire(self, *, timeout: Optional[float] = None) -> asyncpg.Connection:
+        started = time.perf_counter()
+        # Taking an idle connection is not waiting
+        waiting = not self.pool.get_idle_size()
+        if waiting:
+            self.waiters += 1
+        try:
+            return await self.pool.acquire(timeout=timeout)
+        finally:
+            if waiting:
+                self.waiters -= 1
+            elapsed = time.perf_counter() - started
+            self.acquires += 1
+            self.acquire_seconds += elapsed
+            self.acquire_max_seconds = max(self.acquire_max_seconds, elapsed)
+            spent = request_acquire_seconds.get()
+            if spent is not None:
+                spent[0] += elapsed
+
+    def __getattr__(self, name: str):
+        return getattr(self.pool, name)
+
+    def stats(self) -> dict:
+        idle = self.pool.get_idle_size()
+        return {
+            "size": self.pool.get_size(),
+            "min_size": self.pool.get_min_size(),
+            "max_size": self.pool.get_max_size(),
+            "in_use": self.pool.get_size() - idle,
+            "idle": idle,
+            "waiters": self.waiters,
+            "acquires": self.acquires,
+            "acquire_avg_ms": round(self.acquire_seconds / self.acquires * 1000, 3) if self.acquires else 0.0,
+            "acquire_max_ms": round(self.acquire_max_seconds * 1000, 3),
+        }
+
+
+class MeteredAsyncpgDBClient(AsyncpgDBClient):
+    """Tortoise asyncpg client whose pool is a MeteredPool (engine "general_services.db_client")."""
+
+    async def create_pool(self, **kwargs) -> MeteredPool:
+        pool = MeteredPool(await super().create_pool(**kwargs))
+        pools[self.connection_name] = pool
+        return pool
+
+    async def _close(self) -> None:
+        pools.pop(self.connection_name, None)
+        await super()._close()
+
+
+client_class = MeteredAsyncpgDBClient
+
+
+class DbAcquireTimeMiddleware:
+    """Adds up the connection acquire time of each HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        spent = [0.0]
+        token = request_acquire_seconds.set(spent)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_acquire_seconds.reset(token)
+            request_stats["requests"] += 1
+            request_stats["acquire_seconds"] += spent[0]
+            request_stats["acquire_max_seconds"] = max(request_stats["acquire_max_seconds"], spent[0])
+
+
+def db_pool_stats() -> dict:
+    requests = request_stats["requests"]
+    return {
+        "pools": {name: pool.stats() for name, pool in pools.items()},
+        "requests": {
+            "count": requests,
+            "acquire_avg_ms": round(request_stats["acquire_seconds"] / requests * 1000, 3) if requests else 0.0,
+            "acquire_max_ms": round(request_stats["acquire_max_seconds"] * 1000, 3),
+        },
+    }
+
+
+MetricsSvc().register("db_pool", db_pool_stats)
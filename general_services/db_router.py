@@ -0,0 +1,145 @@
+import itertools
+import math
+import time
+from contextvars import ContextVar
+from http.cookies import SimpleCookie
+from typing import List, Optional, Type
+
+from starlette.requests import Request
+from tortoise import BaseDBAsyncClient, Model
+from tortoise.backends.base.client import BaseTransactionWrapper
+from tortoise.connection import connections
+from tortoise.router import router
+
+from auth_jwt.helpers import get_current_user
+from config import DB_READ_AFTER_WRITE_SECONDS, DB_REPLICA_HOSTS, DB_REPLICA_PREFIX
+from general_services.redis_svc import RedisSvc
+from models import PaymentType, Product, Receipt, User
+
+# Models whose reads may be served by a replica
+REPLICA_MODELS = (PaymentType, Product, Receipt, User)
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+# Unix time until which a client's reads stay on the primary
+PRIMARY_COOKIE = "db_primary_until"
+# Set for DB_READ_AFTER_WRITE_SECONDS by a write of the user
+PRIMARY_USER_KEY = "db-primary:{user_id}"
+
+use_primary: ContextVar[bool] = ContextVar("use_primary", default=False)
+# Replica all reads of the current request go to, so they see one point in time
+request_replica: ContextVar[Optional[str]] = ContextVar("request_replica", default=None)
+
+
+def replica_names() -> List[str]:
+    return [name for name in connections.db_config if name.startswith(DB_REPLICA_PREFIX)]
+
+
+class ReplicaRouter:
+    """Sends reads of REPLICA_MODELS to the `replica_*` connections.
+
+    Within a request the replica DbRoutingMiddleware picked, otherwise
+    round-robin per query.
+
+    Everything else, writes, reads inside a transaction and reads of requests
+    pinned by DbRoutingMiddleware use the model's default connection.
+    """
+
+    def __init__(self):
+        self.replicas = itertools.cycle(replica_names() or [None])
+
+    def db_for_read(self, model: Type[Model]) -> Optional[str]:
+        if model not in REPLICA_MODELS or use_primary.get():
+            return None
+        if isinstance(connections.get("default"), BaseTransactionWrapper):
+            return None
+        return request_replica.get() or next(self.replicas)
+
+    def db_for_write(self, model: Type[Model]) -> Optional[str]:
+        return None
+
+
+def db_for_read(model: Type[Model]) -> BaseDBAsyncClient:
+    """Connection a read query of `model` runs on, for raw SQL."""
+    return router.db_for_read(model) or model._meta.db
+
+
+class DbRoutingMiddleware:
+    """Pins requests to the primary around writes and the other requests to
+    one replica, taken round-robin.
+
+    Requests with an unsafe method run entirely on the primary. For
+    DB_READ_AFTER_WRITE_SECONDS after one, the reads of the same client stay
+    on the primary too, so it never reads from a replica that has not caught
+    up with its own write yet. A client is recognized by a PRIMARY_COOKIE,
+    or when it sends none, by a PRIMARY_USER_KEY in Redis for the user of
+    its bearer token.
+    """
+
+    def __init__(self, app, enabled: bool = bool(DB_REPLICA_HOSTS)):
+        self.app = app
+        self.enabled = enabled
+        self.redis_svc = RedisSvc()
+        self.requests = itertools.count()
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        is_write = scope["method"] not in SAFE_METHODS
+        user_id = await self.user_id(scope) if is_write else None
+        if is_write:
+            pinned = True
+        else:
+            pinned = self.pin_cookie(scope)
+            if pinned is None:
+                pinned = await self.is_user_pinned(scope)
+        replicas = replica_names()
+        primary_token = use_primary.set(pinned)
+        replica_token = request_replica.set(
+            replicas[next(self.requests) % len(replicas)] if replicas and not pinned else None
+        )
+        try:
+            await self.app(scope, receive, self.pin(send, user_id) if is_write else send)
+        finally:
+            request_replica.reset(replica_token)
+            use_primary.reset(primary_token)
+
+    async def user_id(self, scope) -> Optional[int]:
+        token_data = await get_current_user(Request(scope))
+        return token_data.user_id if token_data else None
+
+    async def is_user_pinned(self, scope) -> bool:
+        user_id = await self.user_id(scope)
+        return user_id is not None and bool(await self.redis_svc.get(PRIMARY_USER_KEY.format(user_id=user_id)))
+
+    def pin_cookie(self, scope) -> Optional[bool]:
+        """Whether the PRIMARY_COOKIE pins the request; None without one."""
+        for name, value in scope["headers"]:
+            if name == b"cookie" and PRIMARY_COOKIE.encode() in value:
+                morsel = SimpleCookie(value.decode("latin-1")).get(PRIMARY_COOKIE)
+                if morsel is None:
+                    return None
+                try:
+                    until = float(morsel.value)
+                except ValueError:
+                    return False
+                # The client may not stretch the pin beyond what a write gives
+                now = time.time()
+                return now < until <= now + DB_READ_AFTER_WRITE_SECONDS
+        return None
+
+    def pin(self, send, user_id: Optional[int]):
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start":
+                if user_id is not None:
+                    await self.redis_svc.set(
+                        PRIMARY_USER_KEY.format(user_id=user_id), 1, ex=math.ceil(DB_READ_AFTER_WRITE_SECONDS)
+                    )
+                until = time.time() + DB_READ_AFTER_WRITE_SECONDS
+                cookie = (
+                    f"{PRIMARY_COOKIE}={until:.3f}; Max-Age={int(DB_READ_AFTER_WRITE_SECONDS) + 1}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", cookie.encode())]
+            await send(message)
+        return send_with_cookie
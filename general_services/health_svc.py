@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+from tortoise import Tortoise
+
+from config import READINESS_CACHE_SECONDS, READINESS_TIMEOUT, redis_client
+
+
+class HealthSvc:
+    """Readiness checks against the already opened DB and Redis pools.
+
+    The result is cached for READINESS_CACHE_SECONDS so frequent probes from
+    many pods do not turn into a constant stream of DB/Redis round trips.
+    """
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._result = None
+        self._checked_at = 0.0
+
+    async def readiness(self) -> dict:
+        if self._is_fresh():
+            return self._result
+        async with self._lock:
+            if not self._is_fresh():
+                self._result = await self._run_checks()
+                self._checked_at = time.monotonic()
+        return self._result
+
+    def _is_fresh(self) -> bool:
+        return self._result is not None and time.monotonic() - self._checked_at < READINESS_CACHE_SECONDS
+
+    async def _run_checks(self) -> dict:
+        db, redis = await asyncio.gather(
+            self._check(self._check_db()),
+            self._check(self._check_redis()),
+        )
+        checks = {"db": db, "redis": redis}
+        is_ready = all(value == "ok" for value in checks.values())
+        return {"status": "ok" if is_ready else "fail", "checks": checks}
+
+    @staticmethod
+    async def _check(coro) -> str:
+        try:
+            await asyncio.wait_for(coro, timeout=READINESS_TIMEOUT)
+        except asyncio.TimeoutError:
+            return "timeout"
+        except Exception as e:
+            return f"error: {e.__class__.__name__}"
+        return "ok"
+
+    @staticmethod
+    async def _check_db():
+        await Tortoise.get_connection("default").execute_query("SELECT 1")
+
+    @staticmethod
+    async def _check_redis():
+        await redis_client.ping()
@@ -0,0 +1,128 @@
+import asyncio
+import hashlib
+import time
+import uuid
+from datetime import timedelta
+from typing import Awaitable, Callable, Optional, Union
+
+from fastapi import HTTPException, Response, status
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from tortoise import BaseDBAsyncClient
+from tortoise.exceptions import IntegrityError
+
+from config import IDEMPOTENCY_LOCK_SECONDS, IDEMPOTENCY_TTL_SECONDS
+from general_services.redis_svc import RedisSvc
+from models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+LOCK_POLL_SECONDS = 0.05
+
+Record = Callable[[BaseDBAsyncClient, Union[BaseModel, Response]], Awaitable[None]]
+
+
+class IdempotencySvc:
+    """Runs a request once per (user, scope, Idempotency-Key).
+
+    The handler gets a `record` callback to await inside its transaction with
+    the response it is about to return; that stores the body in
+    idempotency_keys, whose unique constraint makes a second insert fail.
+    After commit the body is also kept in Redis for IDEMPOTENCY_TTL_SECONDS, so
+    retries are answered from Redis alone. A short Redis lock makes concurrent
+    duplicates wait for the first request instead of inserting too.
+    """
+
+    def __init__(self):
+        self.redis_svc = RedisSvc()
+
+    async def run(
+            self,
+            user_id: int,
+            scope: str,
+            key: str,
+            payload: bytes,
+            handler: Callable[[Record], Awaitable[Union[BaseModel, Response]]],
+    ) -> Union[BaseModel, Response]:
+        request_hash = hashlib.sha256(payload).hexdigest()
+        cache_key = f"idempotency:{user_id}:{scope}:{key}"
+        lock_key, lock_token = f"{cache_key}:lock", uuid.uuid4().hex
+
+        deadline = time.monotonic() + IDEMPOTENCY_LOCK_SECONDS
+        while True:
+            replay = self.replay(await self.redis_svc.get(cache_key), request_hash)
+            if replay is not None:
+                return replay
+            lock_ttl = timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)
+            if await self.redis_svc.set(lock_key, lock_token, ex=lock_ttl, nx=True):
+                break
+            if time.monotonic() >= deadline:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="A request with this Idempotency-Key is in progress",
+                )
+            await asyncio.sleep(LOCK_POLL_SECONDS)
+
+        try:
+            # Redis may have lost the entry; the table still has it
+            replay = await self.stored_replay(cache_key, user_id, scope, key, request_hash)
+            if replay is not None:
+                return replay
+
+            stored = {}
+
+            async def record(connection: BaseDBAsyncClient, content: Union[BaseModel, Response]):
+                body = content.body if isinstance(content, Response) else \
+                    JSONResponse(content=content.model_dump(mode="json")).body
+                stored.update(hash=request_hash, body=body.decode())
+                await IdempotencyKey.create(
+                    user_id=user_id,
+                    scope=scope,
+                    key=key,
+                    request_hash=request_hash,
+                    response=stored["body"],
+                    using_db=connection,
+                )
+
+            try:
+                response = await handler(record)
+            except IntegrityError:
+                # Another request with the key committed first
+                replay = await self.stored_replay(cache_key, user_id, scope, key, request_hash)
+                if replay is None:
+                    raise
+                return replay
+
+            if stored:
+                await self.redis_svc.set(cache_key, stored, ex=IDEMPOTENCY_TTL_SECONDS)
+            return response
+        finally:
+            # Not atomic, but the lock only has to outlive the request; the
+            # unique constraint catches anything that slips past it
+            if await self.redis_svc.get(lock_key) == lock_token:
+                await self.redis_svc.delete(lock_key)
+
+    async def stored_replay(
+            self, cache_key: str, user_id: int, scope: str, key: str, request_hash: str
+    ) -> Optional[Response]:
+        row = await IdempotencyKey.get_or_none(user_id=user_id, scope=scope, key=key).values(
+            "request_hash", "response"
+        )
+        if not row:
+            return None
+        stored = {"hash": row["request_hash"], "body": row["response"]}
+        await self.redis_svc.set(cache_key, stored, ex=IDEMPOTENCY_TTL_SECONDS)
+        return self.replay(stored, request_hash)
+
+    def replay(self, stored: Optional[dict], request_hash: str) -> Optional[Response]:
+        if not stored:
+            return None
+        if stored["hash"] != request_hash:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used for a different request",
+            )
+        return Response(
+            content=stored["body"],
+            media_type="application/json",
+            headers={"Idempotency-Replayed": "true"},
+        )
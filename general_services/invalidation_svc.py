@@ -0,0 +1,63 @@
+import asyncio
+import json
+import logging
+
+from config import INVALIDATION_CHANNEL, redis_client
+
+logger = logging.getLogger(__name__)
+# How long one read of the subscription waits for an event. Passed to
+# get_message explicitly, so an idle channel does not hit the pool's
+# socket_timeout and look like a broken connection.
+LISTEN_TIMEOUT = 30
+
+
+class InvalidationSvc:
+    """Fans cache invalidation events out to every worker via Redis pub/sub.
+
+    Handlers are plain callables registered per topic. `publish` runs the
+    local handlers right away, so the publishing worker never serves a stale
+    entry, and the listener task applies events coming from other workers.
+    If the subscription drops, `reset` callbacks are run once it is back,
+    because events may have been missed in between.
+    """
+
+    _handlers = {}
+    _resets = []
+
+    def subscribe(self, topic: str, handler, reset=None):
+        InvalidationSvc._handlers.setdefault(topic, []).append(handler)
+        if reset:
+            InvalidationSvc._resets.append(reset)
+
+    async def publish(self, topic: str, data: dict):
+        self._dispatch(topic, data)
+        message = json.dumps({"topic": topic, "data": data})
+        await redis_client.publish(INVALIDATION_CHANNEL, message)
+
+    async def listen(self):
+        reconnect = False
+        while True:
+            try:
+                async with redis_client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    if reconnect:
+                        self._reset()
+                    while True:
+                        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=LISTEN_TIMEOUT)
+                        if message is not None:
+                            event = json.loads(message["data"])
+                            self._dispatch(event["topic"], event["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Invalidation listener failed, resubscribing")
+                reconnect = True
+                await asyncio.sleep(1)
+
+    def _dispatch(self, topic: str, data: dict):
+        for handler in InvalidationSvc._handlers.get(topic, ()):
+            handler(data)
+
+    def _reset(self):
+        for reset in InvalidationSvc._resets:
+            reset()
@@ -0,0 +1,10 @@
+class MetricsSvc:
+    """Process-wide registry of named stats callables exposed on /metrics."""
+
+    _sources = {}
+
+    def register(self, name: str, source):
+        MetricsSvc._sources[name] = source
+
+    def collect(self) -> dict:
+        return {name: source() for name, source in MetricsSvc._sources.items()}
@@ -0,0 +1,41 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+from config import BCRYPT_ROUNDS, PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_WORKERS
+
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the event loop
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+
+
+class PasswordSvcBusyError(Exception):
+    """PASSWORD_HASH_MAX_PENDING hashes are already queued or running."""
+
+
+def hash_password(password: str) -> str:
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+    return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
+
+
+def check_password(password: str, hashed: str) -> bool:
+    return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+
+
+class PasswordSvc:
+    pending = 0
+
+    async def hash_password(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def check_password(self, password: str, hashed: str) -> bool:
+        return await self._run(check_password, password, hashed)
+
+    async def _run(self, func, *args):
+        if PasswordSvc.pending >= PASSWORD_HASH_MAX_PENDING:
+            raise PasswordSvcBusyError()
+        PasswordSvc.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+        finally:
+            PasswordSvc.pending -= 1
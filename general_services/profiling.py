@@ -0,0 +1,189 @@
+import functools
+import inspect
+import logging
+import random
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from tortoise.backends.asyncpg.client import AsyncpgDBClient
+from tortoise.backends.asyncpg.client import TransactionWrapper as AsyncpgTransactionWrapper
+from tortoise.backends.base_postgres.client import BasePostgresClient
+from tortoise.backends.sqlite.client import SqliteClient
+from tortoise.backends.sqlite.client import TransactionWrapper as SqliteTransactionWrapper
+
+from config import (
+    PROFILING_ENABLED,
+    PROFILING_LOGGED_QUERIES,
+    PROFILING_SAMPLE_RATE,
+    PROFILING_SLOW_QUERY_COUNT,
+    PROFILING_SLOW_REQUEST_MS,
+)
+from general_services.redis_svc import RedisSvc
+
+logger = logging.getLogger(__name__)
+
+# Every statement Tortoise runs goes through one of these; none of them calls another
+DB_CLIENT_CLASSES = (
+    SqliteClient, SqliteTransactionWrapper, BasePostgresClient, AsyncpgDBClient, AsyncpgTransactionWrapper,
+)
+QUERY_METHODS = ("execute_insert", "execute_many", "execute_query", "execute_query_dict", "execute_script")
+SERVER_TIMING = ("db", "redis", "render", "serialize")
+
+
+class RequestProfile:
+    """Time and calls of one request, by kind: db, redis, render, serialize."""
+
+    __slots__ = ("seconds", "calls", "queries")
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = dict.fromkeys(SERVER_TIMING, 0.0)
+        self.calls: Dict[str, int] = dict.fromkeys(SERVER_TIMING, 0)
+        # (milliseconds, statement) of the first PROFILING_LOGGED_QUERIES queries
+        self.queries: List[Tuple[float, str]] = []
+
+    def add(self, kind: str, seconds: float):
+        self.seconds[kind] = self.seconds.get(kind, 0.0) + seconds
+        self.calls[kind] = self.calls.get(kind, 0) + 1
+
+    def server_timing(self, total_seconds: float) -> str:
+        metrics = [
+            f'{kind};dur={self.seconds[kind] * 1000:.1f};desc="{self.calls[kind]}"'
+            for kind in self.seconds
+            if self.calls[kind] or kind in ("db", "redis")
+        ]
+        metrics.append(f"app;dur={total_seconds * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+request_profile: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+
+class timing:
+    """Adds the time spent in the block to the current request's `kind`.
+
+    Outside of a profiled request it only looks up the context variable.
+    """
+
+    __slots__ = ("kind", "profile", "started")
+
+    def __init__(self, kind: str):
+        self.kind = kind
+
+    def __enter__(self):
+        self.profile = request_profile.get()
+        if self.profile is not None:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.profile is not None:
+            self.profile.add(self.kind, time.perf_counter() - self.started)
+
+
+def profiled_query(method):
+    @functools.wraps(method)
+    async def wrapper(self, query: str, *args, **kwargs):
+        profile = request_profile.get()
+        if profile is None:
+            return await method(self, query, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return await method(self, query, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            profile.add("db", elapsed)
+            if len(profile.queries) < PROFILING_LOGGED_QUERIES:
+                profile.queries.append((round(elapsed * 1000, 3), query))
+
+    wrapper.profiled = True
+    return wrapper
+
+
+def profiled_call(kind: str, method):
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        profile = request_profile.get()
+        if profile is None:
+            return await method(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            profile.add(kind, time.perf_counter() - started)
+
+    wrapper.profiled = True
+    return wrapper
+
+
+def install():
+    """Wraps the Tortoise clients' query methods and RedisSvc's calls; idempotent.
+
+    Only done when profiling is enabled, so a disabled profiler adds nothing
+    to a query or a Redis call.
+    """
+    for client_class in DB_CLIENT_CLASSES:
+        for name in QUERY_METHODS:
+            method = vars(client_class).get(name)
+            if method and not getattr(method, "profiled", False):
+                setattr(client_class, name, profiled_query(method))
+    for name, method in list(vars(RedisSvc).items()):
+        if inspect.iscoroutinefunction(method) and not getattr(method, "profiled", False):
+            setattr(RedisSvc, name, profiled_call("redis", method))
+
+
+class ProfilingMiddleware:
+    """Counts and times DB queries, RedisSvc calls, rendering and serialization
+    of a PROFILING_SAMPLE_RATE share of HTTP requests.
+
+    Sampled responses get a Server-Timing header with what was measured before
+    the response started (a streamed body is still being produced); requests
+    slower than PROFILING_SLOW_REQUEST_MS or with at least
+    PROFILING_SLOW_QUERY_COUNT queries are logged with their SQL.
+    """
+
+    def __init__(self, app, enabled: bool = PROFILING_ENABLED, sample_rate: float = PROFILING_SAMPLE_RATE):
+        self.app = app
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        if enabled:
+            install()
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http" or random.random() >= self.sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        token = request_profile.set(profile)
+        started = time.perf_counter()
+        status = None
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                timing_header = profile.server_timing(time.perf_counter() - started)
+                message["headers"] = [*message.get("headers", []), (b"server-timing", timing_header.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_profile.reset(token)
+            elapsed = time.perf_counter() - started
+            if elapsed * 1000 >= PROFILING_SLOW_REQUEST_MS or profile.calls["db"] >= PROFILING_SLOW_QUERY_COUNT:
+                self.log_slow_request(scope, status, elapsed, profile)
+
+    def log_slow_request(self, scope, status: Optional[int], elapsed: float, profile: RequestProfile):
+        counts = " ".join(
+            f"{kind}={profile.calls[kind]}/{profile.seconds[kind] * 1000:.1f}ms"
+            for kind in profile.seconds if profile.calls[kind]
+        )
+        queries = "".join(f"\n  {milliseconds:8.3f} ms  {query}" for milliseconds, query in profile.queries)
+        if profile.calls["db"] > len(profile.queries):
+            queries += f"\n  ... {profile.calls['db'] - len(profile.queries)} more"
+        logger.warning(
+            "Slow request %s %s -> %s in %.1f ms: %s%s",
+            scope["method"], scope["path"], status, elapsed * 1000, counts, queries,
+        )
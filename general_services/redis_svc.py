@@ -1,18 +1,40 @@
 import json
+from contextlib import asynccontextmanager
 
-from config import redis_client
+from config import redis_client, redis_pool
+
+
+@asynccontextmanager
+async def redis_lifespan(app):
+    # Pooled connections are bound to the event loop that opened them
+    yield
+    await redis_pool.disconnect()
 
 
 class RedisSvc:
-    def hset(self, name, key, value):
+    async def hset(self, name, key, value):
+        data = json.dumps(value)
+        await redis_client.hset(name, mapping={key: data})
+
+    async def hset_many(self, name, mapping: dict):
+        data = {key: json.dumps(value) for key, value in mapping.items()}
+        await redis_client.hset(name, mapping=data)
+
+    async def hget(self, name, key):
+        data = await redis_client.hget(name, key)
+        if not data:
+            return
+        return json.loads(data)
+
+    async def set(self, key, value, ex=None, nx=False) -> bool:
         data = json.dumps(value)
-        redis_client.hset(name, mapping={key: data})
+        return bool(await redis_client.set(key, data, ex=ex, nx=nx))
 
-    def hget(self, name, key):
-        data = redis_client.hget(name, key)
+    async def get(self, key):
+        data = await redis_client.get(key)
         if not data:
             return
         return json.loads(data)
 
-    def delete(self, key):
-        redis_client.delete(key)
+    async def delete(self, key):
+        await redis_client.delete(key)
@@ -1,14 +1,63 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI, Request
-from config import init_db_connect, run_async
+from fastapi.responses import JSONResponse
+from tortoise import Tortoise
+
+from apps.receipt_app.services.payment_type_registry import payment_type_registry
+from config import init_db_connect
+from general_services.db_client import DbAcquireTimeMiddleware
+from general_services.db_router import DbRoutingMiddleware
+from general_services.health_svc import HealthSvc
+from general_services.invalidation_svc import InvalidationSvc
+from general_services.metrics_svc import MetricsSvc
+from general_services.profiling import ProfilingMiddleware
+from general_services.redis_svc import redis_lifespan
 from routes import api_router as api_routes
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await init_db_connect()
+    await payment_type_registry.load()
+    async with redis_lifespan(app):
+        invalidation_listener = asyncio.create_task(InvalidationSvc().listen())
+        yield
+        invalidation_listener.cancel()
+        with suppress(asyncio.CancelledError):
+            await invalidation_listener
+    await Tortoise.close_connections()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(DbAcquireTimeMiddleware)
+app.add_middleware(DbRoutingMiddleware)
+# Outermost, so it sees the time spent in the other middleware
+app.add_middleware(ProfilingMiddleware)
 
 app.include_router(api_routes, prefix="/api")
-run_async(init_db_connect())
+
+health_svc = HealthSvc()
+
+
+@app.get("/livez")
+async def livez(request: Request):
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz(request: Request):
+    result = await health_svc.readiness()
+    status_code = 200 if result["status"] == "ok" else 503
+    return JSONResponse(content=result, status_code=status_code)
 
 
 @app.get("/healthcheck")
 async def healthcheck(request: Request):
-    await init_db_connect()
-    return {"status": "app server is running, db connection ok..."}
+    return await readyz(request)
+
+
+@app.get("/metrics")
+async def metrics(request: Request):
+    return MetricsSvc().collect()
@@ -0,0 +1,38 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "products" ADD "price_cents" BIGINT, ADD "quantity_milli" BIGINT, ADD "total_cents" BIGINT;
+        UPDATE "products" SET
+            "price_cents" = round("price"::numeric * 100),
+            "quantity_milli" = "quantity"::bigint * 1000;
+        -- Whole quantities, so money.line_total_cents is exact
+        UPDATE "products" SET "total_cents" = "price_cents" * "quantity";
+        ALTER TABLE "products"
+            ALTER COLUMN "price_cents" SET NOT NULL,
+            ALTER COLUMN "quantity_milli" SET NOT NULL,
+            ALTER COLUMN "total_cents" SET NOT NULL;
+        ALTER TABLE "products" DROP COLUMN "price", DROP COLUMN "quantity";
+        ALTER TABLE "receipts" ADD "amount_cents" BIGINT, ADD "total_cents" BIGINT;
+        -- The total is the sum of the line totals, as for new receipts
+        UPDATE "receipts" r SET
+            "amount_cents" = round(r."amount"::numeric * 100),
+            "total_cents" = COALESCE((SELECT SUM(p."total_cents") FROM "products" p WHERE p."receipt_id" = r."id"), 0);
+        ALTER TABLE "receipts" ALTER COLUMN "amount_cents" SET NOT NULL, ALTER COLUMN "total_cents" SET NOT NULL;
+        DROP INDEX IF EXISTS "idx_receipts_user_id_da1346";
+        ALTER TABLE "receipts" DROP COLUMN "amount", DROP COLUMN "total";
+        CREATE INDEX "idx_receipts_user_id_ec15d5" ON "receipts" ("user_id", "total_cents");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "receipts" ADD "amount" DOUBLE PRECISION, ADD "total" DOUBLE PRECISION;
+        UPDATE "receipts" SET "amount" = "amount_cents" / 100.0, "total" = "total_cents" / 100.0;
+        ALTER TABLE "receipts" ALTER COLUMN "amount" SET NOT NULL, ALTER COLUMN "total" SET NOT NULL;
+        DROP INDEX IF EXISTS "idx_receipts_user_id_ec15d5";
+        ALTER TABLE "receipts" DROP COLUMN "amount_cents", DROP COLUMN "total_cents";
+        CREATE INDEX "idx_receipts_user_id_da1346" ON "receipts" ("user_id", "total");
+        ALTER TABLE "products" ADD "price" DOUBLE PRECISION NOT NULL DEFAULT 0, ADD "quantity" INT NOT NULL DEFAULT 0;
+        UPDATE "products" SET "price" = "price_cents" / 100.0, "quantity" = "quantity_milli" / 1000;
+        ALTER TABLE "products" DROP COLUMN "price_cents", DROP COLUMN "quantity_milli", DROP COLUMN "total_cents";"""
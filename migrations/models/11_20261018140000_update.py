@@ -0,0 +1,16 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "receipts" ADD "products_count" INT NOT NULL DEFAULT 0;
+        UPDATE "receipts" SET "products_count" = "counts"."products_count"
+        FROM (
+            SELECT "receipt_id", COUNT(*) AS "products_count" FROM "products" GROUP BY "receipt_id"
+        ) AS "counts"
+        WHERE "counts"."receipt_id" = "receipts"."id";"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "receipts" DROP COLUMN "products_count";"""
@@ -0,0 +1,160 @@
+from tortoise import BaseDBAsyncClient
+
+# Monthly partitions, UTC month boundaries, named <parent>_pYYYY_MM. Rows of a
+# month that went to <parent>_default while it had no partition are moved into
+# it: copied to a standalone table, deleted from the default partition
+# (referencing tables first) and attached, so `parents` lists referenced
+# tables first.
+CREATE_MONTH_PARTITIONS = """
+        CREATE OR REPLACE FUNCTION "create_month_partitions"(parents TEXT[], first_day TIMESTAMPTZ, last_day TIMESTAMPTZ)
+        RETURNS INT LANGUAGE plpgsql AS $$
+        DECLARE
+            month_start TIMESTAMP := date_trunc('month', first_day AT TIME ZONE 'UTC');
+            range_start TIMESTAMPTZ;
+            range_end TIMESTAMPTZ;
+            missing TEXT[];
+            i INT;
+            created INT := 0;
+        BEGIN
+            WHILE month_start <= last_day AT TIME ZONE 'UTC' LOOP
+                range_start := month_start AT TIME ZONE 'UTC';
+                range_end := (month_start + interval '1 month') AT TIME ZONE 'UTC';
+                missing := ARRAY(
+                    SELECT parent FROM unnest(parents) WITH ORDINALITY AS p (parent, position)
+                    WHERE to_regclass(quote_ident(parent || '_p' || to_char(month_start, 'YYYY_MM'))) IS NULL
+                    ORDER BY position
+                );
+                FOR i IN 1..COALESCE(array_length(missing, 1), 0) LOOP
+                    EXECUTE format(
+                        'CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS)',
+                        missing[i] || '_p' || to_char(month_start, 'YYYY_MM'), missing[i]
+                    );
+                    EXECUTE format(
+                        'INSERT INTO %I SELECT * FROM %I WHERE "created_at" >= %L AND "created_at" < %L',
+                        missing[i] || '_p' || to_char(month_start, 'YYYY_MM'), missing[i] || '_default',
+                        range_start, range_end
+                    );
+                END LOOP;
+                FOR i IN REVERSE COALESCE(array_length(missing, 1), 0)..1 LOOP
+                    EXECUTE format(
+                        'DELETE FROM %I WHERE "created_at" >= %L AND "created_at" < %L',
+                        missing[i] || '_default', range_start, range_end
+                    );
+                END LOOP;
+                FOR i IN 1..COALESCE(array_length(missing, 1), 0) LOOP
+                    EXECUTE format(
+                        'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                        missing[i], missing[i] || '_p' || to_char(month_start, 'YYYY_MM'), range_start, range_end
+                    );
+                    created := created + 1;
+                END LOOP;
+                month_start := month_start + interval '1 month';
+            END LOOP;
+            RETURN created;
+        END $$;"""
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return CREATE_MONTH_PARTITIONS + """
+        ALTER TABLE "products" RENAME TO "products_unpartitioned";
+        ALTER TABLE "receipts" RENAME TO "receipts_unpartitioned";
+        ALTER SEQUENCE "receipts_id_seq" OWNED BY NONE;
+        ALTER SEQUENCE "products_id_seq" OWNED BY NONE;
+        CREATE TABLE "receipts" (
+            "id" INT NOT NULL DEFAULT nextval('receipts_id_seq'),
+            "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            "payment_type_id" INT NOT NULL,
+            "user_id" INT NOT NULL,
+            "amount_cents" BIGINT NOT NULL,
+            "total_cents" BIGINT NOT NULL,
+            "products_count" INT NOT NULL DEFAULT 0
+        ) PARTITION BY RANGE ("created_at");
+        CREATE TABLE "products" (
+            "id" INT NOT NULL DEFAULT nextval('products_id_seq'),
+            "name" VARCHAR(200) NOT NULL,
+            "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            "receipt_id" INT NOT NULL,
+            "price_cents" BIGINT NOT NULL,
+            "quantity_milli" BIGINT NOT NULL,
+            "total_cents" BIGINT NOT NULL
+        ) PARTITION BY RANGE ("created_at");
+        CREATE TABLE "receipts_default" PARTITION OF "receipts" DEFAULT;
+        CREATE TABLE "products_default" PARTITION OF "products" DEFAULT;
+        SELECT "create_month_partitions"(
+            ARRAY['receipts', 'products'],
+            COALESCE((SELECT MIN("created_at") FROM "receipts_unpartitioned"), now()),
+            now() + interval '3 months'
+        );
+        INSERT INTO "receipts" (
+            "id", "created_at", "payment_type_id", "user_id", "amount_cents", "total_cents", "products_count"
+        )
+        SELECT "id", "created_at", "payment_type_id", "user_id", "amount_cents", "total_cents", "products_count"
+        FROM "receipts_unpartitioned";
+        INSERT INTO "products" (
+            "id", "name", "created_at", "receipt_id", "price_cents", "quantity_milli", "total_cents"
+        )
+        SELECT p."id", p."name", r."created_at", p."receipt_id", p."price_cents", p."quantity_milli", p."total_cents"
+        FROM "products_unpartitioned" p JOIN "receipts_unpartitioned" r ON r."id" = p."receipt_id";
+        DROP TABLE "products_unpartitioned";
+        DROP TABLE "receipts_unpartitioned";
+        ALTER SEQUENCE "receipts_id_seq" OWNED BY "receipts"."id";
+        ALTER SEQUENCE "products_id_seq" OWNED BY "products"."id";
+        ALTER TABLE "receipts"
+            ADD PRIMARY KEY ("id", "created_at"),
+            ADD FOREIGN KEY ("payment_type_id") REFERENCES "payment_types" ("id") ON DELETE CASCADE,
+            ADD FOREIGN KEY ("user_id") REFERENCES "users" ("id") ON DELETE CASCADE;
+        CREATE INDEX "idx_receipts_user_id_1a4325" ON "receipts" ("user_id", "created_at", "id");
+        CREATE INDEX "idx_receipts_user_id_5a1b60" ON "receipts" ("user_id", "payment_type_id", "created_at", "id");
+        CREATE INDEX "idx_receipts_user_id_ec15d5" ON "receipts" ("user_id", "total_cents");
+        CREATE INDEX "idx_receipts_user_id_911310" ON "receipts" ("user_id", "id");
+        ALTER TABLE "products"
+            ADD PRIMARY KEY ("id", "created_at"),
+            ADD FOREIGN KEY ("receipt_id", "created_at") REFERENCES "receipts" ("id", "created_at")
+                ON DELETE CASCADE ON UPDATE CASCADE;
+        CREATE INDEX "idx_products_receipt_99b4a8" ON "products" ("receipt_id", "id");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "products" RENAME TO "products_partitioned";
+        ALTER TABLE "receipts" RENAME TO "receipts_partitioned";
+        ALTER SEQUENCE "receipts_id_seq" OWNED BY NONE;
+        ALTER SEQUENCE "products_id_seq" OWNED BY NONE;
+        ALTER TABLE "products_partitioned" DROP CONSTRAINT "products_pkey";
+        ALTER TABLE "receipts_partitioned" DROP CONSTRAINT "receipts_pkey" CASCADE;
+        DROP INDEX "idx_receipts_user_id_1a4325", "idx_receipts_user_id_5a1b60", "idx_receipts_user_id_ec15d5",
+            "idx_receipts_user_id_911310", "idx_products_receipt_99b4a8";
+        CREATE TABLE "receipts" (
+            "id" INT NOT NULL DEFAULT nextval('receipts_id_seq') PRIMARY KEY,
+            "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            "payment_type_id" INT NOT NULL REFERENCES "payment_types" ("id") ON DELETE CASCADE,
+            "user_id" INT NOT NULL REFERENCES "users" ("id") ON DELETE CASCADE,
+            "amount_cents" BIGINT NOT NULL,
+            "total_cents" BIGINT NOT NULL,
+            "products_count" INT NOT NULL DEFAULT 0
+        );
+        CREATE TABLE "products" (
+            "id" INT NOT NULL DEFAULT nextval('products_id_seq') PRIMARY KEY,
+            "name" VARCHAR(200) NOT NULL,
+            "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            "receipt_id" INT NOT NULL REFERENCES "receipts" ("id") ON DELETE CASCADE,
+            "price_cents" BIGINT NOT NULL,
+            "quantity_milli" BIGINT NOT NULL,
+            "total_cents" BIGINT NOT NULL
+        );
+        INSERT INTO "receipts" SELECT
+            "id", "created_at", "payment_type_id", "user_id", "amount_cents", "total_cents", "products_count"
+        FROM "receipts_partitioned";
+        INSERT INTO "products" SELECT
+            "id", "name", "created_at", "receipt_id", "price_cents", "quantity_milli", "total_cents"
+        FROM "products_partitioned";
+        DROP TABLE "products_partitioned";
+        DROP TABLE "receipts_partitioned";
+        ALTER SEQUENCE "receipts_id_seq" OWNED BY "receipts"."id";
+        ALTER SEQUENCE "products_id_seq" OWNED BY "products"."id";
+        CREATE INDEX "idx_receipts_user_id_1a4325" ON "receipts" ("user_id", "created_at", "id");
+        CREATE INDEX "idx_receipts_user_id_5a1b60" ON "receipts" ("user_id", "payment_type_id", "created_at", "id");
+        CREATE INDEX "idx_receipts_user_id_ec15d5" ON "receipts" ("user_id", "total_cents");
+        CREATE INDEX "idx_receipts_user_id_911310" ON "receipts" ("user_id", "id");
+        CREATE INDEX "idx_products_receipt_99b4a8" ON "products" ("receipt_id", "id");
+        DROP FUNCTION "create_month_partitions";"""
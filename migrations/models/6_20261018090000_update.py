@@ -0,0 +1,13 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE INDEX "idx_receipts_user_id_1a4325" ON "receipts" ("user_id", "created_at", "id");
+        CREATE INDEX "idx_products_receipt_f44563" ON "products" ("receipt_id");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_receipts_user_id_1a4325";
+        DROP INDEX IF EXISTS "idx_products_receipt_f44563";"""
@@ -0,0 +1,13 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE INDEX "idx_receipts_user_id_5a1b60" ON "receipts" ("user_id", "payment_type_id", "created_at", "id");
+        CREATE INDEX "idx_receipts_user_id_da1346" ON "receipts" ("user_id", "total");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_receipts_user_id_5a1b60";
+        DROP INDEX IF EXISTS "idx_receipts_user_id_da1346";"""
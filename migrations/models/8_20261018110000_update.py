@@ -0,0 +1,15 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE INDEX "idx_receipts_user_id_911310" ON "receipts" ("user_id", "id");
+        CREATE INDEX "idx_products_receipt_99b4a8" ON "products" ("receipt_id", "id");
+        DROP INDEX IF EXISTS "idx_products_receipt_f44563";"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE INDEX "idx_products_receipt_f44563" ON "products" ("receipt_id");
+        DROP INDEX IF EXISTS "idx_receipts_user_id_911310";
+        DROP INDEX IF EXISTS "idx_products_receipt_99b4a8";"""
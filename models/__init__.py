@@ -2,3 +2,4 @@ from .user import User
 from .payment_type import PaymentType
 from .receipt import Receipt
 from .product import Product
+from .idempotency_key import IdempotencyKey
@@ -0,0 +1,16 @@
+from tortoise import fields
+from tortoise.models import Model
+
+
+class IdempotencyKey(Model):
+    id = fields.IntField(primary_key=True)
+    user = fields.ForeignKeyField("models.User", related_name="idempotency_keys")
+    scope = fields.CharField(max_length=50)
+    key = fields.CharField(max_length=255)
+    request_hash = fields.CharField(max_length=64)
+    response = fields.TextField()
+    created_at = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        table = "idempotency_keys"
+        unique_together = (("user", "scope", "key"),)
@@ -5,11 +5,15 @@ from tortoise.models import Model
 class Product(Model):
     id = fields.IntField(primary_key=True)
     name = fields.CharField(max_length=200)
-    price = fields.FloatField(default=0)
-    quantity = fields.IntField(default=0)
+    price_cents = fields.BigIntField()
+    quantity_milli = fields.BigIntField()
+    # price x quantity, computed once at insert
+    total_cents = fields.BigIntField()
     receipt = fields.ForeignKeyField("models.Receipt", related_name="products")
+    # Always the receipt's created_at: both tables are partitioned by it
     created_at = fields.DatetimeField(auto_now_add=True)
 
     class Meta:
         table = "products"
+        indexes = (("receipt_id", "id"),)
 
@@ -6,10 +6,18 @@ class Receipt(Model):
     id = fields.IntField(primary_key=True)
     user = fields.ForeignKeyField("models.User", related_name="receipts")
     payment_type = fields.ForeignKeyField("models.PaymentType", related_name="receipts")
-    amount = fields.FloatField()
-    total = fields.FloatField()
+    # Money is kept in integer cents, see apps.receipt_app.money
+    amount_cents = fields.BigIntField()
+    total_cents = fields.BigIntField()
+    products_count = fields.IntField(default=0)
     created_at = fields.DatetimeField(auto_now_add=True)
 
     class Meta:
         table = "receipts"
+        indexes = (
+            ("user_id", "created_at", "id"),
+            ("user_id", "payment_type_id", "created_at", "id"),
+            ("user_id", "total_cents"),
+            ("user_id", "id"),
+        )
 
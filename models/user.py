@@ -1,7 +1,8 @@
-import bcrypt
 from tortoise import fields
 from tortoise.models import Model
 
+from general_services.password_svc import PasswordSvc, check_password, hash_password
+
 
 class User(Model):
     id = fields.IntField(primary_key=True)
@@ -18,9 +19,13 @@ class User(Model):
         return f"<User id: {self.id} username: {self.username}>"
 
     def set_password(self, password: str):
-        salt = bcrypt.gensalt()
-        self.password = bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
+        self.password = hash_password(password)
 
     def check_password(self, password: str) -> bool:
-        return bcrypt.checkpw(password.encode("utf-8"), self.password.encode("utf-8"))
+        return check_password(password, self.password)
+
+    async def set_password_async(self, password: str):
+        self.password = await PasswordSvc().hash_password(password)
 
+    async def check_password_async(self, password: str) -> bool:
+        return await PasswordSvc().check_password(password, self.password)
@@ -0,0 +1,38 @@
+import argparse
+import asyncio
+import sys
+from datetime import date
+from pathlib import Path
+
+from tortoise import Tortoise
+
+# Добавляем родительский каталог (где находится config.py) в sys.path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from apps.receipt_app.services.receipt_partition_svc import ReceiptPartitionSvc
+from config import RECEIPT_ARCHIVE_DIR, TORTOISE_ORM
+
+
+async def archive_partitions(before: date, output_dir: str, keep_tables: bool):
+    await Tortoise.init(config=TORTOISE_ORM)
+    for path in await ReceiptPartitionSvc().archive(before, output_dir, keep_tables):
+        print("Archived", path)
+    await Tortoise.close_connections()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Dump monthly receipt and product partitions to gzipped CSV and detach them"
+    )
+    parser.add_argument(
+        "--before", type=date.fromisoformat, default=None,
+        help="archive the months that end on or before this date (default: RECEIPT_ARCHIVE_AFTER_MONTHS ago)",
+    )
+    parser.add_argument("--output-dir", default=RECEIPT_ARCHIVE_DIR)
+    parser.add_argument("--keep-tables", action="store_true", help="keep detached partitions instead of dropping them")
+    args = parser.parse_args()
+    asyncio.run(archive_partitions(args.before, args.output_dir, args.keep_tables))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+from tortoise import Tortoise
+
+# Добавляем родительский каталог (где находится config.py) в sys.path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from apps.receipt_app.services.receipt_partition_svc import ReceiptPartitionSvc
+from config import RECEIPT_PARTITION_MONTHS_AHEAD, TORTOISE_ORM
+
+
+async def create_partitions(months_ahead: int):
+    await Tortoise.init(config=TORTOISE_ORM)
+    created = await ReceiptPartitionSvc().create_partitions(months_ahead)
+    print("Created", created, "partitions")
+    await Tortoise.close_connections()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create monthly receipt and product partitions ahead of time")
+    parser.add_argument("--months-ahead", type=int, default=RECEIPT_PARTITION_MONTHS_AHEAD)
+    args = parser.parse_args()
+    asyncio.run(create_partitions(args.months_ahead))
+
+
+if __name__ == "__main__":
+    main()
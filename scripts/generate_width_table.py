@@ -0,0 +1,55 @@
+import sys
+import unicodedata
+from pathlib import Path
+
+# Добавляем родительский каталог (где находится config.py) в sys.path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+TABLE_PATH = Path(__file__).resolve().parent.parent / "apps" / "receipt_app" / "rendering" / "width_table.py"
+ZERO_WIDTH_CATEGORIES = {"Cc", "Mn", "Me", "Cf"}
+
+
+def char_width(code: int) -> int:
+    char = chr(code)
+    category = unicodedata.category(char)
+    if code == 0x00AD or category == "Cn":
+        # Soft hyphen is printed when shown at all; unassigned code points
+        # get no East Asian width from unicodedata
+        return 1
+    if category in ZERO_WIDTH_CATEGORIES or 0x1160 <= code <= 0x11FF or code == 0x200B:
+        return 0
+    if unicodedata.east_asian_width(char) in ("W", "F"):
+        return 2
+    return 1
+
+
+def generate_width_table():
+    starts, widths = [], []
+    for code in range(sys.maxunicode + 1):
+        width = char_width(code)
+        if not widths or widths[-1] != width:
+            starts.append(code)
+            widths.append(width)
+
+    lines = [
+        f"# Generated by scripts/generate_width_table.py from Unicode {unicodedata.unidata_version}, do not edit.",
+        "# Code points from STARTS[i] up to STARTS[i + 1] take WIDTHS[i] columns.",
+        "STARTS = (",
+    ]
+    lines.extend(
+        "    " + " ".join(f"0x{start:05X}," for start in starts[index:index + 8])
+        for index in range(0, len(starts), 8)
+    )
+    lines.append(")")
+    lines.append("WIDTHS = (")
+    lines.extend(
+        "    " + " ".join(f"{width}," for width in widths[index:index + 24])
+        for index in range(0, len(widths), 24)
+    )
+    lines.append(")")
+    TABLE_PATH.write_text("\n".join(lines) + "\n")
+    print("Written", len(starts), "ranges to", TABLE_PATH)
+
+
+if __name__ == "__main__":
+    generate_width_table()
@@ -7,8 +7,10 @@ from tortoise import Tortoise
 # Добавляем родительский каталог (где находится config.py) в sys.path
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
-from config import TORTOISE_ORM
+from apps.receipt_app.services.payment_type_registry import PAYMENT_TYPES_TOPIC
+from config import TORTOISE_ORM, redis_pool
 from enums import PaymentTypeEnum
+from general_services.invalidation_svc import InvalidationSvc
 from models import PaymentType
 
 
@@ -25,6 +27,9 @@ async def init_enums():
             else:
                 print("Already exist", obj)
 
+    # Running workers reload their payment type registry on next use
+    await InvalidationSvc().publish(PAYMENT_TYPES_TOPIC, {})
+    await redis_pool.disconnect()
     await Tortoise.close_connections()
 
 
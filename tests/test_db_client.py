@@ -0,0 +1,101 @@
+"""Pool settings and metrics of the general_services.db_client engine.
+
+Runs only against Postgres: set TEST_POSTGRES_URL (see `make run-plan-tests`)
+to a database URL the tests may create and drop.
+"""
+import asyncio
+import os
+
+import asyncpg
+import pytest
+import pytest_asyncio
+from tortoise import Tortoise
+from tortoise.backends.base.config_generator import expand_db_url
+
+from general_services import db_client
+from general_services.db_client import DbAcquireTimeMiddleware, db_pool_stats
+
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+pytestmark = [
+    pytest.mark.skipif(not TEST_POSTGRES_URL, reason="TEST_POSTGRES_URL is not set"),
+    pytest.mark.asyncio(loop_scope="module"),
+]
+
+
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def db():
+    connection = expand_db_url(TEST_POSTGRES_URL)
+    connection["engine"] = "general_services.db_client"
+    connection["credentials"].update(
+        minsize=1,
+        maxsize=2,
+        max_inactive_connection_lifetime=60,
+        statement_cache_size=0,
+        application_name="receipt-app-test",
+        server_settings={"statement_timeout": "200"},
+    )
+    config = {
+        "connections": {"default": connection},
+        "apps": {"models": {"models": ["models", "aerich.models"], "default_connection": "default"}},
+    }
+    await Tortoise.init(config=config, _create_db=True)
+    yield Tortoise.get_connection("default")
+    await Tortoise._drop_databases()
+
+
+async def test_server_settings(db):
+    """Тестує, що statement_timeout і application_name задаються кожному з'єднанню пулу."""
+    rows = await db.execute_query_dict(
+        "SELECT current_setting('statement_timeout') AS timeout, current_setting('application_name') AS name"
+    )
+    assert rows == [{"timeout": "200ms", "name": "receipt-app-test"}]
+
+    with pytest.raises(asyncpg.QueryCanceledError):
+        await db.execute_query("SELECT pg_sleep(1)")
+
+
+async def test_pool_metrics(db, monkeypatch):
+    """Тестує лічильники пулу: зайняті та вільні з'єднання, черга очікування і час отримання з'єднання."""
+    pool_acquire = asyncpg.Pool.acquire
+    acquiring_waiters = []
+
+    def acquire(pool, **kwargs):
+        acquiring_waiters.append(db_client.pools["default"].waiters)
+        return pool_acquire(pool, **kwargs)
+    monkeypatch.setattr(asyncpg.Pool, "acquire", acquire)
+
+    await db.execute_query("SELECT 1")
+    await db.execute_query("SELECT 1")
+
+    assert acquiring_waiters == [0, 0]
+    monkeypatch.undo()
+
+    seen_waiters = []
+
+    async def watch():
+        for _ in range(20):
+            seen_waiters.append(db_pool_stats()["pools"]["default"]["waiters"])
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(watch(), *(db.execute_query("SELECT pg_sleep(0.05)") for _ in range(6)))
+
+    stats = db_pool_stats()["pools"]["default"]
+    assert max(seen_waiters) > 0
+    assert (stats["max_size"], stats["waiters"], stats["in_use"]) == (2, 0, 0)
+    assert stats["idle"] == stats["size"] == 2
+    assert stats["acquires"] >= 6
+    assert stats["acquire_max_ms"] > 0
+
+
+async def test_request_acquire_time(db):
+    """Тестує, що middleware підсумовує час отримання з'єднань за запит."""
+    async def app(scope, receive, send):
+        await db.execute_query("SELECT 1")
+        await db.execute_query("SELECT 1")
+
+    requests = db_client.request_stats["requests"]
+    await DbAcquireTimeMiddleware(app)({"type": "http"}, None, None)
+
+    assert db_pool_stats()["requests"]["count"] == requests + 1
+    assert db_client.request_stats["acquire_seconds"] > 0
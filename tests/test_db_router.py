@@ -0,0 +1,156 @@
+import shutil
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from tortoise import Tortoise
+from tortoise.connection import connections
+from tortoise.router import router
+from tortoise.transactions import in_transaction
+
+from apps.login_app.routes import api_router as login_api_router
+from apps.receipt_app.routes import api_router as receipt_api_router
+from auth_jwt.services.user_cache_svc import user_cache
+from config import redis_client
+from enums import PaymentTypeEnum
+from general_services.db_router import PRIMARY_COOKIE, PRIMARY_USER_KEY, DbRoutingMiddleware, use_primary
+from general_services.redis_svc import redis_lifespan
+from models import PaymentType, Product, Receipt, User
+
+USERNAME = "test_user_for_replicas"
+
+
+def db_config(primary, replicas=()) -> dict:
+    """Основна база й репліки — окремі SQLite-файли."""
+    return {
+        "connections": {
+            "default": f"sqlite://{primary}",
+            **{f"replica_{index}": f"sqlite://{replica}" for index, replica in enumerate(replicas)},
+        },
+        "apps": {"models": {"models": ["models", "aerich.models"], "default_connection": "default"}},
+        "routers": ["general_services.db_router.ReplicaRouter"],
+    }
+
+
+@pytest.fixture(scope="module")
+async def databases(tmp_path_factory):
+    """Створює основну базу з користувачем і типами оплати та дві її копії як репліки."""
+    directory = tmp_path_factory.mktemp("replicas")
+    primary = directory / "primary.sqlite3"
+    replicas = [directory / "replica_0.sqlite3", directory / "replica_1.sqlite3"]
+
+    await Tortoise.init(config=db_config(primary))
+    await Tortoise.generate_schemas()
+    await PaymentType.get_or_create(name=PaymentTypeEnum.CASH)
+    await PaymentType.get_or_create(name=PaymentTypeEnum.CREDIT_CART)
+    user = User(name="Replica User", username=USERNAME)
+    user.set_password("securepassword")
+    await user.save()
+    await Tortoise.close_connections()
+    for replica in replicas:
+        shutil.copy(primary, replica)
+
+    await Tortoise.init(config=db_config(primary, replicas))
+    user_cache.clear()
+    yield user
+    user_cache.clear()
+    await Tortoise.close_connections()
+    # Tortoise merges the configs of all init calls; later modules expect one connection
+    for index in range(len(replicas)):
+        connections.db_config.pop(f"replica_{index}")
+
+
+@pytest.mark.asyncio
+async def test_reads_go_to_replicas_round_robin(databases):
+    """Тестує, що читання йдуть на репліки по черзі, а запис, транзакції й закріплені запити — на основну базу."""
+    await Tortoise.get_connection("replica_1").execute_query(
+        "INSERT INTO users (name, username, password, is_active) VALUES ('Only', 'only_in_replica_1', '-', 1)"
+    )
+    seen = {await User.exists(username="only_in_replica_1") for _ in range(4)}
+    assert seen == {True, False}
+
+    receipt = await Receipt.create(user=databases, payment_type_id=1, amount_cents=100, total_cents=100)
+    assert not await Receipt.exists(id=receipt.id)
+
+    async with in_transaction("default"):
+        assert await Receipt.exists(id=receipt.id)
+
+    token = use_primary.set(True)
+    try:
+        assert await Receipt.exists(id=receipt.id)
+        assert not await User.exists(username="only_in_replica_1")
+    finally:
+        use_primary.reset(token)
+
+
+@pytest.fixture
+def client(databases):
+    app = FastAPI(lifespan=redis_lifespan)
+    app.include_router(login_api_router, prefix="/api")
+    app.include_router(receipt_api_router, prefix="/api")
+    app.add_middleware(DbRoutingMiddleware, enabled=True)
+
+    with TestClient(app) as client:
+        login = client.post("/api/login", json={"username": USERNAME, "password": "securepassword"})
+        client.headers["Authorization"] = f"Bearer {login.json()['access_token']}"
+        yield client
+
+
+def create_receipt(client) -> str:
+    """Створює чек і повертає адресу для його читання."""
+    receipt_data = {
+        "products": [{"name": "Replica", "price": 1, "quantity": 1}],
+        "payment": {"type": PaymentTypeEnum.CASH.value, "amount": 1}
+    }
+    created = client.post("/api/create-receipt", json=receipt_data)
+    assert created.status_code == 200
+    assert PRIMARY_COOKIE in created.cookies
+    return f"/api/get-receipt/{created.json()['id']}"
+
+
+def unpin_user(client, user):
+    # Pooled Redis connections belong to the client's event loop
+    client.portal.call(redis_client.delete, PRIMARY_USER_KEY.format(user_id=user.id))
+
+
+def test_reads_after_write_stick_to_primary_without_cookies(client, databases):
+    """Тестує, що клієнт без cookie після запису читає з основної бази, доки діє ключ користувача в Redis."""
+    url = create_receipt(client)
+    client.cookies.clear()
+
+    assert client.get(url).status_code == 200
+    assert client.get(url.replace("get-receipt", "get-receipt-text")).status_code == 200
+
+    unpin_user(client, databases)
+    assert client.get(url).status_code == 404
+
+
+def test_primary_cookie_is_bounded(client, databases):
+    """Тестує, що cookie закріплює читання не довше DB_READ_AFTER_WRITE_SECONDS і що з cookie Redis не питають."""
+    url = create_receipt(client)
+
+    assert client.get(url).status_code == 200
+
+    for until in ("1", "1e18", "nan", "invalid"):
+        client.cookies.set(PRIMARY_COOKIE, until)
+        assert client.get(url).status_code == 404
+
+    client.cookies.clear()
+    assert client.get(url).status_code == 200
+
+
+def test_one_replica_per_request(databases):
+    """Тестує, що всі читання одного запиту йдуть на одну репліку, а запити чергують репліки."""
+    app = FastAPI()
+
+    @app.get("/replicas")
+    async def replicas():
+        return [router.db_for_read(model).connection_name for model in (Receipt, Product, User, Receipt)]
+
+    app.add_middleware(DbRoutingMiddleware, enabled=True)
+
+    with TestClient(app) as client:
+        requests = [client.get("/replicas").json() for _ in range(2)]
+
+    assert [len(set(names)) for names in requests] == [1, 1]
+    assert {names[0] for names in requests} == {"replica_0", "replica_1"}
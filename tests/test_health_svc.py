@@ -0,0 +1,51 @@
+import pytest
+from tortoise import Tortoise
+
+from config import redis_pool
+from general_services import health_svc as health_module
+from general_services.health_svc import HealthSvc
+
+TORTOISE_TEST_DB = {
+    "connections": {"default": "sqlite://:memory:"},
+    "apps": {
+        "models": {
+            "models": ["models", "aerich.models"],
+            "default_connection": "default",
+        }
+    },
+}
+
+
+@pytest.fixture
+async def init_tortoise():
+    await Tortoise.init(config=TORTOISE_TEST_DB)
+    yield
+    await Tortoise.close_connections()
+    await redis_pool.disconnect()
+
+
+async def _failing_check():
+    raise ConnectionError("db is down")
+
+
+@pytest.mark.asyncio
+async def test_readiness_ok(init_tortoise):
+    """Тестує успішну перевірку готовності при доступних БД та Redis."""
+    result = await HealthSvc().readiness()
+
+    assert result == {"status": "ok", "checks": {"db": "ok", "redis": "ok"}}
+
+
+@pytest.mark.asyncio
+async def test_readiness_is_cached(init_tortoise, monkeypatch):
+    """Тестує, що результат перевірки кешується і не повторює запити до БД."""
+    svc = HealthSvc()
+    assert (await svc.readiness())["status"] == "ok"
+
+    monkeypatch.setattr(svc, "_check_db", _failing_check)
+    assert (await svc.readiness())["status"] == "ok"
+
+    monkeypatch.setattr(health_module, "READINESS_CACHE_SECONDS", 0)
+    result = await svc.readiness()
+    assert result["status"] == "fail"
+    assert result["checks"]["db"] == "error: ConnectionError"
@@ -0,0 +1,95 @@
+import asyncio
+import uuid
+
+import pytest
+from fastapi import Response
+from tortoise import Tortoise
+from tortoise.transactions import in_transaction
+
+from config import redis_client, redis_pool
+from general_services.idempotency_svc import IdempotencySvc
+from general_services.redis_svc import RedisSvc
+from models import IdempotencyKey, User
+
+TORTOISE_TEST_DB = {
+    "connections": {"default": "sqlite://:memory:"},
+    "apps": {
+        "models": {
+            "models": ["models", "aerich.models"],
+            "default_connection": "default",
+        }
+    },
+}
+
+
+@pytest.fixture
+async def user():
+    await Tortoise.init(config=TORTOISE_TEST_DB)
+    await Tortoise.generate_schemas()
+    user = User(name="Idempotent User", username="idempotent_user", password="-")
+    await user.save()
+    yield user
+    await Tortoise.close_connections()
+    await redis_pool.disconnect()
+
+
+def counting_handler(calls: list, delay: float = 0):
+    async def handler(record):
+        calls.append(1)
+        await asyncio.sleep(delay)
+        response = Response(content=f'{{"call":{len(calls)}}}', media_type="application/json")
+        async with in_transaction() as connection:
+            await record(connection, response)
+        return response
+    return handler
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_run_once(user):
+    """Тестує, що одночасні запити з тим самим ключем виконують обробник лише раз."""
+    svc, calls, key = IdempotencySvc(), [], uuid.uuid4().hex
+
+    responses = await asyncio.gather(*(
+        svc.run(user.id, "test", key, b"payload", counting_handler(calls, delay=0.2)) for _ in range(3)
+    ))
+
+    assert len(calls) == 1
+    assert {response.body for response in responses} == {b'{"call":1}'}
+    assert sum(response.headers.get("Idempotency-Replayed") == "true" for response in responses) == 2
+    assert await IdempotencyKey.filter(user=user, key=key).count() == 1
+
+
+@pytest.mark.asyncio
+async def test_replay_falls_back_to_database(user):
+    """Тестує повтор відповіді з таблиці, коли запис у Redis втрачено."""
+    svc, calls, key = IdempotencySvc(), [], uuid.uuid4().hex
+    await svc.run(user.id, "test", key, b"payload", counting_handler(calls))
+    await redis_client.delete(f"idempotency:{user.id}:test:{key}")
+
+    replay = await svc.run(user.id, "test", key, b"payload", counting_handler(calls))
+
+    assert len(calls) == 1
+    assert replay.body == b'{"call":1}'
+    assert await RedisSvc().get(f"idempotency:{user.id}:test:{key}") is not None
+
+
+@pytest.mark.asyncio
+async def test_unique_constraint_catches_missed_lock(user, monkeypatch):
+    """Тестує, що повторна вставка, яку не зупинили Redis і перевірка таблиці, відкочується."""
+    svc, calls, key = IdempotencySvc(), [], uuid.uuid4().hex
+    await svc.run(user.id, "test", key, b"payload", counting_handler(calls))
+    await redis_client.delete(f"idempotency:{user.id}:test:{key}")
+    stored_replay = svc.stored_replay
+    lookups = []
+
+    async def stale_stored_replay(*args):
+        # The first lookup misses, as if the other request had not committed yet
+        lookups.append(1)
+        return None if len(lookups) == 1 else await stored_replay(*args)
+    monkeypatch.setattr(svc, "stored_replay", stale_stored_replay)
+
+    replay = await svc.run(user.id, "test", key, b"payload", counting_handler(calls))
+
+    assert len(calls) == 2
+    assert replay.body == b'{"call":1}'
+    assert await IdempotencyKey.filter(user=user, key=key).count() == 1
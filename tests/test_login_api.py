@@ -2,7 +2,13 @@ import pytest
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
 from tortoise import Tortoise
+from general_services import password_svc
 from apps.login_app.routes import api_router as login_api_router
+from apps.receipt_app.routes import api_router as receipt_api_router
+from auth_jwt.services.token_svc import fingerprint, verified_tokens
+from config import redis_client
+from general_services.redis_svc import redis_lifespan
+from models import User
 
 TORTOISE_TEST_DB = {
     "connections": {"default": "sqlite://:memory:"},
@@ -25,8 +31,9 @@ async def init_tortoise():
 
 @pytest.fixture(scope="module")
 def client(init_tortoise):
-    app = FastAPI()
+    app = FastAPI(lifespan=redis_lifespan)
     app.include_router(login_api_router, prefix="/api")
+    app.include_router(receipt_api_router, prefix="/api")
     with TestClient(app, raise_server_exceptions=False) as client:
         yield client
 
@@ -113,6 +120,29 @@ async def test_login_non_existent_user(client):
     assert "Wrong username or password" in response.text
 
 
+@pytest.mark.asyncio
+async def test_login_password_pool_saturated(client, monkeypatch):
+    """Тестує відмову з кодом 503, коли черга перевірки паролів заповнена."""
+    register_data = {
+        "name": "busyuser",
+        "username": "busy_pool_test",
+        "password": "busypass"
+    }
+    client.post("/api/register", json=register_data)
+    monkeypatch.setattr(password_svc, "PASSWORD_HASH_MAX_PENDING", 0)
+
+    login_data = {
+        "username": register_data["username"],
+        "password": register_data["password"]
+    }
+    response = client.post("/api/login", json=login_data)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    register_data["username"] = "busy_pool_test_2"
+    assert client.post("/api/register", json=register_data).status_code == 503
+
+
 @pytest.mark.asyncio
 async def test_refresh_token_success(client):
     """Тестує успішне оновлення токена."""
@@ -168,3 +198,38 @@ async def test_refresh_token_invalid(client):
 
     assert response.status_code == 401
 
+
+@pytest.mark.asyncio
+async def test_logout_revokes_cached_access_token(client):
+    """Тестує, що після виходу закешований access token більше не приймається."""
+    register_data = {
+        "name": "logoutuser",
+        "username": "logout_user_test",
+        "password": "logoutpass"
+    }
+    client.post("/api/register", json=register_data)
+    login_response = client.post("/api/login", json={
+        "username": register_data["username"],
+        "password": register_data["password"]
+    })
+    client.cookies.set("refresh_token", login_response.cookies.get("refresh_token"))
+    refresh_response = client.post(
+        "/api/refresh", headers={"Authorization": f"Bearer {login_response.json()['access_token']}"}
+    )
+    assert refresh_response.status_code == 200
+    access_token = refresh_response.json()["access_token"]
+    headers = {"Authorization": f"Bearer {access_token}"}
+    client.cookies.set("refresh_token", refresh_response.cookies.get("refresh_token"))
+
+    assert client.get("/api/get-receipts", headers=headers).status_code == 200
+    assert verified_tokens.get(fingerprint(access_token)) is not None
+
+    logout_response = client.post("/api/logout", headers=headers, follow_redirects=False)
+    assert logout_response.status_code == 307
+    user = await User.get(username=register_data["username"])
+    # Pooled Redis connections belong to the client's event loop
+    assert client.portal.call(redis_client.exists, user.id) == 0
+
+    response = client.get("/api/get-receipts", headers=headers, follow_redirects=False)
+    assert response.status_code == 307
+    assert response.headers["location"] == "/api/login"
@@ -0,0 +1,79 @@
+"""Migration 10: float money columns to integer cents.
+
+Runs only against Postgres: set TEST_POSTGRES_URL (see `make run-plan-tests`)
+to a database URL the tests may create and drop.
+"""
+import importlib
+import os
+
+import pytest
+import pytest_asyncio
+from tortoise import Tortoise
+
+from apps.receipt_app.money import line_total_cents
+
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+pytestmark = [
+    pytest.mark.skipif(not TEST_POSTGRES_URL, reason="TEST_POSTGRES_URL is not set"),
+    pytest.mark.asyncio(loop_scope="module"),
+]
+
+migration = importlib.import_module("migrations.models.10_20261018130000_update")
+
+# The tables as migration 10 finds them; totals were summed in floats
+LEGACY_SQL = """
+CREATE TABLE "receipts" (
+    "id" SERIAL PRIMARY KEY,
+    "user_id" INT NOT NULL,
+    "amount" DOUBLE PRECISION NOT NULL,
+    "total" DOUBLE PRECISION NOT NULL
+);
+CREATE TABLE "products" (
+    "id" SERIAL PRIMARY KEY,
+    "receipt_id" INT NOT NULL REFERENCES "receipts" ("id") ON DELETE CASCADE,
+    "price" DOUBLE PRECISION NOT NULL DEFAULT 0,
+    "quantity" INT NOT NULL DEFAULT 0
+);
+INSERT INTO "receipts" ("user_id", "amount", "total") VALUES
+    (1, 200, 0.1 * 3 + 19.99 * 7 + 1.005 * 2), (1, 5.5, 0), (1, 10, 3.3);
+INSERT INTO "products" ("receipt_id", "price", "quantity") VALUES
+    (1, 0.1, 3), (1, 19.99, 7), (1, 1.005, 2), (3, 1.1, 3);
+"""
+
+
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def db():
+    config = {
+        "connections": {"default": TEST_POSTGRES_URL},
+        "apps": {"models": {"models": ["models", "aerich.models"], "default_connection": "default"}},
+    }
+    await Tortoise.init(config=config, _create_db=True)
+    connection = Tortoise.get_connection("default")
+    await connection.execute_script(LEGACY_SQL)
+    await connection.execute_script(await migration.upgrade(connection))
+    yield connection
+    await Tortoise._drop_databases()
+
+
+async def test_line_totals_match_money_rules(db):
+    """Тестує, що суми рядків перенесених товарів збігаються з money.line_total_cents."""
+    products = await db.execute_query_dict(
+        'SELECT "price_cents", "quantity_milli", "total_cents" FROM "products" ORDER BY "id"'
+    )
+
+    assert [product["price_cents"] for product in products] == [10, 1999, 101, 110]
+    for product in products:
+        assert product["total_cents"] == line_total_cents(product["price_cents"], product["quantity_milli"])
+
+
+async def test_receipt_totals_are_sums_of_line_totals(db):
+    """Тестує, що сума перенесеного чека — це сума його рядків, а не старе значення total."""
+    receipts = await db.execute_query_dict(
+        'SELECT r."amount_cents", r."total_cents", COALESCE(SUM(p."total_cents"), 0) AS "lines"'
+        ' FROM "receipts" r LEFT JOIN "products" p ON p."receipt_id" = r."id" GROUP BY r."id" ORDER BY r."id"'
+    )
+
+    assert [receipt["amount_cents"] for receipt in receipts] == [20000, 550, 1000]
+    assert [receipt["total_cents"] for receipt in receipts] == [receipt["lines"] for receipt in receipts]
+    assert [receipt["total_cents"] for receipt in receipts] == [30 + 13993 + 202, 0, 330]
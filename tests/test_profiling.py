@@ -0,0 +1,131 @@
+import logging
+import re
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from tortoise import Tortoise
+
+from apps.login_app.routes import api_router as login_api_router
+from apps.receipt_app.routes import api_router as receipt_api_router
+from apps.receipt_app.services.receipt_text_cache_svc import receipt_text_cache
+from auth_jwt.services.user_cache_svc import user_cache
+from config import redis_client, redis_pool
+from enums import PaymentTypeEnum
+from general_services import profiling
+from general_services.profiling import ProfilingMiddleware, RequestProfile, request_profile, timing
+from general_services.redis_svc import redis_lifespan
+from models import PaymentType, User
+
+TORTOISE_TEST_DB = {
+    "connections": {"default": "sqlite://:memory:"},
+    "apps": {"models": {"models": ["models", "aerich.models"], "default_connection": "default"}},
+}
+USERNAME = "test_user_for_profiling"
+
+
+@pytest.fixture(scope="module")
+async def init_tortoise():
+    await Tortoise.init(config=TORTOISE_TEST_DB)
+    await Tortoise.generate_schemas(safe=True)
+    await PaymentType.get_or_create(name=PaymentTypeEnum.CASH)
+    user = User(name="Profiled User", username=USERNAME)
+    user.set_password("securepassword")
+    await user.save()
+    user_cache.clear()
+    # Receipt ids start over with every in-memory DB
+    receipt_text_cache.clear()
+    async for key in redis_client.scan_iter("receipt-text:*"):
+        await redis_client.delete(key)
+    await redis_pool.disconnect()
+    yield
+    user_cache.clear()
+    await Tortoise.close_connections()
+
+
+def make_client(**options) -> TestClient:
+    app = FastAPI(lifespan=redis_lifespan)
+    app.include_router(login_api_router, prefix="/api")
+    app.include_router(receipt_api_router, prefix="/api")
+    app.add_middleware(ProfilingMiddleware, **options)
+    return TestClient(app, raise_server_exceptions=True)
+
+
+def server_timing(response) -> dict:
+    """{назва: (мілісекунди, кількість викликів)} із заголовка Server-Timing."""
+    metrics = {}
+    for metric in response.headers["server-timing"].split(", "):
+        match = re.fullmatch(r'(\w+);dur=([\d.]+)(?:;desc="(\d+)")?', metric)
+        metrics[match[1]] = (float(match[2]), int(match[3]) if match[3] else None)
+    return metrics
+
+
+@pytest.fixture
+async def client(init_tortoise):
+    with make_client(enabled=True) as client:
+        response = client.post("/api/login", json={"username": USERNAME, "password": "securepassword"})
+        client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+        yield client
+
+
+@pytest.mark.asyncio
+async def test_server_timing_counts_queries_and_redis_calls(client):
+    """Тестує, що заголовок Server-Timing містить кількість і час запитів до БД, Redis, рендерингу та серіалізації."""
+    receipt = {"products": [{"name": "Profiled", "price": 2, "quantity": 1}], "payment": {"type": "cash", "amount": 2}}
+    receipt_id = client.post("/api/create-receipt", json=receipt).json()["id"]
+
+    metrics = server_timing(client.get("/api/get-receipts"))
+    assert metrics["db"][1] >= 1
+    assert "redis" in metrics
+    assert metrics["serialize"][1] >= 1
+    assert metrics["app"][0] >= metrics["db"][0]
+
+    login = client.post("/api/login", json={"username": USERNAME, "password": "securepassword"})
+    client.headers["Authorization"] = f"Bearer {login.json()['access_token']}"
+    assert server_timing(login)["redis"][1] >= 1
+
+    metrics = server_timing(client.get(f"/api/get-receipt-text/{receipt_id}"))
+    assert metrics["render"][1] >= 1
+    assert "serialize" not in metrics
+
+
+@pytest.mark.asyncio
+async def test_slow_requests_are_logged_with_sql(client, monkeypatch, caplog):
+    """Тестує, що запит понад поріг кількості запитів до БД пишеться в лог разом із SQL."""
+    monkeypatch.setattr(profiling, "PROFILING_SLOW_QUERY_COUNT", 1)
+    monkeypatch.setattr(profiling, "PROFILING_LOGGED_QUERIES", 1)
+
+    with caplog.at_level(logging.WARNING, logger="general_services.profiling"):
+        client.get("/api/get-receipts")
+
+    [record] = [record for record in caplog.records if record.name == "general_services.profiling"]
+    message = record.getMessage()
+    assert message.startswith("Slow request GET /api/get-receipts -> 200")
+    assert 'FROM "receipts"' in message or 'FROM "users"' in message
+    assert "more" in message
+
+
+@pytest.mark.asyncio
+async def test_disabled_or_unsampled_requests_are_not_profiled(init_tortoise):
+    """Тестує, що вимкнений профайлер і запити поза вибіркою не отримують заголовка Server-Timing."""
+    for options in ({"enabled": False}, {"enabled": True, "sample_rate": 0}):
+        with make_client(**options) as client:
+            response = client.post("/api/login", json={"username": USERNAME, "password": "securepassword"})
+            assert response.status_code == 200
+            assert "server-timing" not in response.headers
+
+
+def test_timing_outside_of_a_request():
+    """Тестує, що timing поза профільованим запитом нічого не рахує, а всередині — додає час."""
+    with timing("render"):
+        pass
+
+    profile = RequestProfile()
+    token = request_profile.set(profile)
+    try:
+        with timing("render"):
+            pass
+    finally:
+        request_profile.reset(token)
+    assert profile.calls["render"] == 1
+    assert profile.server_timing(0.01).endswith("app;dur=10.0")
@@ -10,9 +10,23 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 from apps.login_app.routes import api_router as login_api_router
+from general_services.redis_svc import redis_lifespan
 from apps.receipt_app.routes import api_router as receipt_api_router
 
-from models import User, Receipt, PaymentType
+import csv
+import io
+import json
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from apps.receipt_app import serializers
+from apps.receipt_app.money import from_cents
+from apps.receipt_app.services import receipt_batch_svc, receipt_export_svc, receipt_text_svc
+from apps.receipt_app.services.receipt_text_cache_svc import receipt_text_cache
+from config import redis_client, redis_pool
+from models import User, Receipt, PaymentType, Product
 from enums import PaymentTypeEnum
 
 TORTOISE_TEST_DB = {
@@ -41,6 +55,12 @@ async def init_tortoise():
         await PaymentType.get_or_create(name=PaymentTypeEnum.CREDIT_CART)
         logger.info("Payment types created.")
 
+        # Receipt ids start over with every in-memory DB
+        receipt_text_cache.clear()
+        async for key in redis_client.scan_iter("receipt-text:*"):
+            await redis_client.delete(key)
+        await redis_pool.disconnect()
+
         yield
     except Exception as e:
         logger.error(f"Error during Tortoise ORM initialization: {e}", exc_info=True)
@@ -51,10 +71,27 @@ async def init_tortoise():
         logger.info("Tortoise ORM connections closed.")
 
 
+@contextmanager
+def logged_queries():
+    """Збирає SQL-запити, які Tortoise пише в лог tortoise.db_client."""
+    queries = []
+    db_logger = logging.getLogger("tortoise.db_client")
+    handler = logging.Handler(logging.DEBUG)
+    handler.emit = lambda record: queries.append(record.getMessage())
+    level = db_logger.level
+    db_logger.setLevel(logging.DEBUG)
+    db_logger.addHandler(handler)
+    try:
+        yield queries
+    finally:
+        db_logger.removeHandler(handler)
+        db_logger.setLevel(level)
+
+
 @pytest.fixture(scope="module")
 async def client(init_tortoise):
     """Створює тестовий клієнт для FastAPI додатка."""
-    app = FastAPI()
+    app = FastAPI(lifespan=redis_lifespan)
     app.include_router(login_api_router, prefix="/api")
     app.include_router(receipt_api_router, prefix="/api")
 
@@ -147,11 +184,36 @@ async def test_create_receipt_success(authenticated_client):
 
     receipt_in_db = await Receipt.get(id=response_json["id"]).prefetch_related("products", "payment_type")
     assert receipt_in_db is not None
-    assert Decimal(str(receipt_in_db.total)) == expected_total.quantize(Decimal('0.01'))
+    assert from_cents(receipt_in_db.total_cents) == expected_total.quantize(Decimal('0.01'))
     assert len(receipt_in_db.products) == 2
     assert receipt_in_db.payment_type.name == PaymentTypeEnum.CASH
 
 
+@pytest.mark.asyncio
+async def test_receipt_money_is_exact(authenticated_client):
+    """Тестує, що суми не мають похибки float і однакові при створенні, читанні та в тексті чека."""
+    receipt_data = {
+        "products": [
+            {"name": "A", "price": "0.10", "quantity": "3"},
+            {"name": "B", "price": "0.20", "quantity": "1.255"},
+            {"name": "C", "price": "1234567.89", "quantity": "1"}
+        ],
+        "payment": {"type": PaymentTypeEnum.CASH.value, "amount": "1234568.44"}
+    }
+    created = authenticated_client.post("/api/create-receipt", json=receipt_data).json()
+    fetched = authenticated_client.get(f"/api/get-receipt/{created['id']}").json()
+
+    assert created == fetched
+    assert [(p["quantity"], p["total"]) for p in fetched["products"]] == [
+        ("3.000", "0.30"), ("1.255", "0.25"), ("1.000", "1234567.89"),
+    ]
+    assert (fetched["total"], fetched["rest"]) == ("1234568.44", "0.00")
+
+    text = authenticated_client.get(f"/api/get-receipt-text/{created['id']}").text
+    assert "1 234 568.44" in text
+    assert "3.00 x 0.10" in text
+
+
 @pytest.mark.asyncio
 async def test_create_receipt_insufficient_payment(authenticated_client):
     """Тестує створення чека з недостатньою сумою оплати."""
@@ -170,6 +232,26 @@ async def test_create_receipt_insufficient_payment(authenticated_client):
     response_json = response.json()
     assert response_json.get("detail") == "Insufficient payment amount"
 
+@pytest.mark.asyncio
+async def test_get_receipt_by_id_is_one_query(authenticated_client):
+    """Тестує, що чек разом із товарами та типом оплати читається одним SQL-запитом."""
+    receipt_data = {
+        "products": [{"name": f"One query {i}", "price": "1.10", "quantity": i + 1} for i in range(3)],
+        "payment": {"type": PaymentTypeEnum.CREDIT_CART.value, "amount": "10"}
+    }
+    created = authenticated_client.post("/api/create-receipt", json=receipt_data).json()
+    url = f"/api/get-receipt/{created['id']}"
+    authenticated_client.get(url)
+
+    with logged_queries() as queries:
+        response = authenticated_client.get(url)
+
+    assert response.status_code == 200
+    assert len(queries) == 1, queries
+    assert response.json() == created
+    assert (await Receipt.get(id=created["id"])).products_count == 3
+
+
 @pytest.mark.asyncio
 async def test_get_receipt_by_id_not_found(authenticated_client):
     """Тестує спробу отримання неіснуючого чека за ID."""
@@ -189,3 +271,340 @@ async def test_get_receipt_text_not_found(authenticated_client):
     assert response_json.get("detail") in ["Receipt not found", "Not Found"]
 
 
+@pytest.mark.asyncio
+async def test_get_receipt_text_etag(authenticated_client, monkeypatch):
+    """Тестує кеш тексту чека: ETag, відповідь 304 та повторні запити без звернення до БД."""
+    receipt_data = {
+        "products": [{"name": "Text cache", "price": 3.5, "quantity": 2}],
+        "payment": {"type": PaymentTypeEnum.CASH.value, "amount": 10}
+    }
+    receipt_id = authenticated_client.post("/api/create-receipt", json=receipt_data).json()["id"]
+    url = f"/api/get-receipt-text/{receipt_id}"
+
+    first = authenticated_client.get(url)
+    assert first.status_code == 200
+    assert first.headers["content-type"].startswith("text/plain")
+    etag = first.headers["etag"]
+
+    async def no_db(*args, **kwargs):
+        raise AssertionError("the DB must not be queried")
+    monkeypatch.setattr(Receipt, "get_or_none", no_db)
+
+    assert authenticated_client.get(url).text == first.text
+    not_modified = authenticated_client.get(url, headers={"If-None-Match": f'W/"other", {etag}'})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+
+    receipt_text_cache.clear()
+    assert authenticated_client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    monkeypatch.undo()
+    wide = authenticated_client.get(url, params={"line_width": 40})
+    assert wide.status_code == 200
+    assert wide.headers["etag"] != etag
+    assert authenticated_client.get(url, headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+GOLDEN_RECEIPT_TEXT = Path(__file__).parent / "golden" / "receipt_text.txt"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("chunk_size,flush_size,max_item_bytes", [(1000, 64 * 1024, 1024 * 1024), (2, 1, 100)])
+async def test_get_receipt_text_matches_golden_file(
+        authenticated_client, monkeypatch, chunk_size, flush_size, max_item_bytes
+):
+    """Тестує, що текст чека, зібраний цілком або переданий потоком, збігається з еталонним файлом байт у байт."""
+    monkeypatch.setattr(receipt_text_svc, "RECEIPT_TEXT_CHUNK_SIZE", chunk_size)
+    monkeypatch.setattr(receipt_text_svc, "FLUSH_SIZE", flush_size)
+    monkeypatch.setattr(receipt_text_svc, "RECEIPT_TEXT_CACHE_MAX_ITEM_BYTES", max_item_bytes)
+    receipt_data = {
+        "products": [
+            {"name": "Кава", "price": "45.50", "quantity": "2"},
+            {"name": "Круасан", "price": "1234.05", "quantity": "1.5"},
+            {"name": "Дуже довга назва товару, що не вміщується", "price": "0.10", "quantity": "3"},
+            {"name": "Tea", "price": "7", "quantity": "0.255"},
+        ],
+        "payment": {"type": PaymentTypeEnum.CASH.value, "amount": "3000"}
+    }
+    receipt_id = authenticated_client.post("/api/create-receipt", json=receipt_data).json()["id"]
+    created_at = datetime(2024, 5, 17, 9, 5, tzinfo=timezone.utc)
+    await Receipt.filter(id=receipt_id).update(created_at=created_at)
+    await Product.filter(receipt_id=receipt_id).update(created_at=created_at)
+
+    response = authenticated_client.get(f"/api/get-receipt-text/{receipt_id}")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "text/plain; charset=utf-8"
+    assert ("etag" in response.headers) == (max_item_bytes >= len(response.content))
+    assert response.content == GOLDEN_RECEIPT_TEXT.read_bytes()
+
+
+@pytest.mark.asyncio
+async def test_get_receipt_text_of_many_pages_is_cached(authenticated_client):
+    """Тестує, що чек на кілька сторінок товарів, менший за RECEIPT_TEXT_CACHE_MAX_ITEM_BYTES, отримує ETag і 304."""
+    receipt_data = {
+        "products": [{"name": f"Товар {i}", "price": "1.25", "quantity": "1"} for i in range(1500)],
+        "payment": {"type": PaymentTypeEnum.CASH.value, "amount": "2000"}
+    }
+    receipt_id = authenticated_client.post("/api/create-receipt", json=receipt_data).json()["id"]
+    url = f"/api/get-receipt-text/{receipt_id}"
+
+    response = authenticated_client.get(url)
+
+    assert response.status_code == 200
+    assert "Товар 1499" in response.text
+    etag = response.headers["etag"]
+    assert authenticated_client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_get_receipt_text_formats(authenticated_client):
+    """Тестує отримання чека у форматах ESC/POS, HTML та PDF."""
+    receipt_data = {
+        "products": [{"name": "Формат", "price": 2, "quantity": 1}],
+        "payment": {"type": PaymentTypeEnum.CASH.value, "amount": 2}
+    }
+    receipt_id = authenticated_client.post("/api/create-receipt", json=receipt_data).json()["id"]
+    url = f"/api/get-receipt-text/{receipt_id}"
+
+    responses = {
+        receipt_format: authenticated_client.get(url, params={"format": receipt_format})
+        for receipt_format in ("escpos", "html", "pdf")
+    }
+
+    assert responses["escpos"].headers["content-type"] == "application/octet-stream"
+    assert responses["escpos"].content.startswith(b"\x1b@")
+    assert responses["html"].headers["content-type"] == "text/html; charset=utf-8"
+    assert "Формат" in responses["html"].text
+    assert responses["pdf"].headers["content-type"] == "application/pdf"
+    assert responses["pdf"].content.startswith(b"%PDF")
+    assert len({response.headers["etag"] for response in responses.values()}) == 3
+    assert authenticated_client.get(url, params={"format": "docx"}).status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_get_receipts_cursor_pagination(authenticated_client):
+    """Тестує посторінкове отримання чеків через курсор у стабільному порядку."""
+    receipt_data = {
+        "products": [{"name": "Cursor product", "price": 1.00, "quantity": 1}],
+        "payment": {"type": PaymentTypeEnum.CREDIT_CART, "amount": 1.00}
+    }
+    for _ in range(5):
+        assert authenticated_client.post("/api/create-receipt", json=receipt_data).status_code == 200
+
+    params = {"payment_type": PaymentTypeEnum.CREDIT_CART.value, "limit": 100}
+    expected_ids = [r["id"] for r in authenticated_client.get("/api/get-receipts", params=params).json()]
+    assert len(expected_ids) >= 5
+
+    ids, cursor = [], None
+    params.update(pagination="cursor", limit=2)
+    while True:
+        if cursor:
+            params["cursor"] = cursor
+        page = authenticated_client.get("/api/get-receipts", params=params).json()
+        assert len(page["items"]) <= 2
+        ids.extend(r["id"] for r in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert ids == expected_ids
+    assert ids == sorted(ids, reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_get_receipts_invalid_cursor(authenticated_client):
+    """Тестує відповідь 400 на некоректний курсор."""
+    response = authenticated_client.get("/api/get-receipts", params={"pagination": "cursor", "cursor": "broken"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+@pytest.mark.asyncio
+async def test_get_receipts_unknown_payment_type(authenticated_client):
+    """Тестує, що фільтр за невідомим типом оплати повертає порожній список."""
+    response = authenticated_client.get("/api/get-receipts", params={"payment_type": "barter"})
+
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+@pytest.mark.asyncio
+async def test_fast_response_matches_default(authenticated_client, monkeypatch):
+    """Тестує, що швидка серіалізація повертає той самий JSON, що й звичайна."""
+    receipt_data = {
+        "products": [
+            {"name": "Кава", "price": 10.55, "quantity": 3},
+            {"name": "Product B", "price": 0.1, "quantity": 1.5}
+        ],
+        "payment": {"type": PaymentTypeEnum.CASH.value, "amount": 100}
+    }
+    default_created = authenticated_client.post("/api/create-receipt", json=receipt_data)
+    receipt_id = default_created.json()["id"]
+    default_get = authenticated_client.get(f"/api/get-receipt/{receipt_id}")
+
+    monkeypatch.setattr(serializers, "RECEIPT_FAST_RESPONSE", True)
+    fast_created = authenticated_client.post("/api/create-receipt", json=receipt_data)
+    fast_get = authenticated_client.get(f"/api/get-receipt/{receipt_id}")
+
+    assert fast_get.status_code == 200
+    assert fast_get.headers["content-type"] == "application/json"
+    assert fast_get.content == default_get.content
+    ignored = ("id", "created_at")
+    assert {k: v for k, v in fast_created.json().items() if k not in ignored} == \
+           {k: v for k, v in default_created.json().items() if k not in ignored}
+
+
+@pytest.mark.asyncio
+async def test_export_receipts_ndjson_matches_list(authenticated_client, monkeypatch):
+    """Тестує, що NDJSON-експорт віддає ті самі чеки, що й get-receipts, частинами по кілька рядків."""
+    monkeypatch.setattr(receipt_export_svc, "EXPORT_CHUNK_SIZE", 2)
+    monkeypatch.setattr(receipt_export_svc, "EXPORT_PRODUCT_CHUNK_SIZE", 3)
+    receipt_data = {
+        "products": [{"name": f"Export {i}", "price": 1.25, "quantity": 2} for i in range(4)],
+        "payment": {"type": PaymentTypeEnum.CASH.value, "amount": 20}
+    }
+    for _ in range(3):
+        assert authenticated_client.post("/api/create-receipt", json=receipt_data).status_code == 200
+
+    expected = authenticated_client.get("/api/get-receipts", params={"limit": 100}).json()
+    response = authenticated_client.get("/api/export-receipts")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    exported = [json.loads(line) for line in response.text.splitlines()]
+    assert exported == sorted(expected, key=lambda r: r["id"])
+
+
+@pytest.mark.asyncio
+async def test_export_receipts_csv(authenticated_client):
+    """Тестує CSV-експорт: один рядок на товар з полями чека та фільтр за типом оплати."""
+    params = {"payment_type": PaymentTypeEnum.CASH.value, "limit": 100}
+    expected = authenticated_client.get("/api/get-receipts", params=params).json()
+    response = authenticated_client.get("/api/export-receipts", params={**params, "format": "csv"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == sum(len(r["products"]) for r in expected)
+    assert {row["payment_type"] for row in rows} == {PaymentTypeEnum.CASH.value}
+    first = min(expected, key=lambda r: r["id"])
+    assert rows[0]["receipt_id"] == str(first["id"])
+    assert rows[0]["product_name"] == first["products"][0]["name"]
+    assert rows[0]["product_total"] == first["products"][0]["total"]
+
+
+@pytest.mark.asyncio
+async def test_get_receipts_stats(authenticated_client):
+    """Тестує агрегати суми чеків загалом, за типом оплати та за днями/тижнями/місяцями."""
+    receipts = [
+        (PaymentTypeEnum.CASH, 10.00, datetime(2020, 3, 2, 10, tzinfo=timezone.utc)),
+        (PaymentTypeEnum.CASH, 20.50, datetime(2020, 3, 2, 23, tzinfo=timezone.utc)),
+        (PaymentTypeEnum.CREDIT_CART, 5.25, datetime(2020, 3, 8, 12, tzinfo=timezone.utc)),
+        (PaymentTypeEnum.CASH, 4.00, datetime(2020, 4, 1, 9, tzinfo=timezone.utc)),
+    ]
+    for payment_type, price, created_at in receipts:
+        receipt_data = {
+            "products": [{"name": "Stats product", "price": price, "quantity": 1}],
+            "payment": {"type": payment_type.value, "amount": 100}
+        }
+        receipt_id = authenticated_client.post("/api/create-receipt", json=receipt_data).json()["id"]
+        await Receipt.filter(id=receipt_id).update(created_at=created_at)
+
+    params = {"date_from": "2020-01-01T00:00:00Z", "date_to": "2020-12-31T00:00:00Z"}
+    stats = authenticated_client.get("/api/receipts/stats", params=params).json()
+
+    assert {k: stats[k] for k in ("count", "sum", "avg", "min", "max")} == \
+           {"count": 4, "sum": "39.75", "avg": "9.94", "min": "4.00", "max": "20.50"}
+    assert [(s["payment_type"], s["count"], s["sum"]) for s in stats["by_payment_type"]] == [
+        (PaymentTypeEnum.CASH.value, 3, "34.50"),
+        (PaymentTypeEnum.CREDIT_CART.value, 1, "5.25"),
+    ]
+    assert [(s["period"], s["count"], s["sum"]) for s in stats["by_period"]] == [
+        ("2020-03-02", 2, "30.50"), ("2020-03-08", 1, "5.25"), ("2020-04-01", 1, "4.00"),
+    ]
+
+    weeks = authenticated_client.get("/api/receipts/stats", params={**params, "period": "week"}).json()
+    assert [(s["period"], s["count"]) for s in weeks["by_period"]] == [("2020-03-02", 3), ("2020-03-30", 1)]
+
+    months = authenticated_client.get(
+        "/api/receipts/stats", params={**params, "period": "month", "payment_type": PaymentTypeEnum.CASH.value}
+    ).json()
+    assert months["count"] == 3
+    assert [(s["period"], s["count"], s["max"]) for s in months["by_period"]] == [
+        ("2020-03-01", 2, "20.50"), ("2020-04-01", 1, "4.00"),
+    ]
+
+    empty = authenticated_client.get("/api/receipts/stats", params={"date_to": "2000-01-01T00:00:00Z"}).json()
+    assert empty == {"count": 0, "sum": None, "avg": None, "min": None, "max": None, "by_payment_type": [], "by_period": []}
+
+
+@pytest.mark.asyncio
+async def test_create_receipts_batch(authenticated_client, monkeypatch):
+    """Тестує пакетне створення чеків: id у порядку запиту, дані як у звичайного create-receipt."""
+    monkeypatch.setattr(receipt_batch_svc, "MAX_QUERY_PARAMS", 10)
+    receipts = [
+        {
+            "products": [{"name": f"Batch {i}-{j}", "price": 1.5 + i, "quantity": j + 1} for j in range(i + 1)],
+            "payment": {"type": (PaymentTypeEnum.CASH if i % 2 else PaymentTypeEnum.CREDIT_CART).value, "amount": 50}
+        }
+        for i in range(4)
+    ]
+
+    response = authenticated_client.post("/api/create-receipts/batch", json={"receipts": receipts})
+
+    assert response.status_code == 200
+    ids = response.json()["ids"]
+    assert len(ids) == 4 and ids == sorted(ids)
+    for receipt_id, receipt_data in zip(ids, receipts):
+        created = authenticated_client.get(f"/api/get-receipt/{receipt_id}").json()
+        assert created["payment"]["type"] == receipt_data["payment"]["type"]
+        assert [p["name"] for p in created["products"]] == [p["name"] for p in receipt_data["products"]]
+        expected_total = sum(Decimal(str(p["price"])) * p["quantity"] for p in receipt_data["products"])
+        assert Decimal(created["total"]) == expected_total
+
+
+@pytest.mark.asyncio
+async def test_create_receipts_batch_is_validated_up_front(authenticated_client, test_user):
+    """Тестує, що помилка в одному чеку пакета відхиляє весь пакет без запису в базу."""
+    valid = {"products": [{"name": "Valid", "price": 1, "quantity": 1}], "payment": {"type": "cash", "amount": 1}}
+    invalid = {"products": [{"name": "Invalid", "price": 5, "quantity": 1}], "payment": {"type": "cash", "amount": 1}}
+    receipts_before = await Receipt.filter(user=test_user).count()
+
+    response = authenticated_client.post("/api/create-receipts/batch", json={"receipts": [valid, invalid]})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Insufficient payment amount in receipt 1"
+    assert await Receipt.filter(user=test_user).count() == receipts_before
+    assert authenticated_client.post("/api/create-receipts/batch", json={"receipts": []}).status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_create_receipt_idempotency_key(authenticated_client, test_user):
+    """Тестує, що повтор запиту з тим самим Idempotency-Key повертає збережену відповідь без нового чека."""
+    receipt_data = {
+        "products": [{"name": "Idempotent", "price": 2.5, "quantity": 2}],
+        "payment": {"type": PaymentTypeEnum.CASH.value, "amount": 10}
+    }
+    headers = {"Idempotency-Key": f"terminal-1-{uuid.uuid4()}"}
+    receipts_before = await Receipt.filter(user=test_user).count()
+
+    first = authenticated_client.post("/api/create-receipt", json=receipt_data, headers=headers)
+    retry = authenticated_client.post("/api/create-receipt", json=receipt_data, headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.headers["Idempotency-Replayed"] == "true"
+    assert retry.content == first.content
+    assert await Receipt.filter(user=test_user).count() == receipts_before + 1
+
+    other_data = {**receipt_data, "payment": {"type": PaymentTypeEnum.CASH.value, "amount": 20}}
+    conflict = authenticated_client.post("/api/create-receipt", json=other_data, headers=headers)
+    assert conflict.status_code == 422
+
+    batch = {"receipts": [receipt_data, receipt_data]}
+    first_batch = authenticated_client.post("/api/create-receipts/batch", json=batch, headers=headers)
+    retry_batch = authenticated_client.post("/api/create-receipts/batch", json=batch, headers=headers)
+    assert retry_batch.json() == first_batch.json()
+    assert await Receipt.filter(user=test_user).count() == receipts_before + 3
@@ -0,0 +1,95 @@
+"""Peak memory of export-receipts does not grow with the size of the export.
+
+By default the large export has 100k products; RUN_SLOW_TESTS=1 (see
+`make run-slow-tests`) raises it to 1M.
+"""
+import os
+import tracemalloc
+
+import pytest
+import pytest_asyncio
+from tortoise import Tortoise
+
+from apps.receipt_app.services.receipt_export_svc import ReceiptExportSvc
+from apps.receipt_app.services.receipt_svc import ReceiptSvc
+from enums import ExportFormatEnum, PaymentTypeEnum
+from models import PaymentType, User
+
+pytestmark = pytest.mark.asyncio(loop_scope="module")
+
+TORTOISE_TEST_DB = {
+    "connections": {"default": "sqlite://:memory:"},
+    "apps": {
+        "models": {
+            "models": ["models", "aerich.models"],
+            "default_connection": "default",
+        }
+    },
+}
+
+PRODUCTS_PER_RECEIPT = 100
+SMALL_PRODUCTS = 10_000
+LARGE_PRODUCTS = 1_000_000 if os.getenv("RUN_SLOW_TESTS") else 100_000
+
+SEED_SQL = """
+WITH RECURSIVE g(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM g WHERE x < {receipts})
+INSERT INTO receipts (user_id, payment_type_id, amount_cents, total_cents, created_at)
+    SELECT {user_id}, {payment_type_id}, 100000, 25000, '2024-01-01 12:00:00+00:00' FROM g;
+WITH RECURSIVE k(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM k WHERE x < {products_per_receipt})
+INSERT INTO products (receipt_id, name, price_cents, quantity_milli, total_cents, created_at)
+    SELECT r.id, 'Товар ' || k.x, 125, 2000, 250, r.created_at
+    FROM receipts r CROSS JOIN k WHERE r.user_id = {user_id};
+"""
+
+
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def seeded_users():
+    """Створює двох користувачів із 10k та LARGE_PRODUCTS товарів у чеках."""
+    await Tortoise.init(config=TORTOISE_TEST_DB)
+    await Tortoise.generate_schemas(safe=True)
+    payment_type = await PaymentType.create(name=PaymentTypeEnum.CASH.value)
+
+    users = []
+    for products in (SMALL_PRODUCTS, LARGE_PRODUCTS):
+        user = await User.create(name="Export", username=f"export_{products}", password="-")
+        await Tortoise.get_connection("default").execute_script(SEED_SQL.format(
+            receipts=products // PRODUCTS_PER_RECEIPT,
+            user_id=user.id,
+            payment_type_id=payment_type.id,
+            products_per_receipt=PRODUCTS_PER_RECEIPT,
+        ))
+        users.append(user)
+
+    yield users
+    await Tortoise.close_connections()
+
+
+async def export_peak(user: User, export_format: ExportFormatEnum):
+    """Повертає кількість рядків експорту та пікову пам'ять, виділену під час нього."""
+    query = await ReceiptSvc().list_query(user)
+    lines = 0
+    tracemalloc.start()
+    try:
+        async for part in ReceiptExportSvc().export(query, export_format):
+            lines += part.count("\n")
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return lines, peak
+
+
+@pytest.mark.parametrize("export_format", [ExportFormatEnum.NDJSON, ExportFormatEnum.CSV])
+async def test_export_memory_is_flat(seeded_users, export_format):
+    """Тестує, що пікова пам'ять експорту не зростає разом із кількістю товарів."""
+    small_user, large_user = seeded_users
+
+    small_lines, small_peak = await export_peak(small_user, export_format)
+    large_lines, large_peak = await export_peak(large_user, export_format)
+
+    if export_format == ExportFormatEnum.CSV:
+        assert (small_lines - 1, large_lines - 1) == (SMALL_PRODUCTS, LARGE_PRODUCTS)
+    else:
+        assert (small_lines, large_lines) == (
+            SMALL_PRODUCTS // PRODUCTS_PER_RECEIPT, LARGE_PRODUCTS // PRODUCTS_PER_RECEIPT
+        )
+    assert large_peak < small_peak * 1.5, (small_peak, large_peak)
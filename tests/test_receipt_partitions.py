@@ -0,0 +1,217 @@
+"""Monthly partitions of receipts and products (migration 12).
+
+Runs only against Postgres: set TEST_POSTGRES_URL (see `make run-plan-tests`)
+to a database URL the tests may create and drop.
+"""
+import csv
+import gzip
+import importlib
+import io
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from tortoise import Tortoise
+
+from apps.receipt_app.dto import PaymentInput, ProductInput, ReceiptRequest
+from apps.receipt_app.services.receipt_batch_svc import ReceiptBatchSvc
+from apps.receipt_app.services.receipt_partition_svc import ReceiptPartitionSvc, add_months
+from apps.receipt_app.services.receipt_svc import ReceiptSvc
+from enums import PaymentTypeEnum
+from models import Product, Receipt, User
+
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+pytestmark = [
+    pytest.mark.skipif(not TEST_POSTGRES_URL, reason="TEST_POSTGRES_URL is not set"),
+    pytest.mark.asyncio(loop_scope="module"),
+]
+
+migration = importlib.import_module("migrations.models.12_20261018150000_update")
+
+RECEIPTS = 730
+PRODUCTS_PER_RECEIPT = 2
+
+SEED_SQL = f"""
+INSERT INTO payment_types (name) VALUES ('{PaymentTypeEnum.CASH.value}'), ('{PaymentTypeEnum.CREDIT_CART.value}');
+INSERT INTO users (name, username, password) VALUES ('user', 'partition_user', '-');
+INSERT INTO receipts (user_id, payment_type_id, amount_cents, total_cents, products_count, created_at)
+    SELECT 1, 1 + g % 2, 10000, 200, {PRODUCTS_PER_RECEIPT}, now() - g * interval '1 day'
+    FROM generate_series(1, {RECEIPTS}) g;
+INSERT INTO products (receipt_id, name, price_cents, quantity_milli, total_cents, created_at)
+    SELECT r.id, 'product ' || g, 100, 1000, 100, r.created_at
+    FROM receipts r CROSS JOIN generate_series(1, {PRODUCTS_PER_RECEIPT}) g;
+"""
+
+
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def db():
+    config = {
+        "connections": {"default": TEST_POSTGRES_URL},
+        "apps": {"models": {"models": ["models", "aerich.models"], "default_connection": "default"}},
+    }
+    await Tortoise.init(config=config, _create_db=True)
+    await Tortoise.generate_schemas()
+    connection = Tortoise.get_connection("default")
+    await connection.execute_script(SEED_SQL)
+    await connection.execute_script(await migration.upgrade(connection))
+    await connection.execute_script("ANALYZE")
+    yield connection
+    await Tortoise._drop_databases()
+
+
+async def count(db, table: str) -> int:
+    return (await db.execute_query_dict(f'SELECT count(*) AS "count" FROM "{table}"'))[0]["count"]
+
+
+async def scanned(db, sql: str, values: list = None) -> set:
+    rows = await db.execute_query_dict(f"EXPLAIN (FORMAT JSON) {sql}", values)
+    plan = rows[0]["QUERY PLAN"]
+    plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+
+    def relations(node):
+        if "Relation Name" in node:
+            yield node["Relation Name"]
+        for child in node.get("Plans", ()):
+            yield from relations(child)
+
+    return set(relations(plan))
+
+
+async def test_rows_are_moved_to_month_partitions(db):
+    """Тестує, що міграція розкладає наявні чеки й товари по місячних секціях, не втрачаючи рядків."""
+    assert await count(db, "receipts") == RECEIPTS
+    assert await count(db, "products") == RECEIPTS * PRODUCTS_PER_RECEIPT
+    assert await count(db, "receipts_default") == 0
+    assert await count(db, "products_default") == 0
+
+    months = await ReceiptPartitionSvc().partitions("receipts")
+    now = datetime.now(timezone.utc).date()
+    assert max(months) == add_months(now, 3)
+    assert min(months) <= add_months(now - timedelta(days=RECEIPTS), 0)
+    assert list(await ReceiptPartitionSvc().partitions("products")) == list(months)
+
+
+async def test_receipt_queries_prune_partitions(db):
+    """Тестує, що фільтр за датою й товари сторінки чеків читаються лише з потрібних секцій."""
+    user = await User.get(username="partition_user")
+    now = datetime.now(timezone.utc)
+    svc = ReceiptSvc()
+    query = await svc.list_query(user, date_from=now - timedelta(days=20), date_to=now)
+
+    assert "receipts_default" not in await scanned(db, query.limit(10).sql())
+    assert len(await scanned(db, query.limit(10).sql())) <= 2
+
+    receipts = await query.limit(10).values("id", "amount_cents", "total_cents", "payment_type_id", "created_at")
+    products_query = Product.filter(svc.products_of(receipts)).order_by("id")
+    assert len(await scanned(db, products_query.sql())) <= 2
+
+    page = await svc.serialize_list(receipts)
+    assert [len(receipt["products"]) for receipt in page] == [PRODUCTS_PER_RECEIPT] * 10
+
+    detail = await svc.get_detail(user.id, receipts[-1]["id"])
+    assert len(detail["products"]) == PRODUCTS_PER_RECEIPT
+    assert detail["created_at"] == receipts[-1]["created_at"]
+
+
+async def test_new_receipts_are_written_to_partitions(db):
+    """Тестує створення чеків через ORM і пакетний COPY у секціоновані таблиці."""
+    user = await User.get(username="partition_user")
+    receipt = await Receipt.create(user=user, payment_type_id=1, amount_cents=500, total_cents=300)
+    await Product.bulk_create([
+        Product(receipt=receipt, name="ORM", price_cents=300, quantity_milli=1000, total_cents=300,
+                created_at=receipt.created_at),
+    ])
+    request = ReceiptRequest(
+        products=[ProductInput(name="COPY", price="1.50", quantity="2")],
+        payment=PaymentInput(type=PaymentTypeEnum.CASH.value, amount="5"),
+    )
+    ids = (await ReceiptBatchSvc().create_receipts(user, [request, request])).ids
+
+    month = f"_p{receipt.created_at:%Y_%m}"
+    for receipt_id in (receipt.id, *ids):
+        rows = await db.execute_query_dict(
+            'SELECT p.tableoid::regclass::text AS "partition" FROM "products" p WHERE p."receipt_id" = $1',
+            [receipt_id],
+        )
+        assert [row["partition"] for row in rows] == [f"products{month}"]
+        assert len((await ReceiptSvc().get_detail(user.id, receipt_id))["products"]) == 1
+
+
+async def test_create_partitions_is_idempotent(db):
+    """Тестує, що повторне створення секцій наперед нічого не додає."""
+    svc = ReceiptPartitionSvc()
+
+    assert await svc.create_partitions(3) == 0
+    assert await svc.create_partitions(5) == 4
+    assert await svc.create_partitions(5) == 0
+
+
+async def test_archive_dumps_and_drops_old_months(db, tmp_path):
+    """Тестує архівацію: старі секції вивантажуються у стиснені CSV і видаляються з бази."""
+    svc = ReceiptPartitionSvc()
+    before = add_months(datetime.now(timezone.utc).date(), -12)
+    old_receipts = (await db.execute_query_dict(
+        'SELECT count(*) AS "count" FROM "receipts" WHERE "created_at" < $1', [before]
+    ))[0]["count"]
+    assert old_receipts > 0
+
+    files = await svc.archive(before, str(tmp_path))
+
+    archived = {"receipts": 0, "products": 0}
+    for path in files:
+        with gzip.open(path, "rt") as archive:
+            rows = list(csv.DictReader(io.StringIO(archive.read())))
+        archived[path.name.split("_p")[0]] += len(rows)
+    assert archived == {"receipts": old_receipts, "products": old_receipts * PRODUCTS_PER_RECEIPT}
+    assert not [path for path in tmp_path.iterdir() if path.suffix == ".part"]
+
+    assert min(await svc.partitions("receipts")) == before
+    assert await count(db, "receipts") == RECEIPTS + 3 - old_receipts
+    tables = await db.execute_query_dict(
+        'SELECT count(*) AS "count" FROM "pg_class" WHERE "relname" = ANY($1)', [[path.name[:-7] for path in files]]
+    )
+    assert tables[0]["count"] == 0
+    assert await svc.archive(before, str(tmp_path)) == []
+
+
+async def test_create_partitions_moves_rows_out_of_default(db):
+    """Тестує, що чеки місяця без секції, записані в секцію за замовчуванням, переносяться у створену для них секцію."""
+    month = add_months(datetime.now(timezone.utc).date(), 8)
+    await db.execute_script(f"""
+        INSERT INTO receipts (id, user_id, payment_type_id, amount_cents, total_cents, products_count, created_at)
+            VALUES (100001, 1, 1, 500, 300, 1, '{month} 12:00+00');
+        INSERT INTO products (receipt_id, name, price_cents, quantity_milli, total_cents, created_at)
+            VALUES (100001, 'default', 300, 1000, 300, '{month} 12:00+00');
+    """)
+    assert (await count(db, "receipts_default"), await count(db, "products_default")) == (1, 1)
+    receipts, products = await count(db, "receipts"), await count(db, "products")
+
+    svc = ReceiptPartitionSvc()
+    # Months 6 and 7 ahead are created too
+    assert await svc.create_partitions(5) == 6
+
+    assert (await count(db, "receipts_default"), await count(db, "products_default")) == (0, 0)
+    assert (await count(db, "receipts"), await count(db, "products")) == (receipts, products)
+    assert await count(db, f"receipts_p{month:%Y_%m}") == 1
+    assert await count(db, f"products_p{month:%Y_%m}") == 1
+    user = await User.get(username="partition_user")
+    assert len((await ReceiptSvc().get_detail(user.id, 100001))["products"]) == 1
+    assert await svc.create_partitions(5) == 0
+
+
+async def test_downgrade_restores_plain_tables(db):
+    """Тестує, що відкат міграції повертає звичайні таблиці з усіма рядками."""
+    receipts, products = await count(db, "receipts"), await count(db, "products")
+
+    await db.execute_script(await migration.downgrade(db))
+
+    kinds = await db.execute_query_dict(
+        'SELECT "relname", "relkind"::text AS "relkind" FROM "pg_class" WHERE "relname" IN (\'receipts\', \'products\')'
+    )
+    assert {row["relkind"] for row in kinds} == {"r"}
+    assert (await count(db, "receipts"), await count(db, "products")) == (receipts, products)
+    receipt = await Receipt.create(user_id=1, payment_type_id=1, amount_cents=1, total_cents=1)
+    assert receipt.id > receipts
@@ -0,0 +1,164 @@
+"""EXPLAIN checks for every filter combination get-receipts can produce.
+
+The schema is built by the aerich migrations, so the plans are those of the
+partitioned tables production runs on. Runs only against Postgres: set
+TEST_POSTGRES_URL (see `make run-plan-tests`) to a database URL the tests
+may create and drop.
+"""
+import itertools
+import json
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+from aerich import Command
+from tortoise import Tortoise
+
+from apps.receipt_app.services.receipt_export_svc import ReceiptExportSvc
+from apps.receipt_app.services.receipt_stats_svc import ReceiptStatsSvc
+from apps.receipt_app.services.receipt_svc import RECEIPT_DETAIL_SQL, ReceiptSvc
+from enums import PaymentTypeEnum, StatsPeriodEnum
+from models import User
+
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+pytestmark = [
+    pytest.mark.skipif(not TEST_POSTGRES_URL, reason="TEST_POSTGRES_URL is not set"),
+    pytest.mark.asyncio(loop_scope="module"),
+]
+
+USERS = 50
+RECEIPTS_PER_USER = 2000
+PRODUCTS_PER_RECEIPT = 3
+
+SEED_SQL = f"""
+SELECT "create_month_partitions"(ARRAY['receipts', 'products'], now() - interval '{RECEIPTS_PER_USER} hours', now());
+INSERT INTO payment_types (name) VALUES ('{PaymentTypeEnum.CASH.value}'), ('{PaymentTypeEnum.CREDIT_CART.value}');
+INSERT INTO users (name, username, password)
+    SELECT 'user ' || g, 'plan_user_' || g, '-' FROM generate_series(1, {USERS}) g;
+INSERT INTO receipts (user_id, payment_type_id, amount_cents, total_cents, created_at)
+    SELECT u.id, 1 + g % 2, 100000, (g % 1000) * 10, now() - g * interval '1 hour'
+    FROM users u CROSS JOIN generate_series(1, {RECEIPTS_PER_USER}) g;
+INSERT INTO products (receipt_id, name, price_cents, quantity_milli, total_cents, created_at)
+    SELECT r.id, 'product ' || g, 100, 1000, 100, r.created_at
+    FROM receipts r CROSS JOIN generate_series(1, {PRODUCTS_PER_RECEIPT}) g;
+ANALYZE;
+"""
+
+
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def seeded_db():
+    config = {
+        "connections": {"default": TEST_POSTGRES_URL},
+        "apps": {"models": {"models": ["models", "aerich.models"], "default_connection": "default"}},
+    }
+    await Tortoise.init(config=config, _create_db=True)
+    command = Command(tortoise_config=config, location=str(Path(__file__).parent.parent / "migrations"))
+    await command.init()
+    await command.upgrade(run_in_transaction=True)
+    connection = Tortoise.get_connection("default")
+    await connection.execute_script(SEED_SQL)
+    empty_partitions.update(row["relname"] for row in await connection.execute_query_dict(
+        'SELECT "relname" FROM "pg_class" WHERE "relispartition" AND "relkind" = \'r\' AND "relpages" = 0'
+    ))
+    yield await User.get(username="plan_user_1")
+    await Tortoise._drop_databases()
+
+
+async def explain(sql: str, values: list = None) -> dict:
+    rows = await Tortoise.get_connection("default").execute_query_dict(f"EXPLAIN (FORMAT JSON) {sql}", values)
+    plan = rows[0]["QUERY PLAN"]
+    return (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+
+
+# Partitions without rows (months ahead, the default one); Postgres scans
+# them sequentially, reading nothing
+empty_partitions = set()
+
+
+def seq_scans(plan: dict):
+    """Tables scanned sequentially; a scan of a partition counts as one of its table."""
+    if plan["Node Type"] == "Seq Scan" and plan["Relation Name"] not in empty_partitions:
+        yield re.sub(r"_(p\d{4}_\d{2}|default)$", "", plan["Relation Name"])
+    for child in plan.get("Plans", ()):
+        yield from seq_scans(child)
+
+
+FILTER_COMBINATIONS = list(itertools.product([False, True], repeat=5))
+
+
+@pytest.mark.parametrize(
+    "use_date_from,use_date_to,use_min_total,use_payment_type,use_cursor",
+    FILTER_COMBINATIONS,
+)
+async def test_receipt_list_has_no_seq_scan(
+        seeded_db, use_date_from, use_date_to, use_min_total, use_payment_type, use_cursor
+):
+    svc = ReceiptSvc()
+    now = datetime.now(timezone.utc)
+    cursor = svc.encode_cursor(now - timedelta(days=20), 10 ** 9) if use_cursor else None
+    query = await svc.list_query(
+        seeded_db,
+        date_from=now - timedelta(days=60) if use_date_from else None,
+        date_to=now - timedelta(days=5) if use_date_to else None,
+        min_total=50 if use_min_total else None,
+        payment_type=PaymentTypeEnum.CASH.value if use_payment_type else None,
+        cursor=cursor,
+    )
+
+    plan = await explain(query.offset(100).limit(10).sql())
+
+    assert "receipts" not in set(seq_scans(plan)), json.dumps(plan, indent=2)
+
+
+async def test_products_prefetch_has_no_seq_scan(seeded_db):
+    svc = ReceiptSvc()
+    list_query = await svc.list_query(seeded_db)
+    receipts = await list_query.limit(100).values("id", "created_at")
+
+    plan = await explain(svc.products_query(receipts).sql())
+
+    assert "products" not in set(seq_scans(plan)), json.dumps(plan, indent=2)
+
+
+async def test_receipt_detail_has_no_seq_scan(seeded_db):
+    receipt_id = (await (await ReceiptSvc().list_query(seeded_db)).first()).id
+
+    receipt = await ReceiptSvc().get_detail(seeded_db.id, receipt_id)
+    assert len(receipt["products"]) == PRODUCTS_PER_RECEIPT
+
+    plan = await explain(RECEIPT_DETAIL_SQL["postgres"], [receipt_id, seeded_db.id])
+    assert not {"receipts", "products"} & set(seq_scans(plan)), json.dumps(plan, indent=2)
+
+
+async def test_export_chunks_have_no_seq_scan(seeded_db):
+    svc = ReceiptExportSvc()
+    list_query = await ReceiptSvc().list_query(seeded_db)
+    receipts = await svc.receipts_chunk_query(list_query, 1000)
+    assert receipts
+
+    queries = (
+        svc.receipts_chunk_query(list_query, None),
+        svc.receipts_chunk_query(list_query, 1000),
+        svc.products_page_query(receipts, None),
+        svc.products_page_query(receipts, (receipts[10]["id"], 1)),
+    )
+    for query in queries:
+        plan = await explain(query.sql())
+        assert not set(seq_scans(plan)) - {"payment_types"}, json.dumps(plan, indent=2)
+
+
+@pytest.mark.parametrize("period", list(StatsPeriodEnum))
+async def test_stats_have_no_seq_scan(seeded_db, period):
+    svc = ReceiptStatsSvc()
+    list_query = await ReceiptSvc().list_query(seeded_db)
+
+    stats = await svc.stats(list_query, period)
+    assert stats["count"] == RECEIPTS_PER_USER
+
+    for query in (svc.payment_type_query(list_query), svc.period_query(list_query, period)):
+        plan = await explain(query.sql())
+        assert "receipts" not in set(seq_scans(plan)), json.dumps(plan, indent=2)
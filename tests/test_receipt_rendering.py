@@ -0,0 +1,164 @@
+import os
+import random
+import re
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+from apps.receipt_app.money import from_cents
+from apps.receipt_app.rendering import RENDERERS, get_layout
+from apps.receipt_app.rendering.escpos import BOLD_ON, INIT
+from apps.receipt_app.rendering.layout import COLUMNS, NAME_MAX_LINES, amount_text
+from apps.receipt_app.rendering.pdf import encode_single_byte, pdf_prefix
+from apps.receipt_app.rendering.width import CONTROLS, ELLIPSIS, text_width
+from config import RECEIPT_PDF_FONT_PATH
+from enums import ReceiptFormatEnum
+
+CREATED_AT = datetime(2024, 5, 17, 9, 5, tzinfo=timezone.utc)
+
+
+def receipt_lines(layout, products: int):
+    lines = list(layout.header)
+    for i in range(products):
+        lines.extend(layout.product(f"Ґуля і <{i}>", 1050, 1500, 1575))
+    lines.extend(layout.footer(1575 * products, 1575 * products + 25, "cash", CREATED_AT))
+    return lines
+
+
+def render(receipt_format, lines, batch_size):
+    renderer = RENDERERS[receipt_format](get_layout(32))
+    parts = [renderer.begin()]
+    for start in range(0, len(lines), batch_size):
+        parts.append(renderer.render(lines[start:start + batch_size]))
+    parts.append(renderer.end())
+    return b"".join(parts)
+
+
+@pytest.mark.parametrize("receipt_format", list(ReceiptFormatEnum))
+def test_output_does_not_depend_on_batching(receipt_format):
+    """Тестує, що документ не залежить від того, якими частинами передано рядки рендереру."""
+    lines = receipt_lines(get_layout(32), 70)
+
+    whole = render(receipt_format, lines, len(lines))
+
+    assert render(receipt_format, lines, 1) == whole
+    assert render(receipt_format, lines, 7) == whole
+
+
+def test_formats():
+    """Тестує ознаки кожного формату: ESC/POS-команди, екранування HTML, структуру PDF."""
+    lines = receipt_lines(get_layout(32), 2)
+
+    text = render(ReceiptFormatEnum.TEXT, lines, len(lines)).decode()
+    assert text.splitlines()[0].strip() == "ФОП Джонсонюк Борис"
+    assert "1.50 x 10.50" in text.splitlines()
+
+    escpos = render(ReceiptFormatEnum.ESCPOS, lines, len(lines))
+    assert escpos.startswith(INIT)
+    assert BOLD_ON + "СУМА".encode("cp866") in escpos
+    assert "Гуля i <1>".encode("cp866") in escpos
+
+    html = render(ReceiptFormatEnum.HTML, lines, len(lines)).decode()
+    assert "<span>Ґуля і &lt;1&gt;</span><span>15.75</span>" in html
+    assert html.endswith("</html>")
+
+    pdf = render(ReceiptFormatEnum.PDF, lines, len(lines))
+    assert pdf.startswith(b"%PDF-1.4")
+    assert pdf.endswith(b"%%EOF\n")
+    startxref = int(pdf.rsplit(b"startxref\n", 1)[1].split(b"\n")[0])
+    assert pdf[startxref:].startswith(b"xref\n")
+
+
+GOLDEN_RECEIPT_PDF_CONTENT = Path(__file__).parent / "golden" / "receipt_pdf_content.txt"
+
+
+@pytest.mark.skipif(not os.path.exists(RECEIPT_PDF_FONT_PATH), reason="RECEIPT_PDF_FONT_PATH is not installed")
+def test_pdf_wide_characters_match_golden_file():
+    """Тестує, що PDF з широкими символами в назві збігається з еталоном і ціни стоять в одній колонці."""
+    layout = get_layout(32)
+    lines = [
+        *layout.header,
+        *layout.product("Чай 烏龍茶 🍵", 1050, 2000, 2100),
+        *layout.product("Cafe\u0301 au lait", 4550, 1000, 4550),
+        *layout.footer(6650, 7000, "cash", CREATED_AT),
+    ]
+
+    pdf = render(ReceiptFormatEnum.PDF, lines, len(lines))
+
+    prefix = pdf_prefix()
+    streams = re.findall(rb"stream\n(.*?)\nendstream", pdf[len(prefix.data):], re.DOTALL)
+    content = zlib.decompress(streams[0])
+    assert content.decode() == GOLDEN_RECEIPT_PDF_CONTENT.read_text()
+
+    ranges = re.search(rb"/W \[([\d ]*)\]", prefix.data).group(1).split()
+    widths = {}
+    for first, last, width in zip(*[map(int, ranges)] * 3):
+        widths.update(dict.fromkeys(range(first, last + 1), width))
+    for line, hex_text in zip(lines, re.findall(rb"<([0-9a-f]*)> Tj", content)):
+        codes = bytes.fromhex(hex_text.decode())
+        shown = sum(widths.get(int.from_bytes(codes[i:i + 2], "big"), prefix.advance) for i in range(0, len(codes), 2))
+        assert shown == text_width(line.text) * prefix.advance
+        if line.kind == COLUMNS:
+            assert shown == 32 * prefix.advance
+    assert codes.decode("utf-16-be") == lines[-1].text
+    assert "烏龍茶 ".encode("utf-16-be").hex().encode() + b"d800" in content
+
+
+def test_pdf_fallback_font_keeps_columns():
+    """Тестує, що без вбудованого шрифту кожен символ, якого немає в кодуванні, займає стільки ж колонок."""
+    encode = encode_single_byte("cp1252")
+
+    assert encode("Tea") == b"Tea"
+    assert encode("Café 漢字\u0301 ü") == "Café ???? ü".encode("cp1252")
+
+
+# Latin, Cyrillic, wide CJK and emoji, combining and zero-width marks, controls, spaces
+NAME_ALPHABETS = [
+    "abcXYZ019-,.", "Ґуляіїєщ", "漢字のカタカナ한글", "\u0301\u0308\u200b\u200d\ufe0f",
+    "😀🧾", "\t\n\r\x1b\x85", "    \u3000",
+]
+
+
+def random_name(rng: random.Random) -> str:
+    return "".join(rng.choice(rng.choice(NAME_ALPHABETS)) for _ in range(rng.randrange(120)))
+
+
+def test_text_width():
+    """Тестує ширину тексту в колонках для широких, комбінованих і звичайних символів."""
+    assert text_width("Tea") == 3
+    assert text_width("Кава") == 4
+    assert text_width("漢字") == 4
+    assert text_width("e\u0301") == 1
+    assert text_width("👍\u200d") == 2
+
+    layout = get_layout(20)
+    assert layout.center("漢字").text == "        漢字        "
+    assert layout.center("Дуже довга назва закладу").text == "Дуже довга назва за…"
+
+
+@pytest.mark.parametrize("line_width", [20, 32, 57, 100])
+def test_product_lines_fit_line_width(line_width):
+    """Тестує на випадкових Unicode-назвах, що рядки товару вміщуються в ширину і не гублять текст назви."""
+    rng = random.Random(line_width)
+    layout = get_layout(line_width)
+
+    for _ in range(500):
+        name = random_name(rng)
+        total_cents = rng.randrange(10 ** rng.randrange(1, 12))
+
+        lines = layout.product(name, 100, 1000, total_cents)
+
+        assert all(text_width(line.text) <= line_width and "\n" not in line.text for line in lines)
+        name_lines, last = lines[1:-2], lines[-2]
+        assert len(name_lines) <= NAME_MAX_LINES
+        assert last.kind == COLUMNS
+        assert last.right == amount_text(from_cents(total_cents))
+        assert text_width(last.text) == line_width
+        shown = "".join("".join(line.text for line in name_lines).split()) + "".join(last.left.split())
+        expected = "".join(name.translate(CONTROLS).split())
+        if shown.endswith(ELLIPSIS):
+            assert expected.startswith(shown[:-1])
+        else:
+            assert shown == expected
@@ -0,0 +1,89 @@
+import uuid
+
+import pytest
+
+from apps.receipt_app.services import receipt_text_cache_svc
+from apps.receipt_app.services.receipt_text_cache_svc import (
+    ReceiptText,
+    ReceiptTextCacheSvc,
+    receipt_text_cache,
+    receipt_text_cache_stats,
+)
+from config import redis_pool
+from enums import ReceiptFormatEnum
+from general_services.ttl_cache import TTLCache
+
+
+@pytest.fixture
+async def svc():
+    receipt_text_cache.clear()
+    yield ReceiptTextCacheSvc()
+    receipt_text_cache.clear()
+    await redis_pool.disconnect()
+
+
+def unique_receipt_id() -> int:
+    return uuid.uuid4().int % 10 ** 12
+
+
+def test_ttl_cache_evicts_by_bytes():
+    """Тестує, що LRU-кеш витісняє найдавніші записи, коли сумарний розмір перевищує ліміт."""
+    cache = TTLCache(maxsize=100, ttl=60, maxbytes=10)
+
+    cache.set("a", "aaaa")
+    cache.set("b", "bbbb")
+    cache.get("a")
+    cache.set("c", "cccc")
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("aaaa", "cccc")
+    assert cache.bytes == 8
+
+    cache.set("huge", "x" * 11)
+    assert cache.get("huge") is None
+    assert cache.stats()["bytes"] == 8
+
+
+@pytest.mark.asyncio
+async def test_text_is_cached_locally_and_in_redis(svc):
+    """Тестує, що збережений текст береться з локального кешу, а після його очищення — з Redis."""
+    receipt_id = unique_receipt_id()
+    assert await svc.get(receipt_id, 32, ReceiptFormatEnum.TEXT) is None
+
+    stored = await svc.set(receipt_id, 32, ReceiptFormatEnum.TEXT, "СУМА 10.00".encode())
+    assert stored.body == "СУМА 10.00".encode()
+    assert await svc.get(receipt_id, 32, ReceiptFormatEnum.TEXT) == stored
+
+    receipt_text_cache.clear()
+    redis_hits = receipt_text_cache_stats()["redis"]["hits"]
+    assert await svc.get(receipt_id, 32, ReceiptFormatEnum.TEXT) == stored
+    assert receipt_text_cache_stats()["redis"]["hits"] == redis_hits + 1
+    assert len(receipt_text_cache) == 1
+
+    assert await svc.get(receipt_id, 40, ReceiptFormatEnum.TEXT) is None
+    assert await svc.get(receipt_id, 32, ReceiptFormatEnum.HTML) is None
+
+
+@pytest.mark.asyncio
+async def test_large_text_is_not_cached(svc, monkeypatch):
+    """Тестує, що текст, більший за ліміт одного запису, не кешується."""
+    monkeypatch.setattr(receipt_text_cache_svc, "RECEIPT_TEXT_CACHE_MAX_ITEM_BYTES", 4)
+    receipt_id = unique_receipt_id()
+
+    text = await svc.set(receipt_id, 32, ReceiptFormatEnum.TEXT, b"too long")
+
+    assert text.etag
+    assert await svc.get(receipt_id, 32, ReceiptFormatEnum.TEXT) is None
+
+
+def test_not_modified():
+    """Тестує розбір заголовка If-None-Match."""
+    svc = ReceiptTextCacheSvc()
+    text = svc.make(b"text")
+
+    assert isinstance(text, ReceiptText)
+    assert svc.not_modified(text.etag, text.etag)
+    assert svc.not_modified(f'"a", W/{text.etag}', text.etag)
+    assert svc.not_modified("*", text.etag)
+    assert not svc.not_modified('"a"', text.etag)
+    assert not svc.not_modified(None, text.etag)
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import logging
+
+import pytest
+from tortoise import Tortoise
+
+from auth_jwt.services import user_cache_svc
+from auth_jwt.services.user_cache_svc import UserCacheSvc, user_cache
+from config import INVALIDATION_CHANNEL, REDIS_SOCKET_TIMEOUT, redis_client, redis_pool
+from general_services.invalidation_svc import InvalidationSvc
+from models import User
+
+TORTOISE_TEST_DB = {
+    "connections": {"default": "sqlite://:memory:"},
+    "apps": {
+        "models": {
+            "models": ["models", "aerich.models"],
+            "default_connection": "default",
+        }
+    },
+}
+
+
+@pytest.fixture
+async def user():
+    await Tortoise.init(config=TORTOISE_TEST_DB)
+    await Tortoise.generate_schemas()
+    user_cache.clear()
+    user = User(name="Cached User", username="cached_user", password="-")
+    await user.save()
+    yield user
+    user_cache.clear()
+    await Tortoise.close_connections()
+    await redis_pool.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_get_user_is_cached(user):
+    """Тестує, що повторний запит користувача береться з кешу."""
+    svc = UserCacheSvc()
+    hits, misses = user_cache.hits, user_cache.misses
+
+    first = await svc.get_user(user.id)
+    second = await svc.get_user(user.id)
+
+    assert first is second
+    assert user_cache.misses == misses + 1
+    assert user_cache.hits == hits + 1
+
+
+@pytest.mark.asyncio
+async def test_user_update_invalidates_cache(user):
+    """Тестує, що збереження користувача видаляє його з кешу."""
+    svc = UserCacheSvc()
+    cached = await svc.get_user(user.id)
+
+    cached.is_active = False
+    await cached.save()
+
+    assert user_cache.get(user.id) is None
+    assert (await svc.get_user(user.id)).is_active is False
+
+
+@pytest.mark.asyncio
+async def test_invalidation_from_other_worker(user):
+    """Тестує видалення запису з кешу за подією з каналу Redis від іншого воркера."""
+    listener = asyncio.create_task(InvalidationSvc().listen())
+    await asyncio.sleep(0.2)  # let the listener subscribe
+    user_cache.set(user.id, user)
+
+    event = {"topic": "user", "data": {"user_id": user.id}}
+    await redis_client.publish(INVALIDATION_CHANNEL, json.dumps(event))
+    for _ in range(20):
+        if user.id not in user_cache._data:
+            break
+        await asyncio.sleep(0.05)
+    listener.cancel()
+
+    assert user_cache.get(user.id) is None
+
+
+@pytest.mark.asyncio
+async def test_idle_listener_keeps_caches(user, caplog, monkeypatch):
+    """Тестує, що слухач без подій довше за REDIS_SOCKET_TIMEOUT не скидає кеші й не пише помилок."""
+    resets = []
+    monkeypatch.setattr(InvalidationSvc, "_resets", [lambda: resets.append(1)])
+    listener = asyncio.create_task(InvalidationSvc().listen())
+    user_cache.set(user.id, user)
+
+    with caplog.at_level(logging.ERROR, logger="general_services.invalidation_svc"):
+        await asyncio.sleep(REDIS_SOCKET_TIMEOUT * 2 + 0.5)
+    event = {"topic": "user", "data": {"user_id": user.id}}
+    await redis_client.publish(INVALIDATION_CHANNEL, json.dumps(event))
+    for _ in range(20):
+        if user.id not in user_cache._data:
+            break
+        await asyncio.sleep(0.05)
+    listener.cancel()
+
+    assert resets == []
+    assert not caplog.records
+    assert user_cache.get(user.id) is None
+
+
+@pytest.mark.asyncio
+async def test_cache_disabled(user, monkeypatch):
+    """Тестує, що при вимкненому кеші користувач щоразу читається з БД."""
+    monkeypatch.setattr(user_cache_svc, "USER_CACHE_ENABLED", False)
+    svc = UserCacheSvc()
+
+    assert await svc.get_user(user.id) is not await svc.get_user(user.id)
+    assert user_cache.get(user.id) is None